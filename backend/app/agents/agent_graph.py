@@ -0,0 +1,191 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# ========================================
+# AGENT DEPENDENCY GRAPH
+# ========================================
+# Declarative scheduler for the agent pipeline. Every node names its inputs,
+# a timeout and a fallback value; a node starts as soon as its inputs are
+# ready, so one slow agent only delays the agents that actually need its output.
+
+
+class AgentNode:
+    """One agent in the pipeline graph"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        inputs: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        fallback: Any = None,
+        speculate: Optional[Dict[str, str]] = None,
+    ):
+        """
+        name:      key the node's output is stored under
+        func:      sync or async callable, called with its inputs as keyword arguments
+        inputs:    names of values (graph inputs or other nodes) the node needs
+        timeout:   seconds before the node gives up and uses its fallback
+        fallback:  value, or callable(values) -> value, used on timeout or error
+        speculate: {input: stand_in} lets the node start early on a cheap stand-in
+                   value and be rerun only if the real input turns out different
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.timeout = timeout
+        self.fallback = fallback
+        self.speculate = speculate or {}
+
+    def fallback_value(self, values: Dict) -> Any:
+        return self.fallback(values) if callable(self.fallback) else self.fallback
+
+
+async def _run_node(node: AgentNode, kwargs: Dict, values: Dict, timeout: Optional[float]) -> Tuple[Any, Optional[str]]:
+    """Run one node; returns (value, fallback_reason)."""
+    if timeout is not None and timeout <= 0:
+        return node.fallback_value({**values, **kwargs}), "deadline"
+    try:
+        result = node.func(**kwargs)
+        if inspect.isawaitable(result):
+            result = await asyncio.wait_for(result, timeout)
+        return result, None
+    except asyncio.TimeoutError:
+        return node.fallback_value({**values, **kwargs}), "timeout"
+    except Exception as e:
+        print(f"⚠ Agent '{node.name}' failed: {e}")
+        return node.fallback_value({**values, **kwargs}), "error"
+
+
+async def run_agent_graph(
+    nodes: List[AgentNode],
+    values: Dict,
+    deadline: Optional[float] = None,
+    speculative: bool = False,
+    on_result: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+    on_invalidate: Optional[Callable[[str], Awaitable[None]]] = None,
+    on_speculation: Optional[Callable[[str, bool, float], None]] = None,
+    on_timing: Optional[Callable[[str, float], None]] = None,
+) -> Tuple[Dict, Dict[str, str]]:
+    """
+    Run every node whose output is not already in `values`.
+
+    deadline:       overall budget in seconds; node timeouts are clipped to it and
+                    nodes that become ready after it expire use their fallback
+    speculative:    allow nodes to start on their `speculate` stand-ins
+    on_result:      awaited with (name, value) once a node's output is final
+    on_invalidate:  awaited with a node name when its speculative work is discarded
+    on_speculation: called with (input, hit, seconds_saved) when a speculated input resolves
+    on_timing:      called with (name, seconds) each time a node run completes
+
+    Returns (values, fallbacks) where fallbacks maps node name -> reason.
+    """
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + deadline if deadline is not None else None
+
+    final = dict(values)
+    tentative: Dict[str, Tuple[Any, Dict]] = {}  # name -> (value, assumed inputs)
+    running: Dict[asyncio.Task, Tuple[str, Dict]] = {}  # task -> (name, assumed inputs)
+    task_started: Dict[asyncio.Task, float] = {}
+    started_at: Dict[str, float] = {}
+    fallbacks: Dict[str, str] = {}
+    by_name = {node.name: node for node in nodes}
+    pending = {node.name: node for node in nodes if node.name not in final}
+
+    def node_timeout(node: AgentNode) -> Optional[float]:
+        if expires is None:
+            return node.timeout
+        remaining = expires - loop.time()
+        return remaining if node.timeout is None else min(node.timeout, remaining)
+
+    def ready_inputs(node: AgentNode) -> Optional[Tuple[Dict, Dict]]:
+        kwargs, assumed = {}, {}
+        for name in node.inputs:
+            if name in final:
+                kwargs[name] = final[name]
+            elif speculative and name in tentative:
+                kwargs[name], upstream = tentative[name]
+                assumed.update(upstream)
+            elif speculative and node.speculate.get(name) in final:
+                kwargs[name] = final[node.speculate[name]]
+                assumed[name] = kwargs[name]
+            else:
+                return None
+        return kwargs, assumed
+
+    def start_ready():
+        for name, node in list(pending.items()):
+            ready = ready_inputs(node)
+            if ready is None:
+                continue
+            kwargs, assumed = ready
+            del pending[name]
+            if assumed:
+                started_at[name] = loop.time()
+            task = asyncio.ensure_future(_run_node(node, kwargs, final, node_timeout(node)))
+            running[task] = (name, assumed)
+            task_started[task] = loop.time()
+
+    async def invalidate(name: str):
+        """Discard speculative work for a node and queue it to run again."""
+        for task, (task_name, _) in list(running.items()):
+            if task_name == name:
+                task.cancel()
+                del running[task]
+        tentative.pop(name, None)
+        fallbacks.pop(name, None)
+        pending[name] = by_name[name]
+        if on_invalidate is not None:
+            await on_invalidate(name)
+
+    async def finalize(name: str, value: Any):
+        final[name] = value
+        if on_result is not None:
+            await on_result(name, value)
+
+        # Settle every node that speculated on this value
+        affected = [(n, assumed) for n, (_, assumed) in tentative.items() if name in assumed]
+        affected += [(n, assumed) for n, assumed in running.values() if name in assumed]
+        if not affected:
+            return
+        hit = all(assumed[name] == value for _, assumed in affected)
+        if on_speculation is not None:
+            saved = loop.time() - min(started_at[n] for n, _ in affected) if hit else 0.0
+            on_speculation(name, hit, saved)
+
+        if not hit:
+            for n, _ in affected:
+                await invalidate(n)
+            return
+        for n, assumed in affected:
+            del assumed[name]
+        for n, assumed in affected:
+            if n in tentative and not assumed:
+                confirmed_value, _ = tentative.pop(n)
+                await finalize(n, confirmed_value)
+
+    start_ready()
+    while running:
+        done, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task not in running:
+                continue  # invalidated while we were settling another node
+            name, assumed = running.pop(task)
+            value, reason = task.result()
+            if on_timing is not None:
+                on_timing(name, loop.time() - task_started[task])
+            if reason:
+                fallbacks[name] = reason
+            if assumed:
+                tentative[name] = (value, assumed)
+            else:
+                await finalize(name, value)
+        start_ready()
+
+    # Nodes whose inputs never became available
+    for name, node in pending.items():
+        final[name] = node.fallback_value(final)
+        fallbacks[name] = "unresolved"
+
+    return final, fallbacks
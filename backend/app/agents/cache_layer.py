@@ -1,100 +1,76 @@
+import asyncio
 import json
 import hashlib
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
 from functools import wraps
-from datetime import datetime, timedelta
-from app.memory.redis_store import redis_client
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from app.memory.redis_store import get_async_redis_client
+from app.agents.single_flight import SingleFlight
 
 # ========================================
 # RESPONSE CACHING LAYER
 # ========================================
-# Reduces API calls and improves response speed significantly
+# Two tiers in front of the async agents: a bounded in-process LRU (size and
+# TTL eviction) and, when a server is reachable, Redis shared by every
+# worker. Keys are the agent prefix, its prompt version and the normalized
+# inputs, so editing a prompt (and bumping its version) never serves stale
+# answers. Concurrent misses for the same key share one call.
+#
+# Entries stay servable for CACHE_STALE_TTL after they go stale: a stale hit
+# is answered immediately while a background call refreshes it. Results the
+# LLM layer flagged as degraded (a fallback after a failed call) are never
+# stored, so an outage cannot overwrite good answers with placeholders.
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_EXPIRY = int(os.getenv("CACHE_TTL", "86400"))  # fresh for 24 hours
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "86400"))  # then served stale for this long
+CACHE_LOCAL_SIZE = int(os.getenv("CACHE_LOCAL_SIZE", "2048"))
+# Local entries are re-checked against Redis after this long (another worker may have refreshed them)
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "600"))
+CACHE_REDIS = os.getenv("CACHE_REDIS", "true").lower() == "true"
+# After a Redis error, skip the tier for this long instead of paying the timeout per call
+CACHE_REDIS_RETRY = float(os.getenv("CACHE_REDIS_RETRY", "30"))
+# A prompt whose LLM call just failed is answered with the fallback for this long
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "30"))
+NEGATIVE_CACHE_SIZE = int(os.getenv("NEGATIVE_CACHE_SIZE", "10000"))
+
+
+def normalize_text(text: str) -> str:
+    """Normalization shared by every text-keyed cache"""
+    return " ".join(text.lower().split())
 
-CACHE_EXPIRY = 86400  # 24 hours in seconds
 
 def generate_cache_key(prefix: str, text: str) -> str:
     """Generate a unique cache key based on text hash"""
-    text_hash = hashlib.md5(text.lower().strip().encode()).hexdigest()
+    text_hash = hashlib.md5(normalize_text(text).encode()).hexdigest()
     return f"{prefix}:{text_hash}"
 
 
-def cache_response(prefix: str, expiry: int = CACHE_EXPIRY):
-    """Decorator to cache function responses in Redis"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(text: str, *args, **kwargs):
-            cache_key = generate_cache_key(prefix, text)
-            
-            # Try to get from cache
-            try:
-                cached = redis_client.get(cache_key)
-                if cached:
-                    return json.loads(cached)
-            except Exception as e:
-                print(f"⚠ Cache retrieval failed: {e}")
-            
-            # Call function if not cached
-            result = func(text, *args, **kwargs)
-            
-            # Store in cache
-            try:
-                redis_client.setex(cache_key, expiry, json.dumps(result))
-            except Exception as e:
-                print(f"⚠ Cache storage failed: {e}")
-            
-            return result
-        return wrapper
-    return decorator
+# ---------- Degraded results ----------
 
+class CallOutcome:
+    """Set on the context of a cached call; the LLM layer flags fallbacks on it"""
 
-def cache_complaint_analysis(expiry: int = CACHE_EXPIRY):
-    """Decorator to cache full complaint analysis"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(text: str, *args, **kwargs):
-            cache_key = generate_cache_key("complaint_analysis", text)
-            
-            try:
-                cached = redis_client.get(cache_key)
-                if cached:
-                    return json.loads(cached)
-            except Exception:
-                pass
-            
-            result = func(text, *args, **kwargs)
-            
-            try:
-                redis_client.setex(cache_key, expiry, json.dumps(result))
-            except Exception:
-                pass
-            
-            return result
-        return wrapper
-    return decorator
+    def __init__(self):
+        self.degraded = False
 
 
-def get_similar_cached_complaints(text: str, category: str, limit: int = 3):
-    """Retrieve similar complaints from cache"""
-    cache_key = f"similar:{category}"
-    try:
-        cached = redis_client.get(cache_key)
-        if cached:
-            return json.loads(cached)[:limit]
-    except Exception:
-        pass
-    return []
+current_outcome: ContextVar[Optional[CallOutcome]] = ContextVar("current_outcome", default=None)
 
 
-def cache_clear(pattern: str = None):
-    """Clear specific cache entries"""
-    try:
-        if pattern:
-            keys = redis_client.keys(f"{pattern}:*")
-            if keys:
-                redis_client.delete(*keys)
-        return True
-    except Exception as e:
-        print(f"⚠ Cache clear failed: {e}")
-        return False
+def mark_degraded():
+    """The current result is a fallback (LLM failed or was skipped): don't cache it"""
+    outcome = current_outcome.get()
+    if outcome is not None:
+        outcome.degraded = True
+
+
+# Set by jobs that need answers from the current rules and models (the
+# backfill): cached entries are not read, but fresh results are still stored
+cache_bypass: ContextVar[bool] = ContextVar("cache_bypass", default=False)
 
 
 # Statistics for cache performance
@@ -103,16 +79,29 @@ class CacheStats:
         self.hits = 0
         self.misses = 0
         self.total_time_saved = 0.0  # in seconds
-    
-    def record_hit(self, time_saved: float = 1.0):
+        self.hits_by_tier: Dict[str, int] = {}
+        self.by_prefix: Dict[str, Dict[str, int]] = {}
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0  # refresh degraded or raised; the stale entry was kept
+        self.degraded_skipped = 0  # degraded results returned but not stored
+
+    def record_hit(self, time_saved: float = 1.0, tier: str = "local", prefix: str = None, stale: bool = False):
         """Record a cache hit"""
         self.hits += 1
         self.total_time_saved += time_saved
-    
-    def record_miss(self):
+        self.hits_by_tier[tier] = self.hits_by_tier.get(tier, 0) + 1
+        if stale:
+            self.stale_hits += 1
+        if prefix:
+            self.by_prefix.setdefault(prefix, {"hits": 0, "misses": 0})["hits"] += 1
+
+    def record_miss(self, prefix: str = None):
         """Record a cache miss"""
         self.misses += 1
-    
+        if prefix:
+            self.by_prefix.setdefault(prefix, {"hits": 0, "misses": 0})["misses"] += 1
+
     def get_stats(self):
         """Get cache statistics"""
         total = self.hits + self.misses
@@ -121,7 +110,320 @@ class CacheStats:
             "hits": self.hits,
             "misses": self.misses,
             "hit_rate": f"{hit_rate:.2f}%",
-            "total_time_saved": f"{self.total_time_saved:.2f}s"
+            "total_time_saved": f"{self.total_time_saved:.2f}s",
+            "hits_by_tier": dict(self.hits_by_tier),
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "degraded_skipped": self.degraded_skipped,
+            "by_prefix": {prefix: dict(counts) for prefix, counts in self.by_prefix.items()},
         }
 
-cache_stats = CacheStats()
\ No newline at end of file
+cache_stats = CacheStats()
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    cost: float  # seconds the call took to compute it
+    fresh_until: float  # wall clock; served stale (and refreshed) after this
+    stale_until: float  # wall clock; gone after this
+
+    def as_json(self) -> str:
+        return json.dumps({"value": self.value, "cost": round(self.cost, 3),
+                           "fresh_until": self.fresh_until, "stale_until": self.stale_until})
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CacheEntry":
+        data = json.loads(raw)
+        return cls(data["value"], data.get("cost", 0.0), data["fresh_until"], data["stale_until"])
+
+
+class LRUCache:
+    """Bounded in-process tier: least recently used entries go first, expired ones on read"""
+
+    def __init__(self, max_size: int = CACHE_LOCAL_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[CacheEntry, float]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Tuple[CacheEntry, float]]:
+        """(entry, recheck_at) or None; recheck_at is when to look in Redis again"""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if item[0].stale_until <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return item
+
+    def set(self, key: str, entry: CacheEntry):
+        self._entries[key] = (entry, min(entry.fresh_until, time.time() + CACHE_LOCAL_TTL))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisTier:
+    """Optional shared tier; any Redis error disables it for CACHE_REDIS_RETRY seconds"""
+
+    def __init__(self, enabled: bool = CACHE_REDIS):
+        self.enabled = enabled
+        self._client = None
+        self._down_until = 0.0
+        self.errors = 0
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._down_until
+
+    def _connect(self):
+        if not self.available:
+            return None
+        if self._client is None:
+            self._client = get_async_redis_client()
+            if self._client is None:
+                self.enabled = False
+        return self._client
+
+    def _failed(self, action: str, e: Exception):
+        self.errors += 1
+        self._down_until = time.monotonic() + CACHE_REDIS_RETRY
+        print(f"⚠ Cache {action} failed, skipping Redis for {CACHE_REDIS_RETRY:.0f}s: {e}")
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        client = self._connect()
+        if client is None:
+            return None
+        try:
+            cached = await client.get(key)
+        except Exception as e:
+            self._failed("retrieval", e)
+            return None
+        if not cached:
+            return None
+        try:
+            return CacheEntry.from_json(cached)
+        except (ValueError, KeyError):
+            return None  # written by an older version
+
+    async def set(self, key: str, entry: CacheEntry):
+        client = self._connect()
+        if client is None:
+            return
+        try:
+            await client.setex(key, max(1, int(entry.stale_until - time.time())), entry.as_json())
+        except Exception as e:
+            self._failed("storage", e)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        client = self._connect()
+        if client is None:
+            return 0
+        try:
+            keys = [key async for key in client.scan_iter(match=f"{prefix}*")]
+            if keys:
+                await client.delete(*keys)
+            return len(keys)
+        except Exception as e:
+            self._failed("clear", e)
+            return 0
+
+    async def close(self):
+        if self._client is not None:
+            try:
+                await self._client.aclose()
+            except Exception:
+                pass
+            self._client = None
+
+
+class NegativeCache:
+    """Recently failed prompt keys, so a degraded provider is not asked the same thing again"""
+
+    def __init__(self, ttl: float = NEGATIVE_CACHE_TTL, max_size: int = NEGATIVE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.added = 0
+
+    def __contains__(self, key: str) -> bool:
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[key]
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, key: str):
+        if self.ttl <= 0:
+            return
+        self._until.pop(key, None)
+        self._until[key] = time.monotonic() + self.ttl
+        self.added += 1
+        while len(self._until) > self.max_size:
+            self._until.popitem(last=False)  # oldest failure first
+
+    def get_stats(self):
+        now = time.monotonic()
+        return {
+            "ttl": self.ttl,
+            "active": sum(1 for until in self._until.values() if until > now),
+            "added": self.added,
+            "hits": self.hits,
+        }
+
+
+local_cache = LRUCache()
+negative_cache = NegativeCache()
+redis_cache = RedisTier()
+_cache_flight = SingleFlight()
+_refreshing = set()  # background refresh tasks, kept referenced until done
+
+
+async def cache_get(key: str, prefix: str = None) -> Optional[Tuple[Any, bool]]:
+    """
+    Look a key up in both tiers (promoting Redis hits to the local tier).
+    Returns (value, stale) or None on a miss.
+    """
+    now = time.time()
+    local = local_cache.get(key)
+    if local is not None and now < local[1]:
+        cache_stats.record_hit(local[0].cost, tier="local", prefix=prefix)
+        return local[0].value, False
+
+    remote = await redis_cache.get(key)
+    if remote is not None and now < remote.stale_until:
+        if local is None or remote.fresh_until >= local[0].fresh_until:
+            local_cache.set(key, remote)
+            cache_stats.record_hit(remote.cost, tier="redis", prefix=prefix, stale=now >= remote.fresh_until)
+            return remote.value, now >= remote.fresh_until
+
+    if local is not None:
+        entry = local[0]
+        local_cache.set(key, entry)  # nothing newer in Redis: re-arm the recheck
+        cache_stats.record_hit(entry.cost, tier="local", prefix=prefix, stale=now >= entry.fresh_until)
+        return entry.value, now >= entry.fresh_until
+
+    cache_stats.record_miss(prefix=prefix)
+    return None
+
+
+async def cache_set(key: str, value: Any, expiry: int = CACHE_EXPIRY, cost: float = 0.0,
+                    stale: int = CACHE_STALE_TTL):
+    now = time.time()
+    entry = CacheEntry(value, cost, now + expiry, now + expiry + stale)
+    local_cache.set(key, entry)
+    await redis_cache.set(key, entry)
+
+
+def _background(coro):
+    task = asyncio.ensure_future(coro)
+    _refreshing.add(task)
+    task.add_done_callback(_refreshing.discard)
+
+
+def cache_response(prefix: str, version: str = "v1", expiry: int = CACHE_EXPIRY, stale: int = CACHE_STALE_TTL):
+    """
+    Decorator to cache an async agent's result in both tiers.
+    The key covers every argument (normalized), so agents taking
+    (category, text) are cached per category. Results must be JSON-serializable.
+    Stale entries are served for `stale` seconds while being refreshed.
+    Lookups are skipped while `cache_bypass` is set.
+    """
+    namespace = f"agent:{prefix}:{version}"
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return await func(*args, **kwargs)
+            parts = [str(a) for a in args] + [f"{k}={v}" for k, v in sorted(kwargs.items())]
+            key = generate_cache_key(namespace, "\x1f".join(parts))
+
+            async def compute():
+                outcome = CallOutcome()
+                current_outcome.set(outcome)  # this task's own context
+                started = time.perf_counter()
+                result = await func(*args, **kwargs)
+                if outcome.degraded:
+                    cache_stats.degraded_skipped += 1
+                else:
+                    await cache_set(key, result, expiry, time.perf_counter() - started, stale)
+                return result, outcome.degraded
+
+            hit = None if cache_bypass.get() else await cache_get(key, prefix=prefix)
+            if hit is not None:
+                value, is_stale = hit
+                if is_stale:
+                    _background(refresh(key, compute))
+                return value
+
+            result, degraded = (await _cache_flight.do(key, compute))[0]
+            if degraded:
+                mark_degraded()  # nested cached calls must not store it either
+            return result
+        return wrapper
+    return decorator
+
+
+async def refresh(key: str, compute):
+    """Background refresh of a stale entry; a failure keeps serving the old value"""
+    from app.agents.llm_limiter import llm_priority
+    from app.agents.usage_tracker import current_usage
+
+    # Not part of the request that found the stale entry
+    llm_priority.set("Low")
+    current_usage.set(None)
+    cache_stats.refreshes += 1
+    try:
+        _, degraded = (await _cache_flight.do(key, compute))[0]
+    except Exception as e:
+        print(f"⚠ Cache refresh failed: {e}")
+        degraded = True
+    if degraded:
+        cache_stats.refresh_failures += 1
+
+
+async def cache_clear(pattern: str = None) -> int:
+    """Clear entries of one agent prefix (e.g. "classifier"), or every agent entry"""
+    prefix = f"agent:{pattern}:" if pattern else "agent:"
+    return local_cache.delete_prefix(prefix) + await redis_cache.delete_prefix(prefix)
+
+
+def get_cache_stats():
+    """Hit rates plus the state of both tiers"""
+    return {
+        **cache_stats.get_stats(),
+        "local": {
+            "size": len(local_cache),
+            "max_size": local_cache.max_size,
+            "ttl": CACHE_LOCAL_TTL,
+            "evictions": local_cache.evictions,
+            "expirations": local_cache.expirations,
+        },
+        "redis": {
+            "enabled": redis_cache.enabled,
+            "available": redis_cache.available,
+            "errors": redis_cache.errors,
+        },
+        "ttl": CACHE_EXPIRY,
+        "stale_ttl": CACHE_STALE_TTL,
+        "refreshing": len(_refreshing),
+        "negative": negative_cache.get_stats(),
+    }
@@ -1,16 +1,6 @@
 from app.agents.gemini_client import async_ask_gemini
 from app.agents.orchestrator import run_agent_pipeline
-import sys
-import os
-
-# Import training data
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'Training_data'))
-try:
-    from training_data import CLASSIFICATION_EXAMPLES, SENTIMENT_EXAMPLES, RESPONSE_TEMPLATES
-except ImportError:
-    CLASSIFICATION_EXAMPLES = ""
-    SENTIMENT_EXAMPLES = ""
-    RESPONSE_TEMPLATES = {}
+from app.agents.training_data import CLASSIFICATION_EXAMPLES, SENTIMENT_EXAMPLES, RESPONSE_TEMPLATES
 
 async def handle_chat_message(message: str) -> dict:
     """
@@ -36,7 +26,7 @@ Rules:
 Only return ONE word.
 """
     try:
-        intent_res = await async_ask_gemini(intent_prompt)
+        intent_res = await async_ask_gemini(intent_prompt, agent="chat")
         intent = intent_res.upper()
     except:
         intent = "QUESTION"
@@ -55,7 +45,7 @@ You are an AI assistant for Quickfix, a Customer Complaint Management website.
 
 User question:
 {message}
-""")
+""", agent="chat")
         return {"role": "agent", "type": "info", "response": answer}
 
     # If it's a complaint, run the full pipeline
@@ -1,21 +1,16 @@
-import sys
-import os
 from app.agents.gemini_client import async_ask_gemini
-
-# Import training data
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'Training_data'))
-try:
-    from training_data import CLASSIFICATION_EXAMPLES, CATEGORY_KEYWORDS
-except ImportError:
-    CLASSIFICATION_EXAMPLES = ""
-    CATEGORY_KEYWORDS = {}
+from app.agents.cache_layer import cache_response
+from app.agents.training_data import CLASSIFICATION_EXAMPLES
+from app.agents.keyword_engine import scan_keywords
+from app.ml.text_classifier import classify_locally
 
 def fallback_classify(text: str) -> str:
-    text = text.lower()
-    for cat, keywords in CATEGORY_KEYWORDS.items():
-        if any(w in text for w in keywords):
-            return cat
-    return "Other"
+    """Category with the most keyword hits, or Other"""
+    return scan_keywords(text or "").top("category") or "Other"
+
+# Bump when the prompt changes, so cached categories from the old prompt are not reused
+# (v3: only LLM answers are cached)
+PROMPT_VERSION = "v3"
 
 async def classify_complaint(text: str) -> str:
     if not text or not text.strip():
@@ -26,7 +21,18 @@ async def classify_complaint(text: str) -> str:
     if heuristic_res != "Other":
         return heuristic_res
 
-    # Step 2: AI-based classification (Nuanced)
+    # Step 2: Local model, when it is confident (Fast)
+    local_res = classify_locally("category", text)
+    if local_res is not None:
+        return local_res
+
+    # Step 3: AI-based classification (Nuanced)
+    return await classify_with_llm(text)
+
+# Steps 1-2 are cheap and change with the keyword lists and online model
+# updates, so they run on every call; only the LLM answer is cached
+@cache_response("classifier", version=PROMPT_VERSION)
+async def classify_with_llm(text: str) -> str:
     prompt = f"""
 {CLASSIFICATION_EXAMPLES}
 
@@ -39,7 +45,7 @@ Complaint:
 Return only the category name.
 """
     try:
-        result = await async_ask_gemini(prompt)
+        result = await async_ask_gemini(prompt, agent="classifier")
         allowed = {"Billing", "Technical", "Delivery", "Service", "Security", "Other"}
         filtered_res = result.strip().split('\n')[0].replace('.', '').strip()
         return filtered_res if filtered_res in allowed else fallback_classify(text)
@@ -1,12 +1,34 @@
-from app.agents.gemini_client import async_ask_gemini
+import os
+from typing import Dict, List
+from app.ml.similarity_index import similarity_index
+from app.agents.cache_layer import cache_response
 
+# The index keeps growing, so matches are only reused for a short while
+SIMILAR_CACHE_TTL = int(os.getenv("SIMILAR_CACHE_TTL", "300"))
+# ...and served stale (while refreshed) only briefly, not the agents' 24h default
+SIMILAR_CACHE_STALE = int(os.getenv("SIMILAR_CACHE_STALE", "60"))
+
+def format_similar(matches: List[Dict]) -> str:
+    """Render index matches as the bullet list stored in similar_complaints"""
+    if not matches:
+        return "No similar issues found."
+    lines = []
+    for match in matches:
+        status = "Resolved" if match["is_resolved"] else "Open"
+        line = f"- {match['ticket_id']} ({status}): {match['subject'] or 'No subject'}"
+        if match["solution"]:
+            line += f" → Resolution: {match['solution']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+@cache_response("matcher", version="v1", expiry=SIMILAR_CACHE_TTL, stale=SIMILAR_CACHE_STALE)
 async def find_similar_complaints(text: str, category: str) -> str:
+    """Top-k real tickets in the same category, from the local similarity index"""
     if not text or not text.strip():
         return "No similar issues found."
 
-    prompt = f"Based on this complaint, what are common similar issues we typically see? Category: {category} Complaint: {text}. List 2-3 similar complaint patterns we typically encounter, in brief bullet points."
     try:
-        result = await async_ask_gemini(prompt)
-        return result.strip() if result else "No similar issues found."
-    except:
+        return format_similar(similarity_index.search(text, category))
+    except Exception as e:
+        print(f"⚠ Similarity search failed: {e}")
         return "No similar issues found."
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import random
+import re
+from types import SimpleNamespace
+
+# ========================================
+# FAKE LLM BACKEND (LLM_BACKEND=fake)
+# ========================================
+# In-process stand-in for genai.GenerativeModel used for load testing and
+# offline development: no network, configurable latency, injected 503/429
+# errors and canned answers per prompt type (classification, sentiment,
+# response, solution, satisfaction, fused JSON, chat intent).
+
+# Latency distribution: "fixed:<s>", "uniform:<lo>:<hi>" or "lognormal:<median>:<sigma>"
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal:0.8:0.5")
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_429_RATE = float(os.getenv("FAKE_LLM_429_RATE", "0"))
+# Comma-separated models that are FAKE_LLM_SLOW_FACTOR times slower (for routing tests)
+FAKE_LLM_SLOW_MODELS = {m.strip() for m in os.getenv("FAKE_LLM_SLOW_MODELS", "").split(",") if m.strip()}
+FAKE_LLM_SLOW_FACTOR = float(os.getenv("FAKE_LLM_SLOW_FACTOR", "3"))
+
+CATEGORY_HINTS = {
+    "Billing": ["bill", "charge", "refund", "payment", "invoice", "price"],
+    "Technical": ["error", "crash", "login", "app", "bug", "website", "password"],
+    "Delivery": ["deliver", "package", "shipping", "courier", "order", "parcel"],
+    "Security": ["hack", "fraud", "unauthorized", "breach", "stolen", "scam"],
+    "Service": ["staff", "rude", "support", "agent", "service", "wait"],
+}
+ANGRY_HINTS = ["angry", "furious", "worst", "unacceptable", "ridiculous", "!!"]
+NEGATIVE_HINTS = ["not", "never", "disappointed", "bad", "problem", "issue", "still"]
+
+
+def parse_latency(spec: str):
+    """Build a sampler (returns seconds) from a FAKE_LLM_LATENCY spec"""
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda: params[0]
+    if kind == "uniform":
+        return lambda: random.uniform(params[0], params[1])
+    if kind == "lognormal":
+        median, sigma = params
+        return lambda: random.lognormvariate(0.0, sigma) * median
+    raise ValueError(f"Unknown FAKE_LLM_LATENCY distribution: {spec}")
+
+
+def _complaint_text(prompt: str) -> str:
+    match = re.search(r"(?:Complaint|Text|Message|Response):\s*(.*)", prompt, re.S)
+    return (match.group(1) if match else prompt).lower()
+
+
+def _category(text: str) -> str:
+    scores = {c: sum(word in text for word in words) for c, words in CATEGORY_HINTS.items()}
+    best = max(scores, key=scores.get)
+    return best if scores[best] else "Other"
+
+
+def _sentiment(text: str) -> str:
+    if any(word in text for word in ANGRY_HINTS):
+        return "Angry"
+    if any(word in text for word in NEGATIVE_HINTS):
+        return "Negative"
+    return "Neutral"
+
+
+def canned_answer(prompt: str, generation_config: dict = None) -> str:
+    """Plausible output for each prompt type used by the agents"""
+    text = _complaint_text(prompt)
+    category = _category(text)
+    response = ("We are sorry for the trouble with your request. Our team is looking into it "
+                "and will update you shortly. Thank you for your patience.")
+    solution = f"Our {category.lower()} team will review your case and resolve it within 24 hours."
+
+    if (generation_config or {}).get("response_schema") or "ONE JSON object" in prompt:
+        return json.dumps({
+            "category": category,
+            "sentiment": _sentiment(text),
+            "response": response,
+            "solution": solution,
+            "similar_issues": f"- Recurring {category.lower()} issue\n- Delayed follow-up on earlier ticket",
+            "satisfaction": "Medium",
+        })
+    if "COMPLAINT or QUESTION" in prompt:
+        return "COMPLAINT" if category != "Other" else "QUESTION"
+    if "Classify this complaint" in prompt:
+        return category
+    if "emotional sentiment" in prompt:
+        return _sentiment(text)
+    if "predict customer satisfaction" in prompt:
+        return random.choice(["High", "Medium", "Medium", "Low"])
+    if "solution expert" in prompt:
+        return solution
+    if "customer support assistant" in prompt:
+        return response
+    return "This is a placeholder answer from the fake LLM backend."
+
+
+class FakeLLMError(Exception):
+    pass
+
+
+def _error(status: int, message: str) -> Exception:
+    """The google.api_core exception Gemini would raise, if the package is available"""
+    try:
+        from google.api_core import exceptions
+        return (exceptions.ResourceExhausted if status == 429 else exceptions.ServiceUnavailable)(message)
+    except ImportError:
+        return FakeLLMError(f"{status} {message}")
+
+
+def _response(text: str, prompt: str, generated: str = None):
+    # Like Gemini, streamed chunks report the cumulative usage so far
+    generated = text if generated is None else generated
+    usage = SimpleNamespace(
+        prompt_token_count=len(prompt) // 4,
+        candidates_token_count=len(generated) // 4,
+        total_token_count=len(prompt) // 4 + len(generated) // 4,
+    )
+    return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel.generate_content_async"""
+
+    def __init__(self, model_name: str, latency: str = None, error_rate: float = None, rate_429: float = None):
+        self.model_name = f"models/{model_name}"
+        self._sample = parse_latency(latency or FAKE_LLM_LATENCY)
+        self.error_rate = FAKE_LLM_ERROR_RATE if error_rate is None else error_rate
+        self.rate_429 = FAKE_LLM_429_RATE if rate_429 is None else rate_429
+        self.slow = FAKE_LLM_SLOW_FACTOR if model_name in FAKE_LLM_SLOW_MODELS else 1.0
+
+    async def _maybe_fail(self, latency: float):
+        roll = random.random()
+        if roll < self.rate_429:
+            await asyncio.sleep(latency * 0.1)
+            raise _error(429, "Resource has been exhausted (fake quota)")
+        if roll < self.rate_429 + self.error_rate:
+            await asyncio.sleep(latency * 0.5)
+            raise _error(503, "The service is currently unavailable (fake)")
+
+    async def generate_content_async(self, prompt: str, generation_config: dict = None, stream: bool = False, **kwargs):
+        latency = self._sample() * self.slow
+        await self._maybe_fail(latency)
+        text = canned_answer(prompt, generation_config)
+        if stream:
+            return self._stream(text, prompt, latency)
+        await asyncio.sleep(latency)
+        return _response(text, prompt)
+
+    async def _stream(self, text: str, prompt: str, latency: float):
+        # Time to first token is ~30% of the total, the rest is spread over the chunks
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + 4]) + " " for i in range(0, len(words), 4)]
+        await asyncio.sleep(latency * 0.3)
+        generated = ""
+        for chunk in chunks:
+            await asyncio.sleep(latency * 0.7 / len(chunks))
+            generated += chunk
+            yield _response(chunk, prompt, generated)
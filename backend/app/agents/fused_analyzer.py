@@ -0,0 +1,98 @@
+import json
+import re
+from typing import Dict, List, Tuple
+from app.agents.gemini_client import async_ask_gemini
+from app.agents.response_validation import (
+    ResponseValidator,
+    VALID_CATEGORIES,
+    VALID_SENTIMENTS,
+    VALID_SATISFACTION,
+)
+
+# ========================================
+# FUSED SINGLE-CALL ANALYSIS
+# ========================================
+# Asks Gemini for every analysis field in one schema-constrained JSON call
+# instead of one round-trip per agent.
+
+FUSED_FIELDS = ("category", "sentiment", "response", "solution", "similar_issues", "satisfaction")
+
+FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string", "enum": sorted(VALID_CATEGORIES)},
+        "sentiment": {"type": "string", "enum": sorted(VALID_SENTIMENTS)},
+        "response": {"type": "string"},
+        "solution": {"type": "string"},
+        "similar_issues": {"type": "string"},
+        "satisfaction": {"type": "string", "enum": sorted(VALID_SATISFACTION)},
+    },
+    "required": list(FUSED_FIELDS),
+}
+
+FUSED_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": FUSED_SCHEMA,
+}
+
+
+def build_fused_prompt(text: str, priority: str) -> str:
+    return f"""You are a professional customer support analyst.
+Analyze the complaint below and return ONE JSON object with these fields:
+- category: one of Billing, Technical, Delivery, Service, Security, Other
+- sentiment: one of Positive, Neutral, Negative, Angry
+- response: a polite, professional and reassuring reply in 2-3 sentences
+- solution: ONE specific, actionable solution in 1-2 sentences
+- similar_issues: 2-3 similar complaint patterns we typically encounter, as brief bullet points
+- satisfaction: predicted customer satisfaction with the response, one of High, Medium, Low
+
+Priority: {priority}
+Complaint:
+{text}"""
+
+
+def parse_fused_output(raw: str) -> Dict:
+    """Parse the model output into a dict, tolerating markdown code fences."""
+    if not raw:
+        return {}
+    cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+    try:
+        data = json.loads(cleaned)
+    except (ValueError, TypeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def validate_fused_output(data: Dict, priority: str) -> Tuple[Dict, List[str]]:
+    """
+    Validate the fused result with ResponseValidator.
+    Returns (fields, invalid_fields) where invalid_fields must be regenerated.
+    """
+    candidate = {
+        field: data[field].strip()
+        for field in FUSED_FIELDS
+        if isinstance(data.get(field), str) and data[field].strip()
+    }
+    candidate["priority"] = priority
+    _, validated = ResponseValidator.validate_full_response(candidate)
+
+    invalid = [f for f in validated["invalid_fields"] if f in FUSED_FIELDS]
+    for field in ("solution", "similar_issues", "satisfaction"):
+        if field not in candidate and field not in invalid:
+            invalid.append(field)
+
+    fields = {f: validated[f] for f in FUSED_FIELDS if f in validated and f not in invalid}
+    return fields, invalid
+
+
+async def fused_analyze(text: str, priority: str) -> Tuple[Dict, List[str]]:
+    """Run the fused analysis call. Never raises; failed fields are reported as invalid."""
+    try:
+        raw = await async_ask_gemini(
+            build_fused_prompt(text, priority),
+            generation_config=FUSED_GENERATION_CONFIG,
+            agent="fused",
+        )
+    except Exception:
+        raw = ""
+    return validate_fused_output(parse_fused_output(raw), priority)
@@ -1,14 +1,50 @@
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
+from app.agents.llm_limiter import llm_limiter, llm_priority, estimate_tokens
+from app.agents.model_health import ModelRouter
+from app.agents.hedging import request_hedger
+from app.agents.fake_llm import FakeGenerativeModel
+from app.agents.usage_tracker import record_usage
+from app.agents.cache_layer import generate_cache_key, mark_degraded, negative_cache
 
 load_dotenv()
 
+# "gemini" (default) or "fake" for the offline stand-in in fake_llm.py
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+
 API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not set")
 
-genai.configure(api_key=API_KEY)
+# google.generativeai takes most of the app's import time, so it is only
+# imported and configured on first use (or by warm_up() at startup)
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    """The configured google.generativeai module; raises if GEMINI_API_KEY is missing"""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                if not API_KEY:
+                    raise RuntimeError("GEMINI_API_KEY not set")
+                import google.generativeai as genai
+                genai.configure(api_key=API_KEY)
+                _genai = genai
+    return _genai
+
+def warm_up():
+    """Import the SDK and build the default client ahead of the first request"""
+    if LLM_BACKEND == "fake":
+        return
+    try:
+        started = time.perf_counter()
+        gemini_clients.get()
+        print(f"🤖 Gemini client ready in {time.perf_counter() - started:.2f}s")
+    except RuntimeError as e:
+        print(f"⚠ LLM disabled until configured: {e}")
 
 # ✅ List of supported models for fallback
 # We try these in order and use the first one that works.
@@ -25,41 +61,189 @@ SUPPORTED_MODELS = [
     "deep-research-pro-preview-12-2025"
 ]
 
+class GeminiClientRegistry:
+    """One GenerativeModel per model name, shared by every agent"""
+
+    def __init__(self, default_model: str = SUPPORTED_MODELS[0]):
+        self.default_model = default_model
+        self._models = {}
+
+    def get(self, model_name: str = None):
+        model_name = model_name or self.default_model
+        if model_name not in self._models:
+            if LLM_BACKEND == "fake":
+                self._models[model_name] = FakeGenerativeModel(model_name)
+            else:
+                self._models[model_name] = get_genai().GenerativeModel(model_name)
+        return self._models[model_name]
+
+
+gemini_clients = GeminiClientRegistry()
+
 def get_model():
-    """Returns a generative model instance by trying multiple versions."""
-    for model_name in SUPPORTED_MODELS:
-        try:
-            m = genai.GenerativeModel(model_name)
-            # Minimal check to see if the model name is accepted
-            return m
-        except Exception:
-            continue
-    return genai.GenerativeModel("gemini-2.5-flash") # Absolute fallback
+    """Returns the shared default generative model."""
+    return gemini_clients.get()
 
-model = get_model()
+# Models the router may use, in preference order when nothing is known yet
+LLM_MODELS = [m.strip() for m in os.getenv("LLM_MODELS", "").split(",") if m.strip()] or (
+    SUPPORTED_MODELS + ["gemini-2.5-flash", "gemini-1.5-flash"]
+)
+# Models tried per async_ask_gemini call before giving up
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
 
-async def async_ask_gemini(prompt: str) -> str:
-    """Asynchronous version of GEMINI request for high performance scaling."""
+model_router = ModelRouter(LLM_MODELS)
+
+def _choose_model(model_name: str = None) -> str:
+    if model_name:
+        return model_name
+    if LLM_BACKEND != "fake":
+        get_genai()  # fail fast when unconfigured, before touching model health
+    model_name = model_router.choose()
+    if model_name is None:
+        raise RuntimeError("All Gemini models are unavailable (circuits open)")
+    return model_name
+
+async def generate_content(prompt: str, generation_config: dict = None, agent: str = None,
+                           priority: str = None, model_name: str = None):
+    """
+    Single Gemini call through the shared concurrency/rate limiter.
+    Goes to the fastest healthy model unless `model_name` (from
+    model_router.choose) is given; a half-open probe that ends before its
+    call is sent is released for the next caller.
+    Raises on failure; `priority` defaults to the current complaint's priority.
+    """
+    model_name = _choose_model(model_name)
+    probe = model_router.is_probe(model_name)
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if response and response.text:
-            return response.text.strip()
-            
-        return "I couldn’t generate a response right now."
-
-    except Exception as e:
-        print(f"⚠ Async Gemini error with {model.model_name}:", e)
-        try:
-            # Fallback for speed
-            fallback_m = genai.GenerativeModel("gemini-1.5-flash")
-            res = await fallback_m.generate_content_async(prompt)
-            if res and res.text:
-                return res.text.strip()
-        except:
-            pass
+        m = gemini_clients.get(model_name)
+        async with llm_limiter.slot(priority or llm_priority.get(), estimate_tokens(prompt), agent):
+            started = time.perf_counter()
+            try:
+                response = await m.generate_content_async(prompt, generation_config=generation_config)
+            except asyncio.CancelledError:
+                model_router.record_cancel(model_name, time.perf_counter() - started)
+                raise
+            except Exception:
+                model_router.record_failure(model_name, time.perf_counter() - started)
+                raise
+            model_router.record_success(model_name, time.perf_counter() - started)
+            record_usage(agent, response)
+            return response
+    finally:
+        # No-op once an outcome is recorded; frees a probe that never got a slot
+        if probe:
+            model_router.release(model_name)
+
+async def stream_content(prompt: str, agent: str = None, priority: str = None, model_name: str = None):
+    """Streamed Gemini call; yields text chunks and holds a limiter slot until done."""
+    model_name = _choose_model(model_name)
+    probe = model_router.is_probe(model_name)
+    try:
+        m = gemini_clients.get(model_name)
+        async with llm_limiter.slot(priority or llm_priority.get(), estimate_tokens(prompt), agent):
+            started = time.perf_counter()
+            try:
+                response = await m.generate_content_async(prompt, stream=True)
+                last_chunk = None
+                async for chunk in response:
+                    last_chunk = chunk
+                    if chunk.text:
+                        yield chunk.text
+            except (asyncio.CancelledError, GeneratorExit):
+                model_router.record_cancel(model_name, time.perf_counter() - started)
+                raise
+            except Exception:
+                model_router.record_failure(model_name, time.perf_counter() - started)
+                raise
+            model_router.record_success(model_name, time.perf_counter() - started)
+            # The final chunk carries the usage totals for the whole stream
+            record_usage(agent, last_chunk)
+    finally:
+        if probe:
+            model_router.release(model_name)
+
+async def hedged_generate_content(prompt: str, generation_config: dict = None, agent: str = None,
+                                  priority: str = None, model_name: str = None):
+    """
+    generate_content, plus a duplicate call to the next-best model if the
+    first one is slower than its recent latency percentile (see hedging.py).
+    The first successful answer wins and the other call is cancelled.
+    """
+    model_name = _choose_model(model_name)
+    # A leg cancelled before its task first runs never reaches generate_content's cleanup
+    probes = [model_name] if model_router.is_probe(model_name) else []
+    tasks = []
+    try:
+        delay = request_hedger.delay_for(model_router.health(model_name))
+        primary = asyncio.ensure_future(generate_content(prompt, generation_config, agent, priority, model_name))
+        tasks.append(primary)
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+
+        # Peek first: choose() would make an open backup the half-open probe
+        # even when the hedge is then refused and never sent
+        if not model_router.ranked(exclude=[model_name]) or not request_hedger.try_spend(saturated=llm_limiter.queued > 0):
+            return await primary
+        backup_model = model_router.choose(exclude=[model_name])
+        if model_router.is_probe(backup_model):
+            probes.append(backup_model)
+        tasks.append(asyncio.ensure_future(generate_content(prompt, generation_config, agent, priority, backup_model)))
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        request_hedger.record_win()
+                    return task.result()
+        raise primary.exception()  # both failed
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        for name in probes:
+            model_router.release(name)
+
+async def async_ask_gemini(prompt: str, generation_config: dict = None, agent: str = None, priority: str = None) -> str:
+    """
+    Asynchronous version of GEMINI request for high performance scaling.
+    Pass `generation_config` (e.g. a JSON response_mime_type/response_schema)
+    to constrain the output format, and `agent` to attribute the call.
+    A failed call is retried once on the next healthiest model; models with an
+    open circuit are skipped. When every attempt fails the prompt is negatively
+    cached for NEGATIVE_CACHE_TTL seconds, and fallback answers are flagged so
+    the agent cache does not store them.
+    """
+    failure_key = generate_cache_key("llm_failed", f"{prompt}\x1f{generation_config}")
+    if failure_key in negative_cache:
+        mark_degraded()
         return "AI service is temporarily unavailable."
 
+    tried = []
+    for _ in range(LLM_MAX_ATTEMPTS):
+        model_name = model_router.choose(exclude=tried)
+        if model_name is None:
+            break
+        tried.append(model_name)
+        try:
+            response = await hedged_generate_content(prompt, generation_config, agent, priority, model_name)
+
+            if response and response.text:
+                return response.text.strip()
+
+            mark_degraded()
+            return "I couldn’t generate a response right now."
+
+        except Exception as e:
+            print(f"⚠ Async Gemini error with {model_name}:", e)
+    negative_cache.add(failure_key)
+    mark_degraded()
+    return "AI service is temporarily unavailable."
+
 # Test it
 if __name__ == "__main__":
     print(ask_gemini("Hello, are you working?"))
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+from typing import Optional
+from app.agents.model_health import ModelHealth
+
+# ========================================
+# HEDGED REQUESTS
+# ========================================
+# If a Gemini call has not returned by the LLM_HEDGE_PERCENTILE of that
+# model's recent latency, a duplicate goes to the next-best model and the
+# first answer wins. Hedges are paid for from a budget that earns
+# LLM_HEDGE_BUDGET tokens per call, so at most that fraction of traffic is
+# duplicated, even during an outage when every call is slow.
+
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.05"))
+# Successful calls a model needs before its percentile is trusted
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Never hedge sooner than this (seconds)
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.3"))
+# Unused budget carried over, so bursts after a quiet period stay bounded
+MAX_HEDGE_TOKENS = 10.0
+
+
+class RequestHedger:
+    """Decides when to hedge a call and enforces the hedging budget"""
+
+    def __init__(self, enabled: bool = LLM_HEDGE, percentile: float = LLM_HEDGE_PERCENTILE,
+                 budget: float = LLM_HEDGE_BUDGET):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.tokens = 0.0
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.skipped_saturated = 0
+
+    def delay_for(self, health: ModelHealth) -> Optional[float]:
+        """Seconds to wait before hedging a call to this model, or None to not hedge"""
+        if not self.enabled:
+            return None
+        self.calls += 1
+        self.tokens = min(MAX_HEDGE_TOKENS, self.tokens + self.budget)
+        if len(health.recent) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return max(LLM_HEDGE_MIN_DELAY, health.latency_percentile(self.percentile))
+
+    def try_spend(self, saturated: bool = False) -> bool:
+        """Take one hedge from the budget; refused while the limiter queue is backed up"""
+        if saturated:
+            self.skipped_saturated += 1
+            return False
+        if self.tokens < 1:
+            self.budget_denied += 1
+            return False
+        self.tokens -= 1
+        self.hedged += 1
+        return True
+
+    def record_win(self):
+        """The hedge answered before the original call"""
+        self.hedge_wins += 1
+
+    def get_stats(self):
+        """Get hedging statistics"""
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "budget": f"{self.budget * 100:.1f}%",
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": f"{self.hedged / self.calls * 100:.2f}%" if self.calls else "0.00%",
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "skipped_saturated": self.skipped_saturated,
+        }
+
+
+request_hedger = RequestHedger()
@@ -0,0 +1,123 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from app.agents.training_data import CATEGORY_KEYWORDS, PRIORITY_KEYWORDS, SENTIMENT_KEYWORDS
+
+# ========================================
+# KEYWORD ENGINE (AHO-CORASICK)
+# ========================================
+# One automaton over every category, priority and sentiment keyword, built
+# once at import. A scan walks the lowercased text a single time and reports
+# the hits of all three groups, so the heuristic agents together cost
+# O(len(text) + matches) instead of one substring search per keyword.
+# A keyword only matches at the start of a word ("app" matches "apps" but
+# not "happy"); the end is left open so "charge" also matches "charged".
+
+KEYWORD_GROUPS = {
+    "category": CATEGORY_KEYWORDS,
+    "priority": PRIORITY_KEYWORDS,
+    "sentiment": SENTIMENT_KEYWORDS,
+}
+
+
+class KeywordHits:
+    """Result of one scan: per group and label, occurrence counts and distinct keywords matched"""
+
+    def __init__(self, groups: Dict[str, Dict[str, List[str]]]):
+        self.counts = {group: {label: 0 for label in labels} for group, labels in groups.items()}
+        self.keywords = {group: {label: set() for label in labels} for group, labels in groups.items()}
+
+    def distinct(self, group: str) -> Dict[str, int]:
+        """Number of different keywords of each label that matched"""
+        return {label: len(words) for label, words in self.keywords[group].items()}
+
+    def first(self, group: str, order: List[str] = None) -> Optional[str]:
+        """First label (in `order`, default the keyword dict order) with any hit"""
+        counts = self.counts[group]
+        return next((label for label in (order or counts) if counts.get(label)), None)
+
+    def top(self, group: str) -> Optional[str]:
+        """Label with the most hits; ties go to the earlier label"""
+        counts = self.counts[group]
+        best = max(counts, key=counts.get, default=None)
+        return best if best is not None and counts[best] else None
+
+    def as_dict(self) -> Dict:
+        return {group: {label: n for label, n in counts.items() if n} for group, counts in self.counts.items()}
+
+
+class KeywordEngine:
+    """Aho-Corasick automaton over (group, label, keyword) patterns"""
+
+    def __init__(self, groups: Dict[str, Dict[str, List[str]]] = KEYWORD_GROUPS):
+        self.groups = groups
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]  # node -> pattern ids ending here (incl. via fail links)
+        self._patterns: List[Tuple[str, str, str]] = []  # id -> (group, label, keyword)
+        for group, labels in groups.items():
+            for label, words in labels.items():
+                for word in words:
+                    self._add(group, label, word.lower())
+        self._build()
+
+    def _add(self, group: str, label: str, word: str):
+        if not word:
+            return
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self._patterns))
+        self._patterns.append((group, label, word))
+
+    def _build(self):
+        # Breadth-first, so every fail target is finished before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    @property
+    def size(self) -> int:
+        return len(self._patterns)
+
+    def scan(self, text: str) -> KeywordHits:
+        hits = KeywordHits(self.groups)
+        text = (text or "").lower()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pattern_id in out[node]:
+                group, label, word = patterns[pattern_id]
+                start = i - len(word) + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue  # inside another word
+                hits.counts[group][label] += 1
+                hits.keywords[group][label].add(word)
+        return hits
+
+
+keyword_engine = KeywordEngine()
+
+
+@lru_cache(maxsize=1024)
+def scan_keywords(text: str) -> KeywordHits:
+    """Shared scan: the router and every heuristic agent look at the same text, it is scanned once"""
+    return keyword_engine.scan(text)
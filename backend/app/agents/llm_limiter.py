@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+# ========================================
+# LLM CONCURRENCY & RATE LIMITER
+# ========================================
+# Every Gemini call goes through one shared limiter: at most
+# LLM_MAX_CONCURRENCY calls in flight, and token buckets for requests and
+# tokens per minute. Waiting callers are served by complaint priority, so
+# High-priority complaints get capacity first when the queue is saturated.
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Provider quota; 0 disables the bucket
+LLM_RPM = int(os.getenv("LLM_RPM", "60"))
+LLM_TPM = int(os.getenv("LLM_TPM", "1000000"))
+# Output tokens assumed per call when reserving TPM capacity
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "256"))
+
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+
+# Priority of the complaint being analysed; set once by the orchestrator and
+# inherited by every agent task it starts
+llm_priority: ContextVar[str] = ContextVar("llm_priority", default="Medium")
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough prompt + completion token count (~4 characters per token)"""
+    return len(prompt or "") // 4 + LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)"""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        if self.enabled:
+            self.tokens -= min(amount, self.capacity)
+
+
+class LLMLimiter:
+    """Priority-ordered semaphore gated by request and token buckets"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, rpm: int = LLM_RPM, tpm: int = LLM_TPM):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.in_flight = 0
+        self._waiters = []  # heap of (rank, seq, tokens, future)
+        self._seq = itertools.count()
+        self._timer = None
+        self._timer_loop = None
+        # Metrics
+        self.calls = {}  # agent -> count
+        self.waits = {}  # priority -> [count, total_seconds, max_seconds]
+        self.recent_waits = deque(maxlen=1000)
+        self.rate_limited = 0  # calls that had to wait for a bucket refill
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    def _dispatch(self):
+        """Grant slots to the best-ranked waiters while capacity allows"""
+        loop = asyncio.get_running_loop()
+        if self._timer_loop is not loop:
+            self._timer = None  # a timer from a previous event loop never fires
+        while self._waiters and self.in_flight < self.max_concurrency:
+            rank, seq, tokens, future = self._waiters[0]
+            if future.done():  # caller cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            delay = max(self.requests.delay(1), self.tokens.delay(tokens))
+            if delay > 0:
+                if self._timer is None:
+                    self.rate_limited += 1
+                    self._timer = loop.call_later(delay, self._on_timer)
+                    self._timer_loop = loop
+                return
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    async def acquire(self, priority: str = None, tokens: int = 0, agent: str = None) -> float:
+        """Wait for a slot; returns the time spent queued"""
+        priority = priority if priority in PRIORITY_RANK else "Medium"
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITY_RANK[priority], next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # granted just as the caller gave up
+            raise
+        waited = time.perf_counter() - started
+        self._record(priority, agent, waited)
+        return waited
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str = None, tokens: int = 0, agent: str = None):
+        await self.acquire(priority, tokens, agent)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _record(self, priority: str, agent: str, waited: float):
+        agent = agent or "other"
+        self.calls[agent] = self.calls.get(agent, 0) + 1
+        stats = self.waits.setdefault(priority, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2], waited)
+        self.recent_waits.append(waited)
+
+    def get_stats(self):
+        """Get limiter statistics"""
+        recent = sorted(self.recent_waits)
+        p95 = recent[int(len(recent) * 0.95) - 1] if recent else 0.0
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rpm_limit": int(self.requests.capacity),
+            "tpm_limit": int(self.tokens.capacity),
+            "rate_limited": self.rate_limited,
+            "queue_wait": {
+                priority: {
+                    "calls": count,
+                    "avg": f"{total / count * 1000:.1f}ms",
+                    "max": f"{longest * 1000:.1f}ms"
+                }
+                for priority, (count, total, longest) in self.waits.items()
+            },
+            "queue_wait_p95": f"{p95 * 1000:.1f}ms",
+            "calls_by_agent": dict(self.calls),
+        }
+
+
+llm_limiter = LLMLimiter()
@@ -0,0 +1,171 @@
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+# ========================================
+# MODEL HEALTH & ROUTING
+# ========================================
+# Tracks EWMA latency and error rate per Gemini model, with a circuit breaker:
+# after MODEL_BREAKER_FAILURES consecutive failures a model is skipped for a
+# cooldown, then a single half-open probe decides whether it is closed again.
+# A probe that is never sent (cancelled in the limiter queue, setup error)
+# must be released, or the model would stay half-open and skipped for good.
+# Each call goes to the fastest model whose breaker allows it.
+
+MODEL_BREAKER_FAILURES = int(os.getenv("MODEL_BREAKER_FAILURES", "3"))
+MODEL_BREAKER_COOLDOWN = float(os.getenv("MODEL_BREAKER_COOLDOWN", "30"))
+MODEL_BREAKER_MAX_COOLDOWN = float(os.getenv("MODEL_BREAKER_MAX_COOLDOWN", "600"))
+# Latency assumed for a model that has not been called yet (seconds); untried
+# models are only picked once the known ones are slower than this or unhealthy
+MODEL_LATENCY_PRIOR = float(os.getenv("MODEL_LATENCY_PRIOR", "3.0"))
+EWMA_ALPHA = 0.2
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ModelHealth:
+    """Health record and circuit breaker state for one model"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency: Optional[float] = None  # EWMA seconds
+        self.recent = deque(maxlen=200)  # latencies of recent successful calls
+        self.error_rate = 0.0  # EWMA of failures
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown = MODEL_BREAKER_COOLDOWN
+
+    def _observe_latency(self, elapsed: float):
+        self.latency = elapsed if self.latency is None else EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.latency
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        """q-quantile (0-1) of recent successful call latency"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def expected_latency(self) -> float:
+        """EWMA latency of successful calls, inflated by the error rate (failed calls need a retry)"""
+        latency = MODEL_LATENCY_PRIOR if self.latency is None else self.latency
+        return latency / (1 - min(self.error_rate, 0.9))
+
+    def available(self, now: float) -> bool:
+        """Closed, or open with its cooldown over (half-open models already have a probe running)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            return True  # will become half-open when picked
+        return False
+
+    def record_success(self, elapsed: float):
+        self.calls += 1
+        self._observe_latency(elapsed)
+        self.recent.append(elapsed)
+        self.error_rate *= 1 - EWMA_ALPHA
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            print(f"✅ Model {self.name} recovered, closing circuit")
+        self.state = CLOSED
+        self.cooldown = MODEL_BREAKER_COOLDOWN
+
+    def record_failure(self, elapsed: float):
+        self.calls += 1
+        self.failures += 1
+        self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            # Failed probe: back off for longer
+            self.cooldown = min(self.cooldown * 2, MODEL_BREAKER_MAX_COOLDOWN)
+            self._open()
+        elif self.state == CLOSED and self.consecutive_failures >= MODEL_BREAKER_FAILURES:
+            self._open()
+
+    def record_cancel(self, elapsed: float):
+        """Caller gave up (timeout); only counts as a latency lower bound"""
+        if self.latency is None or elapsed > self.latency:
+            self._observe_latency(elapsed)
+        if self.state == HALF_OPEN:
+            self.state = OPEN  # probe inconclusive, allow another one now
+
+    def release(self):
+        """Probe never sent (cancelled while queued, or setup failed); allow another one now"""
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        print(f"🔌 Circuit opened for model {self.name} ({self.consecutive_failures} failures, cooldown {self.cooldown:.0f}s)")
+
+
+class ModelRouter:
+    """Chooses the fastest healthy model for each call"""
+
+    def __init__(self, models: Iterable[str]):
+        self.models: Dict[str, ModelHealth] = {}
+        for name in models:
+            self.models.setdefault(name, ModelHealth(name))
+
+    def health(self, name: str) -> ModelHealth:
+        if name not in self.models:
+            self.models[name] = ModelHealth(name)
+        return self.models[name]
+
+    def ranked(self, exclude: Iterable[str] = ()) -> List[str]:
+        """Available models, fastest expected latency first (stable, so list order breaks ties)"""
+        now = time.monotonic()
+        exclude = set(exclude)
+        candidates = [h for h in self.models.values() if h.name not in exclude and h.available(now)]
+        return [h.name for h in sorted(candidates, key=lambda h: h.expected_latency())]
+
+    def choose(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Pick a model for one call; an open model past its cooldown becomes the half-open probe"""
+        ranked = self.ranked(exclude)
+        if not ranked:
+            return None
+        health = self.models[ranked[0]]
+        if health.state == OPEN:
+            health.state = HALF_OPEN
+        return health.name
+
+    def record_success(self, name: str, elapsed: float):
+        self.health(name).record_success(elapsed)
+
+    def record_failure(self, name: str, elapsed: float):
+        self.health(name).record_failure(elapsed)
+
+    def record_cancel(self, name: str, elapsed: float):
+        self.health(name).record_cancel(elapsed)
+
+    def is_probe(self, name: str) -> bool:
+        """Whether `name` was just chosen as the half-open probe (the caller must record an outcome or release it)"""
+        return self.health(name).state == HALF_OPEN
+
+    def release(self, name: str):
+        self.health(name).release()
+
+    def get_stats(self):
+        """Get per-model health statistics"""
+        now = time.monotonic()
+        return {
+            "preferred": self.ranked()[:1],
+            "models": {
+                h.name: {
+                    "state": h.state,
+                    "ewma_latency": f"{h.latency * 1000:.0f}ms" if h.latency is not None else None,
+                    "error_rate": f"{h.error_rate * 100:.1f}%",
+                    "calls": h.calls,
+                    "failures": h.failures,
+                    "consecutive_failures": h.consecutive_failures,
+                    "retry_in": f"{max(0.0, h.cooldown - (now - h.opened_at)):.0f}s" if h.state == OPEN else None,
+                }
+                for h in self.models.values()
+            }
+        }
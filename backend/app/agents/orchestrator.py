@@ -1,56 +1,349 @@
 import asyncio
-from typing import Dict, List
-from .classifier import classify_complaint
-from .responder import generate_response
+import copy
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from .classifier import classify_complaint, fallback_classify
+from .responder import generate_response, stream_response, RESPONSE_TEMPLATES
 from .priority import detect_priority
 from .action_recommender import recommend_action
 from .sentiment_analyzer import analyze_sentiment
 from .solution_suggester import suggest_solution
 from .satisfaction_predictor import predict_satisfaction
 from .complaint_matcher import find_similar_complaints
+from .fused_analyzer import fused_analyze
+from .agent_graph import AgentNode, run_agent_graph
+from .tier_router import route_complaint, local_analysis, LOCAL
+from .pipeline_metrics import pipeline_metrics
+from .llm_limiter import llm_priority
+from .usage_tracker import track_usage, TicketUsage
+from .single_flight import pipeline_flight
+from .cache_layer import generate_cache_key, current_outcome, CallOutcome
+from app.ml.near_duplicate import near_duplicates, NEAR_DUP_ENABLED, REUSED_FIELDS
 
-async def run_agent_pipeline(text: str):
+# "standard" runs one Gemini call per agent, "fused" asks for everything in one call
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "standard").lower()
+# Start Phase 2 on the heuristic category while the LLM classifier is still running
+PIPELINE_SPECULATIVE = os.getenv("PIPELINE_SPECULATIVE", "false").lower() == "true"
+# Let concurrent identical complaints share one pipeline run
+PIPELINE_SINGLE_FLIGHT = os.getenv("PIPELINE_SINGLE_FLIGHT", "true").lower() == "true"
+# Overall budget for one complaint; slower agents fall back to local defaults
+PIPELINE_DEADLINE = float(os.getenv("PIPELINE_DEADLINE", "25"))
+# Per-agent timeout for LLM-backed agents (seconds)
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", "10"))
+
+# emit(event, data) receives progress events while the pipeline runs
+Emitter = Callable[[str, Dict], Awaitable[None]]
+
+# UI steps, each emitted once all of its fields (and the previous step) are final
+PIPELINE_STEPS = [
+    ("Context Identified", ("category", "priority", "sentiment")),
+    ("Resolutions Generated", ("response", "solution", "similar_issues")),
+    ("Orchestration Complete", ("satisfaction", "action")),
+]
+
+# Fields pushed to streaming clients as soon as they are final
+STREAMED_FIELDS = ("response", "solution", "similar_issues", "satisfaction")
+
+
+async def _emit(emit: Optional[Emitter], event: str, data: Dict):
+    if emit is not None:
+        await emit(event, data)
+
+
+async def _add_step(steps: List[Dict], step: Dict, emit: Optional[Emitter]):
+    steps.append(step)
+    await _emit(emit, "step", step)
+
+
+async def _streamed_response(category: str, text: str, emit: Emitter) -> str:
+    parts = []
+    async for chunk in stream_response(category, text):
+        parts.append(chunk)
+        await emit("response_delta", {"text": chunk})
+    return "".join(parts).strip()
+
+
+def build_agent_graph(emit: Optional[Emitter] = None) -> List[AgentNode]:
+    """
+    The complaint analysis pipeline as a dependency graph.
+    Phase 2 agents may speculate on the heuristic category.
+    """
+    if emit is not None:
+        async def respond(category: str, text: str) -> str:
+            return await _streamed_response(category, text, emit)
+    else:
+        respond = generate_response
+    on_category = {"category": "category_guess"}
+
+    return [
+        AgentNode("category_guess", fallback_classify, inputs=("text",),
+                  fallback="Other"),
+        AgentNode("priority", detect_priority, inputs=("text",),
+                  fallback="Low"),
+        AgentNode("action", recommend_action, inputs=("priority",),
+                  fallback="Escalate to support team"),
+        AgentNode("category", classify_complaint, inputs=("text",), timeout=AGENT_TIMEOUT,
+                  fallback=lambda v: fallback_classify(v["text"])),
+        AgentNode("sentiment", analyze_sentiment, inputs=("text",), timeout=AGENT_TIMEOUT,
+                  fallback="Neutral"),
+        AgentNode("response", respond, inputs=("category", "text"), timeout=AGENT_TIMEOUT,
+                  fallback=lambda v: RESPONSE_TEMPLATES.get(v.get("category"), {}).get("Medium", "We have received your complaint and are looking into it."),
+                  speculate=on_category),
+        AgentNode("solution", suggest_solution, inputs=("category", "text"), timeout=AGENT_TIMEOUT,
+                  fallback="Our team will investigate and follow up within 24 hours.",
+                  speculate=on_category),
+        AgentNode("similar_issues", find_similar_complaints, inputs=("text", "category"), timeout=AGENT_TIMEOUT,
+                  fallback="No similar issues found.",
+                  speculate=on_category),
+        AgentNode("satisfaction", predict_satisfaction, inputs=("response", "priority", "category"), timeout=AGENT_TIMEOUT,
+                  fallback="Medium"),
+    ]
+
+
+class _ProgressTracker:
+    """Turns graph results into streamed field events and UI steps."""
+
+    def __init__(self, steps: List[Dict], values: Dict, emit: Optional[Emitter]):
+        self.steps = steps
+        self.values = dict(values)
+        self.emit = emit
+        self.next_step = 0
+        self.heuristics_sent = False
+
+    async def on_result(self, name: str, value):
+        self.values[name] = value
+        if name in STREAMED_FIELDS:
+            await _emit(self.emit, name, {name: value})
+        await self.flush()
+
+    async def on_invalidate(self, name: str):
+        if name == "response":
+            await _emit(self.emit, "response_reset", {})
+
+    async def flush(self):
+        values = self.values
+        # Rule-based results are instant, so stream them before any LLM result
+        if not self.heuristics_sent and "category_guess" in values and "priority" in values:
+            self.heuristics_sent = True
+            await _emit(self.emit, "heuristics", {"category": values["category_guess"], "priority": values["priority"]})
+
+        while self.next_step < len(PIPELINE_STEPS):
+            title, fields = PIPELINE_STEPS[self.next_step]
+            if not all(field in values for field in fields):
+                return
+            if title == "Context Identified":
+                step = {"step": title, "category": values["category"], "priority": values["priority"], "sentiment": values["sentiment"]}
+            elif title == "Resolutions Generated":
+                step = {"step": title, "status": "Done"}
+            else:
+                step = {"step": title, "action": values["action"]}
+            await _add_step(self.steps, step, self.emit)
+            self.next_step += 1
+
+
+def _record_speculation(name: str, hit: bool, time_saved: float):
+    pipeline_metrics.record_speculation(hit=hit, time_saved=time_saved)
+
+
+async def _run_graph(steps: List[Dict], values: Dict, emit: Optional[Emitter], speculative: bool) -> Dict:
+    """Run the agent graph for the fields not already in `values`."""
+    tracker = _ProgressTracker(steps, values, emit)
+    await tracker.flush()
+    results, fallbacks = await run_agent_graph(
+        build_agent_graph(emit),
+        values,
+        deadline=PIPELINE_DEADLINE,
+        speculative=speculative,
+        on_result=tracker.on_result,
+        on_invalidate=tracker.on_invalidate,
+        on_speculation=_record_speculation,
+        on_timing=pipeline_metrics.record_agent_latency,
+    )
+    for agent, reason in fallbacks.items():
+        pipeline_metrics.record_agent_fallback(agent, reason)
+    if fallbacks:
+        steps[-1]["fallbacks"] = fallbacks
+
+    return {
+        "category": results["category"],
+        "priority": results["priority"],
+        "response": results["response"],
+        "action": results["action"],
+        "sentiment": results["sentiment"],
+        "solution": results["solution"],
+        "satisfaction": results["satisfaction"],
+        "similar_issues": results["similar_issues"],
+        "steps": steps # Return steps for UI visualization
+    }
+
+
+async def run_agent_pipeline(text: str, mode: str = None, emit: Optional[Emitter] = None, speculative: bool = None,
+                             ticket_id: str = None):
     """
     High-performance Async AI Orchestration Pipeline.
     Designed to handle high traffic and provide step-by-step progress.
+    Pass `emit` to receive each step and agent result as soon as it completes,
+    and `ticket_id` to attribute LLM token usage (returned under "usage").
     """
     if not text or not text.strip():
         raise ValueError("Empty complaint text")
 
+    mode = (mode or PIPELINE_MODE).lower()
+    speculative = PIPELINE_SPECULATIVE if speculative is None else speculative
+
+    async def run():
+        started = time.perf_counter()
+        # Clear-cut complaints are answered without any LLM call
+        decision = await route_complaint(text)
+        # Every agent call made for this complaint queues at its priority
+        llm_priority.set(decision["priority"])
+        # A near-copy of a recent complaint reuses its analysis
+        duplicate = near_duplicates.lookup(text) if NEAR_DUP_ENABLED and decision["tier"] != LOCAL else None
+        # Flagged by the LLM layer when any agent answered with a fallback
+        outcome = CallOutcome()
+        outcome_token = current_outcome.set(outcome)
+        try:
+            with track_usage(ticket_id) as usage:
+                if decision["tier"] == LOCAL:
+                    result = await run_local_pipeline(text, decision, emit=emit)
+                elif duplicate is not None:
+                    result = await run_reuse_pipeline(text, duplicate, emit=emit)
+                elif mode == "fused":
+                    result = await run_fused_pipeline(text, emit=emit)
+                else:
+                    result = await run_standard_pipeline(text, emit=emit, speculative=speculative)
+        finally:
+            current_outcome.reset(outcome_token)
+        result["usage"] = usage.as_dict()
+        elapsed = time.perf_counter() - started
+        if decision["tier"] == LOCAL:
+            run_kind = LOCAL
+        elif duplicate is not None:
+            run_kind = "reuse"
+            result["reused_from"] = duplicate["ticket_id"]
+        else:
+            run_kind = mode
+            # Stored with the complaint, so the index warmed at startup follows the same rule
+            result["near_dup_reusable"] = not outcome.degraded and not _reused_fields_fell_back(result)
+            if ticket_id and result["near_dup_reusable"]:
+                near_duplicates.add(ticket_id, text, result)
+        pipeline_metrics.record_run(run_kind, elapsed)
+        pipeline_metrics.record_tier(decision["tier"], elapsed, decision.get("reason"))
+        return result
+
+    # Streaming callers need their own events, so only plain calls are coalesced
+    if emit is not None or not PIPELINE_SINGLE_FLIGHT:
+        return await run()
+
+    key = generate_cache_key(f"pipeline:{mode}:{int(speculative)}", text)
+    result, shared = await pipeline_flight.do(key, run)
+    pipeline_metrics.record_single_flight(coalesced=shared)
+    # Every caller gets its own copy of the shared result
+    result = copy.deepcopy(result)
+    if shared:
+        # The tokens were spent (and are accounted) on the ticket that ran the pipeline
+        result["usage"] = {**TicketUsage(ticket_id).as_dict(), "coalesced_with": result["usage"]["ticket_id"]}
+    return result
+
+
+async def run_standard_pipeline(text: str, emit: Optional[Emitter] = None, speculative: bool = False) -> Dict:
+    """
+    Standard pipeline: one agent per field, scheduled by the agent graph.
+    With `speculative`, Phase 2 starts on the heuristic category while the LLM
+    classifier runs, and is only cancelled and rerun if the final category differs.
+    """
     steps = []
-    
-    # Phase 1: Context Gathering (Running parallel agents)
-    steps.append({"step": "Analysis Started", "status": "In Progress"})
-    
-    # Independent tasks
-    task1 = classify_complaint(text)
-    task2 = detect_priority(text)
-    task3 = analyze_sentiment(text)
-    
-    category, priority, sentiment = await asyncio.gather(task1, task2, task3)
-    steps.append({"step": "Context Identified", "category": category, "priority": priority, "sentiment": sentiment})
-
-    # Phase 2: Generation (Using context from Phase 1)
-    task4 = generate_response(category, text)
-    task5 = suggest_solution(category, text)
-    task6 = find_similar_complaints(text, category)
-    
-    response, solution, similar = await asyncio.gather(task4, task5, task6)
-    steps.append({"step": "Resolutions Generated", "status": "Done"})
-
-    # Phase 3: Final Analysis
-    action = recommend_action(priority)
-    satisfaction = await predict_satisfaction(response, priority, category)
-    steps.append({"step": "Orchestration Complete", "action": action})
+    await _add_step(steps, {"step": "Analysis Started", "status": "In Progress"}, emit)
+    return await _run_graph(steps, {"text": text}, emit, speculative)
 
-    return {
-        "category": category,
-        "priority": priority,
-        "response": response,
-        "action": action,
-        "sentiment": sentiment,
-        "solution": solution,
-        "satisfaction": satisfaction,
-        "similar_issues": similar,
-        "steps": steps # Return steps for UI visualization
-    }
+
+def _reused_fields_fell_back(result: Dict) -> bool:
+    """Analyses with a fallback in a reusable field are not offered for reuse"""
+    return any(field in step.get("fallbacks", {}) for step in result["steps"] for field in REUSED_FIELDS)
+
+
+async def run_reuse_pipeline(text: str, duplicate: Dict, emit: Optional[Emitter] = None) -> Dict:
+    """
+    Near-duplicate: category, priority, sentiment and solution come from the
+    matched ticket; the personalised response (and what depends on it) is regenerated.
+    """
+    steps = []
+    await _add_step(steps, {"step": "Analysis Started", "status": "In Progress",
+                            "reused_from": duplicate["ticket_id"], "similarity": duplicate["similarity"]}, emit)
+
+    fields = duplicate["fields"]
+    for field in STREAMED_FIELDS:
+        if field in fields:
+            await _emit(emit, field, {field: fields[field]})
+    return await _run_graph(steps, {"text": text, **fields}, emit, speculative=False)
+
+
+async def run_local_pipeline(text: str, decision: Dict, emit: Optional[Emitter] = None) -> Dict:
+    """
+    Local tier: every field comes from heuristics and templates.
+    The graph only fills in the instant rule-based nodes.
+    """
+    steps = []
+    await _add_step(steps, {"step": "Analysis Started", "status": "In Progress", "tier": LOCAL, "confidence": decision["confidence"]}, emit)
+
+    fields = local_analysis(decision, text)
+    for field in STREAMED_FIELDS:
+        await _emit(emit, field, {field: fields[field]})
+    return await _run_graph(steps, {"text": text, **fields}, emit, speculative=False)
+
+
+async def run_fused_pipeline(text: str, emit: Optional[Emitter] = None) -> Dict:
+    """
+    Fused pipeline: a single structured Gemini call produces every field.
+    Only fields that fail validation are regenerated by their own agent.
+    """
+    steps = []
+    await _add_step(steps, {"step": "Analysis Started", "status": "In Progress", "mode": "fused"}, emit)
+
+    # Priority is rule-based, so it never needs the LLM
+    priority = await detect_priority(text)
+    fields, invalid = await fused_analyze(text, priority)
+    await _add_step(steps, {"step": "Fused Analysis", "status": "Done", "fallback_fields": invalid}, emit)
+
+    # A regenerated response invalidates the fused satisfaction guess
+    if "response" in invalid:
+        fields.pop("satisfaction", None)
+    for field in STREAMED_FIELDS:
+        if field in fields:
+            await _emit(emit, field, {field: fields[field]})
+
+    # Seeded fields are kept; the graph only runs agents for the invalid ones
+    return await _run_graph(steps, {"text": text, "priority": priority, **fields}, emit, speculative=False)
+
+
+async def stream_agent_pipeline(text: str, mode: str = None, ticket_id: str = None):
+    """
+    Async generator yielding (event, data) tuples while the pipeline runs.
+    The last event is ("result", <full pipeline result>).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def emit(event: str, data: Dict):
+        await queue.put((event, data))
+
+    async def run():
+        try:
+            result = await run_agent_pipeline(text, mode=mode, emit=emit, ticket_id=ticket_id)
+            await queue.put(("result", result))
+        except Exception as e:
+            await queue.put(("error", e))
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            event, data = await queue.get()
+            if event == "error":
+                raise data
+            yield event, data
+            if event == "result":
+                break
+    finally:
+        # Client went away mid-stream: stop spending LLM calls on it
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,109 @@
+from collections import deque
+
+# ========================================
+# PIPELINE METRICS
+# ========================================
+# In-process counters for the orchestration pipeline, exposed on /metrics/pipeline
+
+
+class PipelineMetrics:
+    """Tracks pipeline runs, latency, routing tiers, speculation, coalescing and agent fallbacks"""
+
+    def __init__(self):
+        self.runs = {}  # mode -> count
+        self.total_time = {}  # mode -> seconds
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        self.speculation_time_saved = 0.0  # in seconds
+        self.agent_fallbacks = {}  # agent -> {reason: count}
+        self.tier_counts = {}  # tier -> count
+        self.tier_time = {}  # tier -> seconds
+        self.escalation_reasons = {}  # why complaints went to the LLM tier
+        self.single_flight_leaders = 0
+        self.single_flight_coalesced = 0
+        self.agent_latencies = {}  # agent -> recent run times (seconds)
+
+    def record_run(self, mode: str, elapsed: float):
+        """Record one completed pipeline run"""
+        self.runs[mode] = self.runs.get(mode, 0) + 1
+        self.total_time[mode] = self.total_time.get(mode, 0.0) + elapsed
+
+    def record_speculation(self, hit: bool, time_saved: float = 0.0):
+        """Record whether speculative Phase 2 used the right category"""
+        if hit:
+            self.speculation_hits += 1
+            self.speculation_time_saved += time_saved
+        else:
+            self.speculation_misses += 1
+
+    def record_agent_fallback(self, agent: str, reason: str):
+        """Record an agent that timed out, failed or missed the deadline"""
+        reasons = self.agent_fallbacks.setdefault(agent, {})
+        reasons[reason] = reasons.get(reason, 0) + 1
+
+    def record_tier(self, tier: str, elapsed: float, reason: str = None):
+        """Record which routing tier answered a complaint and how long it took"""
+        self.tier_counts[tier] = self.tier_counts.get(tier, 0) + 1
+        self.tier_time[tier] = self.tier_time.get(tier, 0.0) + elapsed
+        if reason:
+            self.escalation_reasons[reason] = self.escalation_reasons.get(reason, 0) + 1
+
+    def record_agent_latency(self, agent: str, elapsed: float):
+        """Record how long one agent run took"""
+        self.agent_latencies.setdefault(agent, deque(maxlen=1000)).append(elapsed)
+
+    def agent_percentiles(self, agent: str) -> dict:
+        """p50/p95/p99 of recent runs of one agent, in seconds"""
+        ordered = sorted(self.agent_latencies.get(agent, ()))
+        if not ordered:
+            return {}
+        return {f"p{q}": ordered[min(len(ordered) - 1, len(ordered) * q // 100)] for q in (50, 95, 99)}
+
+    def record_single_flight(self, coalesced: bool):
+        """Record whether a request joined an identical in-flight pipeline run"""
+        if coalesced:
+            self.single_flight_coalesced += 1
+        else:
+            self.single_flight_leaders += 1
+
+    def get_stats(self):
+        """Get pipeline statistics"""
+        speculations = self.speculation_hits + self.speculation_misses
+        hit_rate = (self.speculation_hits / speculations * 100) if speculations > 0 else 0
+        flights = self.single_flight_leaders + self.single_flight_coalesced
+        coalesce_rate = (self.single_flight_coalesced / flights * 100) if flights > 0 else 0
+        return {
+            "runs": dict(self.runs),
+            "avg_latency": {
+                mode: f"{self.total_time[mode] / count:.3f}s"
+                for mode, count in self.runs.items()
+            },
+            "speculation": {
+                "hits": self.speculation_hits,
+                "misses": self.speculation_misses,
+                "hit_rate": f"{hit_rate:.2f}%",
+                "total_time_saved": f"{self.speculation_time_saved:.2f}s"
+            },
+            "tiers": {
+                tier: {
+                    "count": count,
+                    "share": f"{count / sum(self.tier_counts.values()) * 100:.2f}%",
+                    "avg_latency": f"{self.tier_time[tier] / count:.3f}s"
+                }
+                for tier, count in self.tier_counts.items()
+            },
+            "escalation_reasons": dict(self.escalation_reasons),
+            "single_flight": {
+                "executed": self.single_flight_leaders,
+                "coalesced": self.single_flight_coalesced,
+                "coalesce_rate": f"{coalesce_rate:.2f}%"
+            },
+            "agent_fallbacks": {agent: dict(reasons) for agent, reasons in self.agent_fallbacks.items()},
+            "agent_latency": {
+                agent: {q: f"{value * 1000:.1f}ms" for q, value in self.agent_percentiles(agent).items()}
+                for agent in self.agent_latencies
+            }
+        }
+
+
+pipeline_metrics = PipelineMetrics()
@@ -1,12 +1,4 @@
-import sys
-import os
-
-# Import training data
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'Training_data'))
-try:
-    from training_data import PRIORITY_KEYWORDS
-except ImportError:
-    PRIORITY_KEYWORDS = {"High": [], "Medium": [], "Low": []}
+from app.agents.keyword_engine import scan_keywords
 
 async def detect_priority(text: str) -> str:
     """
@@ -16,14 +8,5 @@ async def detect_priority(text: str) -> str:
     if not text or not text.strip():
         return "Low"
 
-    text_lower = text.lower()
-    
-    # Check High priority keywords first
-    if any(word in text_lower for word in PRIORITY_KEYWORDS.get("High", [])):
-        return "High"
-
-    # Check Medium priority keywords
-    if any(word in text_lower for word in PRIORITY_KEYWORDS.get("Medium", [])):
-        return "Medium"
-
-    return "Low"
+    # High keywords win over Medium ones
+    return scan_keywords(text).first("priority", ["High", "Medium"]) or "Low"
@@ -46,6 +46,15 @@ class ResponseValidator:
         closest = ResponseValidator._find_closest_match(sentiment, VALID_SENTIMENTS)
         return False, closest
     
+    @staticmethod
+    def validate_satisfaction(satisfaction: str) -> Tuple[bool, str]:
+        """Validate satisfaction prediction value"""
+        satisfaction = satisfaction.strip()
+        if satisfaction in VALID_SATISFACTION:
+            return True, satisfaction
+        closest = ResponseValidator._find_closest_match(satisfaction, VALID_SATISFACTION)
+        return False, closest
+    
     @staticmethod
     def validate_response_text(text: str) -> Tuple[bool, str, float]:
         """
@@ -113,28 +122,42 @@ class ResponseValidator:
     
     @staticmethod
     def validate_full_response(response: dict) -> Tuple[bool, dict]:
-        """Validate complete complaint response"""
+        """
+        Validate complete complaint response.
+        Fields that are missing or had to be coerced are listed in
+        `invalid_fields` so callers can regenerate just those fields.
+        """
         errors = []
+        invalid_fields = []
         
         # Validate required fields
         if not response.get("category"):
             errors.append("Missing category")
+            invalid_fields.append("category")
         else:
             is_valid, fixed = ResponseValidator.validate_category(response["category"])
             response["category"] = fixed
+            if not is_valid:
+                invalid_fields.append("category")
         
         if not response.get("priority"):
             errors.append("Missing priority")
+            invalid_fields.append("priority")
         else:
             is_valid, fixed = ResponseValidator.validate_priority(response["priority"])
             response["priority"] = fixed
+            if not is_valid:
+                invalid_fields.append("priority")
         
         if not response.get("response"):
             errors.append("Missing response text")
+            invalid_fields.append("response")
         else:
             is_valid, text, score = ResponseValidator.validate_response_text(response["response"])
             response["response"] = text
             response["response_quality"] = score
+            if not is_valid:
+                invalid_fields.append("response")
         
         if not response.get("action"):
             response["action"] = "Escalate to support team"
@@ -143,10 +166,20 @@ class ResponseValidator:
         if response.get("sentiment"):
             is_valid, fixed = ResponseValidator.validate_sentiment(response["sentiment"])
             response["sentiment"] = fixed
+            if not is_valid:
+                invalid_fields.append("sentiment")
         else:
             response["sentiment"] = "Neutral"
+            invalid_fields.append("sentiment")
+        
+        if response.get("satisfaction"):
+            is_valid, fixed = ResponseValidator.validate_satisfaction(response["satisfaction"])
+            response["satisfaction"] = fixed
+            if not is_valid:
+                invalid_fields.append("satisfaction")
         
         response["validation_errors"] = errors
+        response["invalid_fields"] = invalid_fields
         is_valid = len(errors) == 0
         
         return is_valid, response
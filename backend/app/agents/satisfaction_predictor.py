@@ -1,17 +1,26 @@
 from app.agents.gemini_client import async_ask_gemini
+from app.ml.satisfaction_model import get_satisfaction_model
 
 async def predict_satisfaction(response: str, priority: str, category: str) -> str:
     if not response or not response.strip():
         return "Low"
 
+    # Local model trained on real user ratings; the LLM is only the fallback
+    model = get_satisfaction_model()
+    if model is not None:
+        try:
+            return model.predict(response, priority, category)
+        except Exception as e:
+            print(f"⚠ Local satisfaction model failed, using LLM: {e}")
+
     prompt = f"""Based on this customer complaint and our response, predict customer satisfaction level.
 Response: {response}
 Priority: {priority}
 Category: {category}
 Return ONE word only: High, Medium, or Low"""
     try:
-        result = await async_ask_gemini(prompt)
+        result = await async_ask_gemini(prompt, agent="satisfaction")
         allowed = {"High", "Medium", "Low"}
         return result.strip() if result.strip() in allowed else "Medium"
-    except:
+    except Exception:
         return "Medium"
@@ -1,27 +1,32 @@
-import sys
-import os
 from app.agents.gemini_client import async_ask_gemini
+from app.agents.cache_layer import cache_response
+from app.agents.training_data import SENTIMENT_EXAMPLES
+from app.agents.keyword_engine import scan_keywords
+from app.ml.text_classifier import classify_locally
 
-# Import training data
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'Training_data'))
-try:
-    from training_data import SENTIMENT_KEYWORDS, SENTIMENT_EXAMPLES
-except ImportError:
-    SENTIMENT_KEYWORDS = {}
-    SENTIMENT_EXAMPLES = ""
+# Bump when the prompt changes (v3: only LLM answers are cached)
+PROMPT_VERSION = "v3"
 
 async def analyze_sentiment(text: str) -> str:
     if not text or not text.strip():
         return "Neutral"
 
-    text_lower = text.lower()
-    
-    # Heuristic check
-    for sentiment, keywords in SENTIMENT_KEYWORDS.items():
-        if any(word in text_lower for word in keywords):
-            return sentiment
+    # Heuristic check: strongest sentiment with a keyword hit (Angry before Negative before Positive)
+    sentiment = scan_keywords(text).first("sentiment")
+    if sentiment:
+        return sentiment
+
+    # Local model, when it is confident
+    sentiment = classify_locally("sentiment", text)
+    if sentiment is not None:
+        return sentiment
 
     # AI check
+    return await analyze_sentiment_with_llm(text)
+
+# Only the LLM answer is cached: keyword and local model results track online updates
+@cache_response("sentiment", version=PROMPT_VERSION)
+async def analyze_sentiment_with_llm(text: str) -> str:
     prompt = f"""
 {SENTIMENT_EXAMPLES}
 
@@ -33,9 +38,9 @@ Text: {text}
 Return only ONE word.
 """
     try:
-        result = await async_ask_gemini(prompt)
+        result = await async_ask_gemini(prompt, agent="sentiment")
         allowed = {"Positive", "Neutral", "Negative", "Angry"}
         filtered_res = result.strip().split('\n')[0].replace('.', '').strip()
         return filtered_res if filtered_res in allowed else "Neutral"
-    except:
+    except Exception:
         return "Neutral"
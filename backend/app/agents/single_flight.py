@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+# ========================================
+# SINGLE-FLIGHT REQUEST COALESCING
+# ========================================
+# Concurrent callers with the same key share one in-flight coroutine instead
+# of each running it. Results are never cached: once the shared call finishes
+# (or fails) the key is forgotten, so later callers always start a fresh one.
+
+
+class SingleFlight:
+    """Deduplicates concurrent async calls by key"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key among concurrent callers.
+        Returns (result, shared) where shared is True for callers that joined
+        an existing call instead of starting it.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        self._waiters[key] += 1
+        try:
+            # shield: one caller disconnecting must not cancel the others' result
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is task and self._waiters[key] == 1 and not task.done():
+                task.cancel()  # nobody is left waiting for it
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task):
+        # Runs before any waiter resumes, so a failed call is never handed to a later caller
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved; waiters re-raise it themselves
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+pipeline_flight = SingleFlight()
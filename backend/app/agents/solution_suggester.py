@@ -1,14 +1,11 @@
-import sys
-import os
 from app.agents.gemini_client import async_ask_gemini
+from app.agents.cache_layer import cache_response
+from app.agents.training_data import SOLUTION_EXAMPLES
 
-# Import training data
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'Training_data'))
-try:
-    from training_data import SOLUTION_EXAMPLES
-except ImportError:
-    SOLUTION_EXAMPLES = ""
+# Bump when the prompt changes
+PROMPT_VERSION = "v2"
 
+@cache_response("solution", version=PROMPT_VERSION)
 async def suggest_solution(category: str, text: str) -> str:
     if not text or not text.strip():
         return "Please contact our support team for assistance."
@@ -25,7 +22,7 @@ Complaint: {text}
 Provide a practical, empathetic solution in 1-2 sentences.
 """
     try:
-        result = await async_ask_gemini(prompt)
+        result = await async_ask_gemini(prompt, agent="solution")
         return result.strip() if result else "Our team will investigate and follow up within 24 hours."
-    except:
+    except Exception:
         return "Our team will investigate and follow up within 24 hours."
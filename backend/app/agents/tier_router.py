@@ -0,0 +1,97 @@
+import os
+from typing import Dict, Optional, Tuple
+from app.agents.priority import detect_priority
+from app.agents.complaint_matcher import format_similar
+from app.ml.similarity_index import similarity_index
+from app.agents.training_data import RESPONSE_TEMPLATES, COMPLAINT_EXAMPLES
+from app.agents.keyword_engine import scan_keywords
+
+# ========================================
+# CONFIDENCE-TIERED ROUTING
+# ========================================
+# Clear-cut complaints (unambiguous keyword hits, not High priority, and a
+# response template available) are answered entirely from local logic.
+# Everything else goes through the LLM agents.
+
+# Heuristic confidence (0-1) needed to answer locally; > 1 disables the local tier
+LOCAL_TIER_THRESHOLD = float(os.getenv("LOCAL_TIER_THRESHOLD", "0.8"))
+
+LOCAL = "local"
+LLM = "llm"
+
+SATISFACTION_BY_SENTIMENT = {"Positive": "High", "Neutral": "Medium", "Negative": "Medium", "Angry": "Low"}
+
+
+def keyword_hits(text: str, group: str) -> Dict[str, int]:
+    """Number of distinct keywords of each label (of "category" or "sentiment") found in the text"""
+    return scan_keywords(text).distinct(group)
+
+
+def label_confidence(hits: Dict[str, int]) -> Tuple[Optional[str], float]:
+    """
+    Confidence that the top label is right: the margin over the runner-up,
+    scaled down when it rests on a single keyword.
+    """
+    ranked = sorted(hits.items(), key=lambda kv: kv[1], reverse=True)
+    if not ranked or ranked[0][1] == 0:
+        return None, 0.0
+    label, top = ranked[0]
+    second = ranked[1][1] if len(ranked) > 1 else 0
+    margin = (top - second) / top
+    support = min(1.0, top / 2)
+    return label, margin * support
+
+
+async def route_complaint(text: str, threshold: float = None) -> Dict:
+    """Decide whether a complaint can be answered from the local tier."""
+    threshold = LOCAL_TIER_THRESHOLD if threshold is None else threshold
+
+    category, category_conf = label_confidence(keyword_hits(text, "category"))
+    sentiment, sentiment_conf = label_confidence(keyword_hits(text, "sentiment"))
+    if sentiment is None:
+        # No emotional keywords: Neutral is likely but not certain
+        sentiment, sentiment_conf = "Neutral", 0.5
+    priority = await detect_priority(text)
+    confidence = round(0.6 * category_conf + 0.4 * sentiment_conf, 3)
+
+    decision = {
+        "tier": LLM,
+        "confidence": confidence,
+        "category": category or "Other",
+        "priority": priority,
+        "sentiment": sentiment,
+    }
+    if priority == "High":
+        decision["reason"] = "high_priority"
+    elif category is None or category not in RESPONSE_TEMPLATES:
+        decision["reason"] = "no_template"
+    elif confidence < threshold:
+        decision["reason"] = "low_confidence"
+    else:
+        decision["tier"] = LOCAL
+    return decision
+
+
+def local_analysis(decision: Dict, text: str = "") -> Dict:
+    """Answer fields for a locally routed complaint, from templates, real tickets and training examples."""
+    category, priority, sentiment = decision["category"], decision["priority"], decision["sentiment"]
+    examples = COMPLAINT_EXAMPLES.get(category, [])
+
+    solution = next((ex["solution"] for ex in examples if ex.get("priority") == priority), None)
+    if solution is None:
+        solution = examples[0]["solution"] if examples else "Our team will investigate and follow up within 24 hours."
+
+    matches = similarity_index.search(text, category) if text else []
+    similar = format_similar(matches) if matches else (
+        "\n".join(f"- {ex['text']}" for ex in examples[:3]) or "No similar issues found."
+    )
+
+    return {
+        "category": category,
+        "priority": priority,
+        "sentiment": sentiment,
+        "response": RESPONSE_TEMPLATES[category].get(priority) or RESPONSE_TEMPLATES[category].get("Medium", ""),
+        "solution": solution,
+        "similar_issues": similar,
+        "satisfaction": SATISFACTION_BY_SENTIMENT.get(sentiment, "Medium"),
+    }
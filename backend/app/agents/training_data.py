@@ -0,0 +1,55 @@
+import importlib.util
+import os
+
+# ========================================
+# TRAINING DATA LOADER
+# ========================================
+# The keyword lists, few-shot examples and templates live in
+# Training_data/training_data,.py. The comma in the file name makes it
+# unimportable by module name, so it is loaded from its path, once, here.
+# Every agent imports the data from this module.
+
+TRAINING_DATA_PATH = os.getenv("TRAINING_DATA_PATH", os.path.join(
+    os.path.dirname(__file__), "..", "..", "Training_data", "training_data,.py"
+))
+
+DEFAULTS = {
+    "COMPLAINT_EXAMPLES": {},
+    "PRIORITY_KEYWORDS": {"High": [], "Medium": [], "Low": []},
+    "SENTIMENT_KEYWORDS": {},
+    "CATEGORY_KEYWORDS": {},
+    "CLASSIFICATION_EXAMPLES": "",
+    "SENTIMENT_EXAMPLES": "",
+    "SOLUTION_EXAMPLES": "",
+    "RESPONSE_TEMPLATES": {},
+}
+
+
+def load_training_data(path: str = TRAINING_DATA_PATH) -> dict:
+    """Every name in DEFAULTS, from the training data file (defaults for anything missing)"""
+    data = dict(DEFAULTS)
+    try:
+        spec = importlib.util.spec_from_file_location("training_data", os.path.abspath(path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except (FileNotFoundError, AttributeError, SyntaxError) as e:
+        print(f"⚠ Training data not loaded from {path}, heuristics are disabled: {e}")
+        return data
+    for name in DEFAULTS:
+        data[name] = getattr(module, name, DEFAULTS[name])
+    missing = [name for name in DEFAULTS if not hasattr(module, name)]
+    if missing:
+        print(f"⚠ Training data at {path} is missing {', '.join(missing)}")
+    return data
+
+
+_data = load_training_data()
+
+COMPLAINT_EXAMPLES = _data["COMPLAINT_EXAMPLES"]
+PRIORITY_KEYWORDS = _data["PRIORITY_KEYWORDS"]
+SENTIMENT_KEYWORDS = _data["SENTIMENT_KEYWORDS"]
+CATEGORY_KEYWORDS = _data["CATEGORY_KEYWORDS"]
+CLASSIFICATION_EXAMPLES = _data["CLASSIFICATION_EXAMPLES"]
+SENTIMENT_EXAMPLES = _data["SENTIMENT_EXAMPLES"]
+SOLUTION_EXAMPLES = _data["SOLUTION_EXAMPLES"]
+RESPONSE_TEMPLATES = _data["RESPONSE_TEMPLATES"]
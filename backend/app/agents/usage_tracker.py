@@ -0,0 +1,115 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# ========================================
+# TOKEN USAGE ACCOUNTING
+# ========================================
+# Every Gemini response's usage_metadata is recorded here, attributed to the
+# calling agent and to the ticket being analysed. The ticket is carried by a
+# context variable set around the pipeline run, so agent tasks inherit it.
+
+# Estimated price in USD per million tokens
+LLM_PRICE_PROMPT_PER_M = float(os.getenv("LLM_PRICE_PROMPT_PER_M", "0.10"))
+LLM_PRICE_COMPLETION_PER_M = float(os.getenv("LLM_PRICE_COMPLETION_PER_M", "0.40"))
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return (prompt_tokens * LLM_PRICE_PROMPT_PER_M + completion_tokens * LLM_PRICE_COMPLETION_PER_M) / 1_000_000
+
+
+class TicketUsage:
+    """Token totals for one pipeline run, with a per-agent breakdown"""
+
+    def __init__(self, ticket_id: Optional[str] = None):
+        self.ticket_id = ticket_id
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+        self.by_agent: Dict[str, Dict[str, int]] = {}
+
+    def add(self, agent: str, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.calls += 1
+        entry = self.by_agent.setdefault(agent, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+
+    def as_dict(self) -> Dict:
+        return {
+            "ticket_id": self.ticket_id,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_calls": self.calls,
+            "by_agent": {agent: dict(entry) for agent, entry in self.by_agent.items()},
+        }
+
+
+current_usage: ContextVar[Optional[TicketUsage]] = ContextVar("current_usage", default=None)
+
+
+@contextmanager
+def track_usage(ticket_id: Optional[str] = None):
+    """Collect usage of every LLM call made inside the block (including child tasks)"""
+    usage = TicketUsage(ticket_id)
+    token = current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        current_usage.reset(token)
+
+
+class UsageMetrics:
+    """Process-wide token totals per agent"""
+
+    def __init__(self):
+        self.agents: Dict[str, Dict[str, int]] = {}
+        self.unmetered_calls = 0  # responses without usage_metadata
+
+    def record(self, agent: str, prompt_tokens: int, completion_tokens: int):
+        entry = self.agents.setdefault(agent, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+
+    def get_stats(self):
+        """Get per-agent token usage, heaviest agents first"""
+        agents = sorted(self.agents.items(), key=lambda kv: kv[1]["prompt_tokens"] + kv[1]["completion_tokens"], reverse=True)
+        total_prompt = sum(e["prompt_tokens"] for e in self.agents.values())
+        total_completion = sum(e["completion_tokens"] for e in self.agents.values())
+        return {
+            "total_prompt_tokens": total_prompt,
+            "total_completion_tokens": total_completion,
+            "estimated_cost_usd": round(estimate_cost(total_prompt, total_completion), 4),
+            "unmetered_calls": self.unmetered_calls,
+            "agents": {
+                agent: {
+                    **entry,
+                    "avg_prompt_tokens": round(entry["prompt_tokens"] / entry["calls"], 1),
+                    "avg_completion_tokens": round(entry["completion_tokens"] / entry["calls"], 1),
+                    "estimated_cost_usd": round(estimate_cost(entry["prompt_tokens"], entry["completion_tokens"]), 4),
+                }
+                for agent, entry in agents
+            },
+        }
+
+
+usage_metrics = UsageMetrics()
+
+
+def record_usage(agent: Optional[str], response) -> None:
+    """Attribute one Gemini response's usage_metadata to its agent and the current ticket"""
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        usage_metrics.unmetered_calls += 1
+        return
+    prompt_tokens = getattr(metadata, "prompt_token_count", 0) or 0
+    completion_tokens = getattr(metadata, "candidates_token_count", 0) or 0
+    agent = agent or "other"
+    usage_metrics.record(agent, prompt_tokens, completion_tokens)
+    usage = current_usage.get()
+    if usage is not None:
+        usage.add(agent, prompt_tokens, completion_tokens)
@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db.database import get_db, db_pool_stats
+from app.db.models import Complaint
+from app.agents.usage_tracker import usage_metrics, estimate_cost
+from app.agents.pipeline_metrics import pipeline_metrics
+from app.agents.llm_limiter import llm_limiter
+from app.agents.gemini_client import model_router
+from app.agents.hedging import request_hedger
+from app.agents.cache_layer import get_cache_stats
+from app.services.analysis_worker import analysis_workers
+from app.ml.similarity_index import similarity_index
+from app.ml.near_duplicate import near_duplicates
+from app.ml.text_classifier import classifier_metrics
+from app.services.online_learner import online_learner
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/pipeline")
+def get_pipeline_metrics():
+    """
+    Orchestration pipeline counters (runs, latency, speculation hit rate).
+    """
+    return pipeline_metrics.get_stats()
+
+@router.get("/llm")
+def get_llm_metrics():
+    """
+    Shared Gemini limiter (in-flight calls, queue wait by priority, rate
+    limiting) and request hedging.
+    """
+    return {**llm_limiter.get_stats(), "hedging": request_hedger.get_stats()}
+
+@router.get("/models")
+def get_model_metrics():
+    """
+    Per-model health: EWMA latency, error rate and circuit breaker state.
+    """
+    return model_router.get_stats()
+
+@router.get("/workers")
+def get_worker_metrics():
+    """
+    Background analysis worker pool (async-mode complaints).
+    """
+    return analysis_workers.get_stats()
+
+@router.get("/cache")
+def get_cache_metrics():
+    """
+    Agent result cache: hit rate per agent and tier, LRU size and evictions.
+    """
+    return get_cache_stats()
+
+@router.get("/classifier")
+def get_classifier_metrics():
+    """
+    Local category/sentiment classifier: how often it answered vs escalated to the LLM.
+    """
+    return classifier_metrics.get_stats()
+
+@router.get("/learning")
+def get_learning_metrics():
+    """
+    Online learning: feedback examples waiting and applied, model updates.
+    """
+    return online_learner.get_stats()
+
+@router.get("/similarity")
+def get_similarity_metrics():
+    """
+    Similar-complaint index size and search latency.
+    """
+    return similarity_index.get_stats()
+
+@router.get("/duplicates")
+def get_duplicate_metrics():
+    """
+    Near-duplicate index: size, lookups and how often an analysis was reused.
+    """
+    return near_duplicates.get_stats()
+
+@router.get("/db")
+def get_db_metrics():
+    """
+    DB threadpool used by async routes: calls, queue wait and run time.
+    """
+    return db_pool_stats.get_stats()
+
+@router.get("/usage")
+def get_usage_metrics(top: int = 10, db: Session = Depends(get_db)):
+    """
+    LLM token usage: per agent since startup, and per ticket from the
+    totals stored on each complaint.
+    """
+    tokens = Complaint.prompt_tokens + Complaint.completion_tokens
+    tickets, prompt, completion, calls = db.query(
+        func.count(Complaint.id),
+        func.coalesce(func.sum(Complaint.prompt_tokens), 0),
+        func.coalesce(func.sum(Complaint.completion_tokens), 0),
+        func.coalesce(func.sum(Complaint.llm_calls), 0),
+    ).filter(Complaint.llm_calls > 0).one()
+    heaviest = (
+        db.query(Complaint.ticket_id, Complaint.prompt_tokens, Complaint.completion_tokens, Complaint.llm_calls)
+        .filter(Complaint.llm_calls > 0)
+        .order_by(tokens.desc())
+        .limit(top)
+        .all()
+    )
+    return {
+        **usage_metrics.get_stats(),
+        "tickets": {
+            "count": tickets,
+            "avg_prompt_tokens": round(prompt / tickets, 1) if tickets else 0,
+            "avg_completion_tokens": round(completion / tickets, 1) if tickets else 0,
+            "avg_llm_calls": round(calls / tickets, 2) if tickets else 0,
+            "avg_cost_usd": round(estimate_cost(prompt, completion) / tickets, 6) if tickets else 0,
+            "heaviest": [
+                {"ticket_id": t, "prompt_tokens": p, "completion_tokens": c, "llm_calls": n}
+                for t, p, c, n in heaviest
+            ],
+        },
+    }
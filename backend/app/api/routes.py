@@ -1,120 +1,320 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse, JSONResponse
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from app.agents.orchestrator import run_agent_pipeline
-from app.db.database import get_db, get_ist_time
+from app.agents.orchestrator import run_agent_pipeline, stream_agent_pipeline
+from app.agents.classifier import fallback_classify
+from app.agents.priority import detect_priority
+from app.db.database import get_db, get_async_db, get_ist_time, AsyncDB
 from app.db.models import Complaint
-from app.schemas.complaint import ComplaintRequest, ComplaintResponse
+from app.schemas.complaint import (
+    ComplaintRequest, ComplaintResponse, ComplaintStatusResponse,
+    BatchComplaintItem, BatchComplaintResponse
+)
 from app.services.email_service import email_service
+from app.services.complaint_service import (
+    generate_ticket_id, analysis_text, complaint_values, build_complaint,
+    index_complaint, send_confirmation, build_complaint_response, complaint_request
+)
+from app.services.analysis_worker import analysis_workers, PENDING, COMPLETED
+from app.ml.similarity_index import similarity_index
+from app.ml.near_duplicate import near_duplicates
+from app.ml.text_classifier import normalize_label
+from app.services.online_learner import online_learner, record_corrections, record_review
+import asyncio
 import datetime
-import random
-import string
+import os
 import json
 
 router = APIRouter()
 
+# Max pipelines run at once for one batch request, and max items per batch
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "100"))
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+# ---------- Units of DB work for the async routes (run via AsyncDB.run) ----------
+
+def _insert_complaints(db: Session, rows: list):
+    db.execute(insert(Complaint), rows)
+    db.commit()
+
+def _save_review(db: Session, ticket_id: str, rating: int, feedback: str) -> bool:
+    complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
+    if not complaint:
+        return False
+    complaint.user_rating = rating
+    complaint.user_feedback = feedback
+    # The rating becomes a training example for the satisfaction model
+    record_review(db, complaint, rating)
+    db.commit()
+    return True
+
+def _update_status(db: Session, ticket_id: str, is_resolved: bool, admin_solution: str,
+                   category: str, sentiment: str):
+    """Apply a status update; returns the fields the route needs after the commit, or None"""
+    complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
+    if not complaint:
+        return None
+
+    complaint.is_resolved = is_resolved
+    complaint.updated_at = get_ist_time()
+
+    # If admin provides a solution, update it
+    if admin_solution:
+        complaint.solution = admin_solution
+        complaint.solution_by_admin = True
+
+    corrected = record_corrections(db, complaint, category, sentiment, resolved=is_resolved)
+    if corrected or admin_solution:
+        # Ticket-specific now: not offered to near-duplicates, after a restart either
+        complaint.near_dup_reusable = False
+    snapshot = {
+        "corrected": corrected,
+        "id": complaint.id,
+        "name": complaint.name,
+        "email": complaint.email,
+        "subject": complaint.subject,
+        "description": complaint.description or complaint.complaint_text,
+        "category": complaint.category,
+        "solution": complaint.solution,
+        "is_resolved": complaint.is_resolved,
+    }
+    db.commit()
+    return snapshot
+
+def _delete_complaint(db: Session, ticket_id: str) -> bool:
+    complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
+    if not complaint:
+        return False
+    db.delete(complaint)
+    db.commit()
+    return True
+
+def _delete_complaints(db: Session, ticket_ids: list) -> int:
+    count = db.query(Complaint).filter(Complaint.ticket_id.in_(ticket_ids)).delete(synchronize_session=False)
+    db.commit()
+    return count
+
 @router.post("/complaint", response_model=ComplaintResponse)
-async def handle_complaint(data: ComplaintRequest, db: Session = Depends(get_db)):
+async def handle_complaint(data: ComplaintRequest, async_mode: bool = Query(False), db: AsyncDB = Depends(get_async_db)):
     """
     Handle complaint submission and run AI analysis pipeline (Async version for scaling)
+    With `async_mode=true` the complaint is stored as pending and 202 is returned
+    immediately; poll GET /complaint/{ticket_id} for the analysis.
     """
+    if async_mode:
+        return await enqueue_complaint(data, db)
+
     try:
         print(f"📋 New Complaint: {data.subject}")
 
-        # Combine subject and description for comprehensive AI analysis
-        full_text = f"Subject: {data.subject}\nDescription: {data.description}"
-        
+        # Ticket ID first, so LLM token usage is attributed to it
+        ticket_id = generate_ticket_id()
+
         # Run AI agents pipeline asynchronously
-        result = await run_agent_pipeline(full_text)
-        
-        category = result.get("category", "Other")
-        priority = result.get("priority", "Low")
-        response = result.get("response", "")
-        action = result.get("action", "")
-        sentiment = result.get("sentiment", "Neutral")
-        solution = result.get("solution", "")
-        satisfaction = result.get("satisfaction", "Medium")
-        similar = result.get("similar_issues", "")
-        steps = result.get("steps", [])
-
-        # Generate Professional Ticket ID
-        date_str = get_ist_time().strftime("%Y%m%d")
-        random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        ticket_id = f"QX-{date_str}-{random_str}"
+        result = await run_agent_pipeline(analysis_text(data), ticket_id=ticket_id)
 
         # Save to database
-        complaint = Complaint(
-            ticket_id=ticket_id,
-            name=data.name,
-            email=data.email,
-            subject=data.subject,
-            description=data.description,
-            complaint_text=data.description, # Mirror to legacy field for DB compatibility
-            category=category,
-            priority=priority,
-            response=response,
-            action=action,
-            sentiment=sentiment,
-            solution=solution,
-            satisfaction_prediction=satisfaction,
-            similar_complaints=similar,
-            ai_analysis_steps=json.dumps(steps), # Save orchestrated steps
-            is_resolved=False
-        )
+        db.add(build_complaint(data, ticket_id, result))
+        await db.commit()
+        index_complaint(data, ticket_id, result)
+
+        # Send confirmation email
+        send_confirmation(data, ticket_id, result)
 
+        return build_complaint_response(data, ticket_id, result)
+
+    except Exception as e:
+        print("❌ BACKEND EXCEPTION:", repr(e))
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def enqueue_complaint(data: ComplaintRequest, db: AsyncDB) -> JSONResponse:
+    """Persist the raw complaint for the background workers and return 202"""
+    try:
+        print(f"📋 New Async Complaint: {data.subject}")
+        text = analysis_text(data)
+        ticket_id = generate_ticket_id()
+
+        # Instant rule-based placeholders until the workers finish the analysis
+        complaint = build_complaint(data, ticket_id, {
+            "category": fallback_classify(text),
+            "priority": await detect_priority(text),
+            "steps": [{"step": "Queued", "status": "Pending"}],
+        })
+        complaint.analysis_status = PENDING
         db.add(complaint)
-        db.commit()
-        db.refresh(complaint)
+        await db.commit()
 
-        # Send confirmation email
-        email_service.send_complaint_confirmation(data.name, data.email, {
+        analysis_workers.enqueue(ticket_id)
+        return JSONResponse(status_code=202, content={
             "ticket_id": ticket_id,
-            "subject": data.subject,
-            "description": data.description,
-            "category": category,
-            "priority": priority,
-            "sentiment": sentiment,
-            "response": response,
-            "solution": solution,
-            "action": action,
+            "analysis_status": PENDING,
+            "status_url": f"/complaint/{ticket_id}"
         })
-
-        return ComplaintResponse(
-            ticket_id=ticket_id,
-            subject=data.subject,
-            description=data.description,
-            category=category,
-            priority=priority,
-            response=response,
-            action=action,
-            sentiment=sentiment,
-            solution=solution,
-            satisfaction=satisfaction,
-            similar_issues=similar,
-            steps=steps
-        )
-
     except Exception as e:
         print("❌ BACKEND EXCEPTION:", repr(e))
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/complaint/{ticket_id}", response_model=ComplaintStatusResponse)
+def get_complaint_status(ticket_id: str, db: Session = Depends(get_db)):
+    """
+    Analysis status and progress steps for a complaint; includes the full
+    result once the analysis has completed.
+    """
+    complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
+    if not complaint:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+
+    status = complaint.analysis_status or COMPLETED
+    steps = json.loads(complaint.ai_analysis_steps) if complaint.ai_analysis_steps else []
+    result = None
+    if status == COMPLETED:
+        result = build_complaint_response(complaint_request(complaint), ticket_id, {
+            "category": complaint.category,
+            "priority": complaint.priority,
+            "response": complaint.response,
+            "action": complaint.action,
+            "sentiment": complaint.sentiment,
+            "solution": complaint.solution,
+            "satisfaction": complaint.satisfaction_prediction,
+            "similar_issues": complaint.similar_complaints,
+            "steps": steps,
+        })
+    return ComplaintStatusResponse(ticket_id=ticket_id, analysis_status=status, steps=steps, result=result)
+
+@router.post("/complaint/stream")
+async def stream_complaint(data: ComplaintRequest):
+    """
+    Streaming variant of POST /complaint (Server-Sent Events).
+    Pushes each pipeline step and agent result as soon as it completes,
+    token-streams the response text, and finishes with a `complete` event
+    carrying the saved ticket.
+    """
+    print(f"📋 New Streaming Complaint: {data.subject}")
+    full_text = analysis_text(data)
+    ticket_id = generate_ticket_id()
+
+    async def event_stream():
+        # The request-scoped session is closed before streaming starts, so use our own
+        db = AsyncDB()
+        try:
+            result = None
+            async for event, payload in stream_agent_pipeline(full_text, ticket_id=ticket_id):
+                if event == "result":
+                    result = payload
+                    break
+                yield format_sse(event, payload)
+
+            db.add(build_complaint(data, ticket_id, result))
+            await db.commit()
+            index_complaint(data, ticket_id, result)
+
+            send_confirmation(data, ticket_id, result)
+            yield format_sse("complete", build_complaint_response(data, ticket_id, result).model_dump())
+        except Exception as e:
+            print("❌ STREAM EXCEPTION:", repr(e))
+            await db.rollback()
+            yield format_sse("error", {"detail": str(e)})
+        finally:
+            await db.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/complaints/batch", response_model=BatchComplaintResponse)
+async def handle_complaint_batch(
+    items: list[ComplaintRequest],
+    background_tasks: BackgroundTasks,
+    concurrency: int = Query(BATCH_CONCURRENCY, ge=1),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Bulk complaint submission.
+    Runs the AI pipeline for every item under a concurrency limit, inserts all
+    analysed complaints in one transaction and reports per-item results/errors.
+    Confirmation emails are sent after the commit.
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail="No complaints provided")
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE}")
+
+    print(f"📦 New Complaint Batch: {len(items)} items")
+    semaphore = asyncio.Semaphore(min(concurrency, BATCH_CONCURRENCY))
+
+    # Ticket IDs up front (unique within the batch) so token usage is attributed to them
+    ticket_ids = []
+    for _ in items:
+        ticket_id = generate_ticket_id()
+        while ticket_id in ticket_ids:
+            ticket_id = generate_ticket_id()
+        ticket_ids.append(ticket_id)
+
+    async def analyse(data: ComplaintRequest, ticket_id: str) -> dict:
+        if not (data.subject or "").strip() and not (data.description or "").strip():
+            raise ValueError("Empty complaint text")
+        async with semaphore:
+            return await run_agent_pipeline(analysis_text(data), ticket_id=ticket_id)
+
+    outcomes = await asyncio.gather(*(analyse(data, t) for data, t in zip(items, ticket_ids)), return_exceptions=True)
+
+    results = []
+    analysed = []  # (index, data, ticket_id, result)
+    for index, (data, ticket_id, outcome) in enumerate(zip(items, ticket_ids, outcomes)):
+        if isinstance(outcome, BaseException):
+            results.append(BatchComplaintItem(index=index, error=str(outcome) or type(outcome).__name__))
+            continue
+        analysed.append((index, data, ticket_id, outcome))
+
+    if analysed:
+        try:
+            # Single multi-row INSERT for the whole batch
+            rows = [complaint_values(data, ticket_id, result) for _, data, ticket_id, result in analysed]
+            await db.run(_insert_complaints, rows)
+        except Exception as e:
+            print("❌ BATCH INSERT EXCEPTION:", repr(e))
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+    for index, data, ticket_id, result in analysed:
+        index_complaint(data, ticket_id, result)
+        results.append(BatchComplaintItem(
+            index=index,
+            ticket_id=ticket_id,
+            result=build_complaint_response(data, ticket_id, result)
+        ))
+        background_tasks.add_task(send_confirmation, data, ticket_id, result)
+
+    results.sort(key=lambda item: item.index)
+    return BatchComplaintResponse(
+        total=len(items),
+        succeeded=len(analysed),
+        failed=len(items) - len(analysed),
+        results=results
+    )
+
 @router.post("/complaint/{ticket_id}/review")
-async def review_complaint(ticket_id: str, rating: int = Body(..., embed=True), feedback: str = Body(None, embed=True), db: Session = Depends(get_db)):
+async def review_complaint(ticket_id: str, rating: int = Body(..., embed=True), feedback: str = Body(None, embed=True), db: AsyncDB = Depends(get_async_db)):
     """
     Allow users to review the AI solution
     """
     try:
-        complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
-        if not complaint:
+        if not await db.run(_save_review, ticket_id, rating, feedback):
             raise HTTPException(status_code=404, detail="Ticket not found")
-        
-        complaint.user_rating = rating
-        complaint.user_feedback = feedback
-        db.commit()
+        online_learner.notify()
         
         return {"message": "Review submitted successfully", "ticket_id": ticket_id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/complaints")
@@ -135,8 +335,11 @@ def get_all_complaints(email: str = None, db: Session = Depends(get_db)):
 def delete_complaints(email: str = None, db: Session = Depends(get_db)):
     try:
         if not email: raise HTTPException(status_code=400, detail="Email required")
+        ticket_ids = [t for (t,) in db.query(Complaint.ticket_id).filter(Complaint.email == email).all()]
         count = db.query(Complaint).filter(Complaint.email == email).delete(synchronize_session=False)
         db.commit()
+        similarity_index.remove(ticket_ids)
+        near_duplicates.remove(ticket_ids)
         return {"message": f"Deleted {count} complaints", "deleted_count": count}
     except Exception as e:
         db.rollback()
@@ -146,75 +349,86 @@ async def update_complaint_status(
     ticket_id: str, 
     is_resolved: bool = Body(..., embed=True), 
     admin_solution: str = Body(None, embed=True),
-    db: Session = Depends(get_db)
+    category: str = Body(None, embed=True),
+    sentiment: str = Body(None, embed=True),
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
-    Update complaint resolution status and send resolution email with solution
+    Update complaint resolution status and send resolution email with solution.
+    Optional `category`/`sentiment` correct the AI labels; corrections (and
+    confirmations on resolve) are fed back to the local classifier.
     """
+    for head, value in (("category", category), ("sentiment", sentiment)):
+        if value and normalize_label(head, value) is None:
+            raise HTTPException(status_code=400, detail=f"Unknown {head}: {value}")
     try:
-        complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
+        complaint = await db.run(_update_status, ticket_id, is_resolved, admin_solution, category, sentiment)
         if not complaint:
             raise HTTPException(status_code=404, detail="Ticket not found")
+        corrected = complaint["corrected"]
         
-        complaint.is_resolved = is_resolved
-        complaint.updated_at = get_ist_time()
-        
-        # If admin provides a solution, update it
-        if admin_solution:
-            complaint.solution = admin_solution
-        
-        db.commit()
+        online_learner.notify()
+        similarity_index.update_resolution(ticket_id, admin_solution, is_resolved)
+        if corrected:
+            similarity_index.add(
+                ticket_id, complaint["subject"], complaint["description"],
+                complaint["category"], complaint["solution"], complaint["is_resolved"], complaint["id"],
+            )
+        if corrected or admin_solution:
+            # Near-duplicates must not reuse corrected labels or an admin's ticket-specific solution
+            near_duplicates.remove([ticket_id])
         
         # Send resolution email to user when marked as resolved
         if is_resolved:
             email_service.send_resolution_email(
-                name=complaint.name,
-                email=complaint.email,
+                name=complaint["name"],
+                email=complaint["email"],
                 ticket_id=ticket_id,
-                subject=complaint.subject,
-                solution=admin_solution or complaint.solution or "Your issue has been resolved by our team."
+                subject=complaint["subject"],
+                solution=admin_solution or complaint["solution"] or "Your issue has been resolved by our team."
             )
         
         return {
             "message": "Status updated successfully", 
             "ticket_id": ticket_id, 
             "is_resolved": is_resolved,
+            "corrected": corrected,
             "email_sent": is_resolved
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/complaint/{ticket_id}")
-async def delete_complaint(ticket_id: str, db: Session = Depends(get_db)):
+async def delete_complaint(ticket_id: str, db: AsyncDB = Depends(get_async_db)):
     """
     Delete a single complaint by ticket_id
     """
     try:
-        complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
-        if not complaint:
+        if not await db.run(_delete_complaint, ticket_id):
             raise HTTPException(status_code=404, detail="Ticket not found")
         
-        db.delete(complaint)
-        db.commit()
+        similarity_index.remove([ticket_id])
+        near_duplicates.remove([ticket_id])
         
         return {
             "message": "Complaint deleted successfully",
             "ticket_id": ticket_id
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/complaints/bulk")
-async def bulk_delete_complaints(ticket_ids: list[str] = Body(..., embed=True), db: Session = Depends(get_db)):
+async def bulk_delete_complaints(ticket_ids: list[str] = Body(..., embed=True), db: AsyncDB = Depends(get_async_db)):
     """
     Delete multiple complaints by ticket_ids
     """
     try:
-        count = db.query(Complaint).filter(Complaint.ticket_id.in_(ticket_ids)).delete(synchronize_session=False)
-        db.commit()
+        count = await db.run(_delete_complaints, ticket_ids)
+        similarity_index.remove(ticket_ids)
+        near_duplicates.remove(ticket_ids)
         return {"message": f"Successfully deleted {count} complaints", "deleted_count": count}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
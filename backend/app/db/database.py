@@ -1,4 +1,8 @@
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
@@ -23,12 +27,15 @@ elif DATABASE_URL.startswith("mysql://"):
 
 
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
 # ✅ Create engine
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
     echo=False,
     connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 )
@@ -51,6 +58,124 @@ def get_db():
     finally:
         db.close()
 
+
+# ========================================
+# ASYNC ACCESS (THREADPOOL OFFLOAD)
+# ========================================
+# Async routes must not call the Session directly: every query and commit
+# would block the event loop and stall all running pipelines. Blocking DB
+# work goes through run_db / AsyncDB instead, on a dedicated pool sized to
+# the connection pool, so DB calls never queue behind other to_thread work
+# and never wait on the connection pool inside a thread.
+# Routes run a whole unit of work (query, change, commit) as one function
+# in the pool and read what they need before returning, so no attribute
+# access on the loop can trigger a lazy load.
+
+DB_THREADS = int(os.getenv("DB_THREADS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+# false: run DB calls inline on the event loop (old behaviour, for comparison in bench_event_loop.py)
+DB_OFFLOAD = os.getenv("DB_OFFLOAD", "true").lower() == "true"
+_db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
+
+
+class DBPoolStats:
+    """Time DB calls spend queued for a thread and running in it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.run_ms = 0.0
+        self.max_run_ms = 0.0
+
+    def record(self, wait_ms: float, run_ms: float):
+        with self._lock:
+            self.calls += 1
+            self.wait_ms += wait_ms
+            self.run_ms += run_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.max_run_ms = max(self.max_run_ms, run_ms)
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def get_stats(self):
+        calls = self.calls or 1
+        return {
+            "threads": DB_THREADS,
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_wait_ms": round(self.wait_ms / calls, 3),
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "avg_run_ms": round(self.run_ms / calls, 3),
+            "max_run_ms": round(self.max_run_ms, 3),
+        }
+
+
+db_pool_stats = DBPoolStats()
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run blocking database work in the DB threadpool and await the result"""
+    submitted = time.perf_counter()
+
+    def call():
+        started = time.perf_counter()
+        db_pool_stats.enter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            db_pool_stats.exit()
+            db_pool_stats.record((started - submitted) * 1000, (time.perf_counter() - started) * 1000)
+
+    if not DB_OFFLOAD:
+        return call()
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, call)
+
+
+class AsyncDB:
+    """
+    A Session for async code: every call that may touch the database is
+    awaited and runs in the DB threadpool (one call at a time per session).
+    `run(fn, *args)` calls fn(session, *args) there.
+    """
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else SessionLocal()
+
+    async def run(self, fn, *args, **kwargs):
+        return await run_db(fn, self.session, *args, **kwargs)
+
+    def add(self, obj):
+        self.session.add(obj)  # no I/O (autoflush is off)
+
+    async def commit(self):
+        await run_db(self.session.commit)
+
+    async def rollback(self):
+        await run_db(self.session.rollback)
+
+    async def close(self):
+        await run_db(self.session.close)
+
+
+# ✅ Async dependency
+async def get_async_db():
+    db = AsyncDB()
+    try:
+        yield db
+    finally:
+        await db.close()
+
 def run_migrations():
     """Add missing columns to existing tables if they don't exist"""
     from sqlalchemy import text
@@ -63,7 +188,13 @@ def run_migrations():
         ("user_rating", "INTEGER"),
         ("user_feedback", "TEXT"),
         ("subject", "VARCHAR(255)"),
-        ("description", "TEXT")
+        ("description", "TEXT"),
+        ("analysis_status", "VARCHAR(20) DEFAULT 'completed'"),
+        ("prompt_tokens", "INTEGER DEFAULT 0"),
+        ("completion_tokens", "INTEGER DEFAULT 0"),
+        ("llm_calls", "INTEGER DEFAULT 0"),
+        ("solution_by_admin", "BOOLEAN DEFAULT FALSE"),
+        ("near_dup_reusable", "BOOLEAN")
     ]
     
     with engine.connect() as conn:
@@ -42,11 +42,31 @@ class Complaint(Base):
     action = Column(String(255))  # Recommended action
     similar_complaints = Column(Text)  # References to similar issues
     ai_analysis_steps = Column(Text, nullable=True) # Stores JSON of orchestrated steps
+    analysis_status = Column(String(20), default="completed", index=True) # pending, processing, completed, failed
+    prompt_tokens = Column(Integer, default=0) # LLM prompt tokens spent on the analysis
+    completion_tokens = Column(Integer, default=0) # LLM completion tokens spent on the analysis
+    llm_calls = Column(Integer, default=0) # Number of LLM calls made for the analysis
     user_rating = Column(Integer, nullable=True) # User's review rating (1-5)
     user_feedback = Column(Text, nullable=True) # User's qualitative feedback
     created_at = Column(DateTime, default=get_ist_time, index=True)
     updated_at = Column(DateTime, default=get_ist_time, onupdate=get_ist_time)
     is_resolved = Column(Boolean, default=False)
+    solution_by_admin = Column(Boolean, default=False) # solution was written by an admin, not the AI
+    near_dup_reusable = Column(Boolean, nullable=True) # analysis may be reused for near-duplicate complaints
     
     def __repr__(self):
         return f"<Complaint(id={self.id}, category='{self.category}', priority='{self.priority}')>"
+
+class LabeledExample(Base):
+    """Feedback signal (admin correction, resolution or user review) queued for the online learner"""
+    __tablename__ = "labeled_examples"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ticket_id = Column(String(50), index=True, nullable=True)
+    head = Column(String(20), nullable=False)  # category, sentiment or satisfaction
+    label = Column(String(50), nullable=False)
+    text = Column(Text, nullable=False)  # Complaint text, or the AI response for satisfaction
+    context = Column(Text, nullable=True)  # JSON: priority/category for satisfaction examples
+    source = Column(String(30), nullable=False)  # admin_correction, admin_resolution, user_review
+    applied = Column(Boolean, default=False, index=True)  # consumed by the online learner
+    created_at = Column(DateTime, default=get_ist_time)
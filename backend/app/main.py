@@ -1,24 +1,60 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+import asyncio
 import os
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from app.db.database import engine
+from app.db.database import engine, run_migrations
 from app.db import models
 from app.api.routes import router as complaint_router
 from app.api.chat import router as chat_router
+from app.api.metrics import router as metrics_router
 from app.routes.feedback import router as feedback_router
 from app.routes.auth import router as auth_router
+from app.services.analysis_worker import analysis_workers
+from app.services.online_learner import online_learner
+from app.ml.satisfaction_model import get_satisfaction_model
+from app.ml.text_classifier import get_text_classifier
+from app.ml.similarity_index import similarity_index, load_similarity_index
+from app.ml.near_duplicate import load_near_duplicates
+from app.agents.gemini_client import warm_up as warm_up_llm
+from app.agents.cache_layer import redis_cache
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Import the Gemini SDK in the background at startup instead of on the first request
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
 
-# Run custom migrations (add missing columns)
-from app.db.database import run_migrations
-run_migrations()
+def init_database():
+    # Create database tables
+    models.Base.metadata.create_all(bind=engine)
+    # Run custom migrations (add missing columns)
+    run_migrations()
 
-app = FastAPI(title="Quickfix Agentic AI")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Database setup runs at startup, not at import, so importing app.main stays cheap
+    await asyncio.to_thread(init_database)
+    if LLM_WARMUP:
+        asyncio.create_task(asyncio.to_thread(warm_up_llm))
+    # Load the local models (if trained) before the first request
+    get_satisfaction_model()
+    get_text_classifier()
+    # Restore the similar-complaint index snapshot and catch up with new rows
+    await asyncio.to_thread(load_similarity_index)
+    # Recent analyses that near-duplicate complaints can reuse
+    await asyncio.to_thread(load_near_duplicates)
+    # Background workers for complaints submitted with async_mode=true
+    analysis_workers.start()
+    # Applies admin corrections and user reviews to the local models
+    online_learner.start()
+    yield
+    await online_learner.stop()
+    await analysis_workers.stop()
+    similarity_index.save()
+    await redis_cache.close()
+
+app = FastAPI(title="Quickfix Agentic AI", lifespan=lifespan)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -50,6 +86,7 @@ app.add_middleware(
 
 app.include_router(complaint_router)
 app.include_router(chat_router)
+app.include_router(metrics_router)
 app.include_router(feedback_router)
 app.include_router(auth_router)
 
@@ -11,6 +11,26 @@ def get_redis_client():
     except Exception:
         return None
 
+# Shared client; redis-py connects lazily, so this is safe without a server
+redis_client = get_redis_client()
+
+def get_async_redis_client():
+    """asyncio client for the agent cache; short timeouts so a missing server costs little"""
+    try:
+        import redis.asyncio as aioredis
+        from redis.asyncio.retry import Retry
+        from redis.backoff import NoBackoff
+        return aioredis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            decode_responses=True,
+            socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.2")),
+            socket_timeout=float(os.getenv("REDIS_TIMEOUT", "0.2")),
+            retry=Retry(NoBackoff(), 0),  # the cache falls back to the LLM instead of retrying
+        )
+    except Exception:
+        return None
+
 def save_high_priority(complaint_id, data):
     try:
         client = get_redis_client()
@@ -0,0 +1,107 @@
+import re
+import zlib
+from typing import Iterable, List
+import numpy as np
+
+# ========================================
+# HASHED TEXT FEATURES
+# ========================================
+# Stateless hashing vectorizer shared by the local models. Rows are kept in a
+# small CSR layout (indptr/indices/data) so training never needs a dense
+# n_rows x n_features matrix.
+
+N_FEATURES = 2 ** 16
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def ngrams(tokens: List[str], bigrams: bool = True) -> List[str]:
+    grams = list(tokens)
+    if bigrams:
+        grams.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+
+def feature_index(feature: str, n_features: int = N_FEATURES) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(feature.encode("utf-8")) % n_features
+
+
+class SparseRows:
+    """Minimal CSR matrix: row i owns indices/data[indptr[i]:indptr[i+1]]"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_features: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_features = n_features
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def row_ids(self) -> np.ndarray:
+        """Row number of every stored value"""
+        return np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """X @ weights for weights of shape (n_features, k)"""
+        out = np.zeros((self.n_rows, weights.shape[1]), dtype=np.float64)
+        np.add.at(out, self.row_ids(), weights[self.indices] * self.data[:, None])
+        return out
+
+    def t_dot(self, grad: np.ndarray) -> np.ndarray:
+        """X.T @ grad for grad of shape (n_rows, k)"""
+        out = np.zeros((self.n_features, grad.shape[1]), dtype=np.float64)
+        np.add.at(out, self.indices, grad[self.row_ids()] * self.data[:, None])
+        return out
+
+    def take(self, rows: Iterable[int]) -> "SparseRows":
+        """Subset of rows, in the given order"""
+        rows = np.asarray(list(rows), dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        picks = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if len(rows) else np.array([], dtype=np.int64)
+        return SparseRows(indptr, self.indices[picks], self.data[picks], self.n_features)
+
+
+def hash_row(features: List[str], n_features: int = N_FEATURES, normalize: bool = True):
+    """
+    Hash one list of string features into (indices, values):
+    log term-frequency, L2-normalised.
+    """
+    counts = {}
+    for feature in features:
+        idx = feature_index(feature, n_features)
+        counts[idx] = counts.get(idx, 0) + 1
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    if normalize and len(values):
+        values /= np.linalg.norm(values)
+    return indices, values
+
+
+def vectorize(feature_lists: Iterable[List[str]], n_features: int = N_FEATURES, normalize: bool = True) -> SparseRows:
+    """Hash many feature lists into SparseRows (see hash_row)"""
+    indptr, indices, data = [0], [], []
+    for features in feature_lists:
+        row_indices, row_values = hash_row(features, n_features, normalize)
+        indices.append(row_indices)
+        data.append(row_values)
+        indptr.append(indptr[-1] + len(row_indices))
+    return SparseRows(
+        np.asarray(indptr, dtype=np.int64),
+        np.concatenate(indices) if indices else np.array([], dtype=np.int64),
+        np.concatenate(data) if data else np.array([], dtype=np.float64),
+        n_features,
+    )
+
+
+def softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
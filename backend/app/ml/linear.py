@@ -0,0 +1,73 @@
+from typing import Dict, List, Sequence
+import numpy as np
+from app.ml.features import SparseRows, softmax
+
+# ========================================
+# SOFTMAX (MULTINOMIAL LOGISTIC) REGRESSION
+# ========================================
+
+
+class SoftmaxRegression:
+    """Multinomial logistic regression over hashed sparse features"""
+
+    def __init__(self, classes: Sequence[str], n_features: int, l2: float = 1e-4):
+        self.classes = list(classes)
+        self.n_features = n_features
+        self.l2 = l2
+        self.weights = np.zeros((n_features, len(self.classes)), dtype=np.float64)
+        self.bias = np.zeros(len(self.classes), dtype=np.float64)
+
+    def _targets(self, labels: List[str]) -> np.ndarray:
+        index = {c: i for i, c in enumerate(self.classes)}
+        targets = np.zeros((len(labels), len(self.classes)))
+        targets[np.arange(len(labels)), [index[label] for label in labels]] = 1.0
+        return targets
+
+    def _step(self, X: SparseRows, targets: np.ndarray, lr: float):
+        grad = (softmax(X.dot(self.weights) + self.bias) - targets) / X.n_rows
+        self.weights -= lr * (X.t_dot(grad) + self.l2 * self.weights)
+        self.bias -= lr * grad.sum(axis=0)
+
+    def fit(self, X: SparseRows, labels: List[str], epochs: int = 300, lr: float = 2.0) -> "SoftmaxRegression":
+        """Full-batch gradient descent from the current weights"""
+        targets = self._targets(labels)
+        for _ in range(epochs):
+            self._step(X, targets, lr)
+        return self
+
+    def partial_fit(self, X: SparseRows, labels: List[str], lr: float = 0.5, steps: int = 1) -> "SoftmaxRegression":
+        """Incremental update with a few gradient steps on new examples only"""
+        targets = self._targets(labels)
+        for _ in range(steps):
+            self._step(X, targets, lr)
+        return self
+
+    def copy(self) -> "SoftmaxRegression":
+        """Independent copy, so a live model can be updated off to the side and swapped in"""
+        model = SoftmaxRegression(self.classes, self.n_features, self.l2)
+        model.weights = self.weights.copy()
+        model.bias = self.bias.copy()
+        return model
+
+    def predict_proba(self, X: SparseRows) -> np.ndarray:
+        return softmax(X.dot(self.weights) + self.bias)
+
+    def predict_one(self, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Class probabilities for a single row, without building a SparseRows"""
+        scores = values @ self.weights[indices] + self.bias
+        return softmax(scores[None, :])[0]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "classes": np.asarray(self.classes),
+            "weights": self.weights.astype(np.float32),
+            "bias": self.bias,
+            "l2": np.asarray(self.l2),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "SoftmaxRegression":
+        model = cls([str(c) for c in arrays["classes"]], arrays["weights"].shape[0], float(arrays["l2"]))
+        model.weights = arrays["weights"].astype(np.float64)
+        model.bias = arrays["bias"].astype(np.float64)
+        return model
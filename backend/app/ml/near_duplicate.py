@@ -0,0 +1,203 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from app.ml.features import tokenize
+
+# ========================================
+# NEAR-DUPLICATE COMPLAINT INDEX
+# ========================================
+# 64-bit SimHash fingerprints of recently analysed complaints. Numbers are
+# normalised away ("order #123" and "order #456" shingle the same) and
+# fingerprints are split into NEAR_DUP_MAX_DISTANCE + 1 bands, so any pair
+# within that Hamming distance shares at least one band exactly and lookups
+# only compare a handful of bucket candidates. A match hands back the stored
+# category, priority, sentiment and solution for the pipeline to reuse.
+# Only clean analyses are offered: no fallback in a reused field, no admin
+# corrections or solutions (Complaint.near_dup_reusable, also used at startup).
+
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "20000"))
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "6"))  # of 64 bits
+NEAR_DUP_MAX_AGE = float(os.getenv("NEAR_DUP_MAX_AGE", str(7 * 86400)))  # seconds
+# Shorter complaints have too few shingles for a trustworthy fingerprint
+NEAR_DUP_MIN_TOKENS = int(os.getenv("NEAR_DUP_MIN_TOKENS", "8"))
+SHINGLE_SIZE = 3
+REUSED_FIELDS = ("category", "priority", "sentiment", "solution")
+
+NUMBER_RE = re.compile(r"\d")
+
+
+def shingles(text: str) -> List[str]:
+    """Word 3-shingles with every token containing a digit collapsed to '#'"""
+    tokens = ["#" if NUMBER_RE.search(t) else t for t in tokenize(text)]
+    if len(tokens) < SHINGLE_SIZE:
+        return tokens
+    return [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+
+def simhash(features: List[str]) -> int:
+    """64-bit SimHash: each bit is the majority vote of the features' hash bits"""
+    if not features:
+        return 0
+    digests = b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), 64)
+    votes = bits.sum(axis=0, dtype=np.int32) * 2 > len(features)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+class NearDuplicateIndex:
+    """Memory-bounded LSH index over SimHash fingerprints, oldest entries evicted first"""
+
+    def __init__(self, max_entries: int = NEAR_DUP_MAX_ENTRIES, max_distance: int = NEAR_DUP_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._lock = threading.Lock()
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()  # ticket_id -> entry
+        self.buckets: Dict[tuple, set] = {}  # (band, value) -> ticket_ids
+        self.lookups = 0
+        self.reuses = 0
+        self.skipped_short = 0
+        self.evictions = 0
+        self.distance_total = 0
+
+    def _band_keys(self, fingerprint: int):
+        mask = (1 << self.band_bits) - 1
+        return [(band, (fingerprint >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+
+    def _fingerprint(self, text: str):
+        features = shingles(text)
+        if len(features) < NEAR_DUP_MIN_TOKENS - SHINGLE_SIZE + 1:
+            return None, 0
+        return simhash(features), len(features)
+
+    def _drop(self, ticket_id: str):
+        entry = self.entries.pop(ticket_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry["fingerprint"]):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(ticket_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def add(self, ticket_id: str, text: str, fields: Dict, created: float = None):
+        """Remember an analysis; replaces the ticket's previous entry"""
+        fingerprint, size = self._fingerprint(text)
+        if fingerprint is None or any(not fields.get(field) for field in REUSED_FIELDS):
+            return
+        entry = {
+            "fingerprint": fingerprint,
+            "size": size,
+            "created": time.time() if created is None else created,
+            "fields": {field: fields.get(field) for field in REUSED_FIELDS},
+        }
+        with self._lock:
+            self._drop(ticket_id)
+            self.entries[ticket_id] = entry
+            for key in self._band_keys(fingerprint):
+                self.buckets.setdefault(key, set()).add(ticket_id)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove(self, ticket_ids):
+        with self._lock:
+            for ticket_id in ticket_ids:
+                self._drop(ticket_id)
+
+    def lookup(self, text: str) -> Optional[Dict]:
+        """
+        Closest stored analysis within max_distance bits, as
+        {"ticket_id", "similarity", "fields"}, or None.
+        """
+        self.lookups += 1
+        fingerprint, size = self._fingerprint(text)
+        if fingerprint is None:
+            self.skipped_short += 1
+            return None
+        oldest = time.time() - NEAR_DUP_MAX_AGE
+        best, best_distance = None, self.max_distance + 1
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(fingerprint):
+                candidates |= self.buckets.get(key, set())
+            for ticket_id in candidates:
+                entry = self.entries[ticket_id]
+                if entry["created"] < oldest or min(size, entry["size"]) < 0.8 * max(size, entry["size"]):
+                    continue
+                distance = bin(fingerprint ^ entry["fingerprint"]).count("1")
+                if distance < best_distance:
+                    best, best_distance = ticket_id, distance
+            if best is None:
+                return None
+            fields = dict(self.entries[best]["fields"])
+        self.reuses += 1
+        self.distance_total += best_distance
+        return {"ticket_id": best, "similarity": round(1 - best_distance / 64, 4), "fields": fields}
+
+    def sync(self, db) -> int:
+        """
+        Load the most recent reusable analyses from the database (oldest first):
+        the same ones the pipeline adds live, so no fallbacks, corrected labels
+        or admin-written solutions. Rows analysed before near_dup_reusable
+        existed are skipped, as nothing says whether they fell back.
+        """
+        from sqlalchemy import or_
+        from app.db.models import Complaint
+
+        rows = (
+            db.query(Complaint)
+            .filter(Complaint.ticket_id.isnot(None))
+            .filter(or_(Complaint.analysis_status == "completed", Complaint.analysis_status.is_(None)))
+            .filter(Complaint.near_dup_reusable.is_(True))
+            .filter(or_(Complaint.solution_by_admin.is_(False), Complaint.solution_by_admin.is_(None)))
+            .order_by(Complaint.id.desc())
+            .limit(self.max_entries)
+            .all()
+        )
+        for complaint in reversed(rows):
+            text = f"Subject: {complaint.subject}\nDescription: {complaint.description or complaint.complaint_text}"
+            created = complaint.created_at.timestamp() if complaint.created_at else None
+            self.add(complaint.ticket_id, text, {
+                "category": complaint.category, "priority": complaint.priority,
+                "sentiment": complaint.sentiment, "solution": complaint.solution,
+            }, created)
+        return len(rows)
+
+    def get_stats(self):
+        return {
+            "enabled": NEAR_DUP_ENABLED,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "lookups": self.lookups,
+            "reuses": self.reuses,
+            "reuse_rate": f"{self.reuses / self.lookups * 100:.2f}%" if self.lookups else "0.00%",
+            "avg_similarity": round(1 - self.distance_total / self.reuses / 64, 4) if self.reuses else None,
+            "skipped_short": self.skipped_short,
+            "evictions": self.evictions,
+        }
+
+
+near_duplicates = NearDuplicateIndex()
+
+
+def load_near_duplicates():
+    """Startup: warm the index from the most recent complaints"""
+    from app.db.database import SessionLocal
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        loaded = near_duplicates.sync(db)
+    finally:
+        db.close()
+    print(f"🧬 Near-duplicate index ready: {loaded} complaints in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,145 @@
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.ml.features import N_FEATURES, hash_row, ngrams, tokenize, vectorize
+from app.ml.linear import SoftmaxRegression
+
+# ========================================
+# LOCAL SATISFACTION PREDICTOR
+# ========================================
+# Softmax regression trained on real user ratings stored in the complaints
+# table. Replaces the Gemini call in predict_satisfaction once a trained
+# snapshot exists on disk (see `python train_models.py satisfaction`).
+
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "models"))
+SATISFACTION_MODEL_PATH = os.getenv("SATISFACTION_MODEL_PATH", os.path.join(MODEL_DIR, "satisfaction.npz"))
+
+CLASSES = ["Low", "Medium", "High"]
+MIN_TRAINING_ROWS = 20
+
+
+def rating_to_label(rating: int) -> Optional[str]:
+    """Map a 1-5 user rating onto the satisfaction scale"""
+    if rating is None:
+        return None
+    if rating <= 2:
+        return "Low"
+    if rating == 3:
+        return "Medium"
+    return "High"
+
+
+def satisfaction_features(response: str, priority: str, category: str) -> List[str]:
+    features = ngrams(tokenize(response))
+    features += [f"priority={priority}", f"category={category}", f"priority={priority}|category={category}"]
+    return features
+
+
+class SatisfactionModel:
+    """Trained satisfaction predictor plus its training report"""
+
+    def __init__(self, regression: SoftmaxRegression, report: Dict = None):
+        self.regression = regression
+        self.report = report or {}
+
+    def predict_proba(self, response: str, priority: str, category: str) -> Dict[str, float]:
+        indices, values = hash_row(satisfaction_features(response, priority, category), self.regression.n_features)
+        proba = self.regression.predict_one(indices, values)
+        return dict(zip(self.regression.classes, proba.tolist()))
+
+    def predict(self, response: str, priority: str, category: str) -> str:
+        proba = self.predict_proba(response, priority, category)
+        return max(proba, key=proba.get)
+
+    def save(self, path: str = SATISFACTION_MODEL_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, report=np.asarray(repr(self.report)), **self.regression.to_arrays())
+        os.replace(tmp_path, path)  # atomic swap for running readers
+
+    @classmethod
+    def load(cls, path: str = SATISFACTION_MODEL_PATH) -> "SatisfactionModel":
+        with np.load(path) as arrays:
+            regression = SoftmaxRegression.from_arrays(arrays)
+            report = str(arrays["report"])
+        return cls(regression, {"summary": report})
+
+
+def _accuracy(predicted: List[str], actual: List[str]) -> float:
+    return sum(p == a for p, a in zip(predicted, actual)) / len(actual) if actual else 0.0
+
+
+def train_satisfaction_model(rows: List[Dict], holdout: float = 0.2, seed: int = 42,
+                             n_features: int = N_FEATURES) -> Tuple[SatisfactionModel, Dict]:
+    """
+    Train on rows with keys response, priority, category, user_rating and
+    (optionally) satisfaction_prediction, the stored LLM guess.
+    Reports held-out accuracy against the LLM's own predictions, then refits
+    on every row for the saved model.
+    """
+    labelled = [r for r in rows if rating_to_label(r.get("user_rating")) and r.get("response")]
+    if len(labelled) < MIN_TRAINING_ROWS:
+        raise ValueError(f"Need at least {MIN_TRAINING_ROWS} rated complaints, found {len(labelled)}")
+
+    random.Random(seed).shuffle(labelled)
+    n_test = max(1, int(len(labelled) * holdout))
+    test, train = labelled[:n_test], labelled[n_test:]
+
+    def features(batch):
+        return vectorize((satisfaction_features(r["response"], r["priority"], r["category"]) for r in batch), n_features)
+
+    def labels(batch):
+        return [rating_to_label(r["user_rating"]) for r in batch]
+
+    held_out = SoftmaxRegression(CLASSES, n_features).fit(features(train), labels(train))
+    predicted = [CLASSES[i] for i in held_out.predict_proba(features(test)).argmax(axis=1)]
+    actual = labels(test)
+    llm_rows = [(r.get("satisfaction_prediction"), a) for r, a in zip(test, actual) if r.get("satisfaction_prediction")]
+
+    model = SatisfactionModel(SoftmaxRegression(CLASSES, n_features).fit(features(labelled), labels(labelled)))
+
+    started = time.perf_counter()
+    for r in test:
+        model.predict(r["response"], r["priority"], r["category"])
+    per_prediction = (time.perf_counter() - started) / len(test)
+
+    report = {
+        "rows": len(labelled),
+        "train_rows": len(train),
+        "test_rows": len(test),
+        "held_out_accuracy": round(_accuracy(predicted, actual), 4),
+        "llm_accuracy": round(_accuracy([p for p, _ in llm_rows], [a for _, a in llm_rows]), 4) if llm_rows else None,
+        "llm_compared_rows": len(llm_rows),
+        "predict_latency_ms": round(per_prediction * 1000, 4),
+    }
+    model.report = report
+    return model, report
+
+
+# ---------- Shared instance ----------
+
+_model: Optional[SatisfactionModel] = None
+_load_attempted = False
+
+
+def get_satisfaction_model() -> Optional[SatisfactionModel]:
+    """The loaded local model, or None when no trained snapshot exists"""
+    global _model, _load_attempted
+    if not _load_attempted:
+        _load_attempted = True
+        if os.path.exists(SATISFACTION_MODEL_PATH):
+            try:
+                _model = SatisfactionModel.load(SATISFACTION_MODEL_PATH)
+                print(f"🧠 Loaded satisfaction model from {SATISFACTION_MODEL_PATH}")
+            except Exception as e:
+                print(f"⚠ Could not load satisfaction model: {e}")
+    return _model
+
+
+def set_satisfaction_model(model: Optional[SatisfactionModel]):
+    """Swap in a new model (reference assignment is atomic for readers)"""
+    global _model, _load_attempted
+    _model = model
+    _load_attempted = True
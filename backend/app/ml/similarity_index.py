@@ -0,0 +1,273 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from app.ml.features import hash_row, ngrams, tokenize
+from app.ml.satisfaction_model import MODEL_DIR
+
+# ========================================
+# SIMILAR COMPLAINT INDEX
+# ========================================
+# Hashed n-gram vectors of every analysed complaint (subject + description)
+# in one dense float32 matrix. Documents are stored as L2-normalised log-tf
+# rows; IDF is applied to the query only, so inserts never touch existing
+# rows. Memory is SIMILARITY_DIM * 4 bytes per complaint (8 KB by default).
+
+SIMILARITY_DIM = int(os.getenv("SIMILARITY_DIM", "2048"))
+SIMILARITY_TOP_K = int(os.getenv("SIMILARITY_TOP_K", "3"))
+SIMILARITY_MIN_SCORE = float(os.getenv("SIMILARITY_MIN_SCORE", "0.2"))
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", os.path.join(MODEL_DIR, "similarity_index.npz"))
+
+
+# Field labels of the agent text ("Subject: ...\nDescription: ..."); rows are
+# indexed from "subject description", so queries must not carry them either
+FIELD_LABEL_RE = re.compile(r"(?im)^\s*(?:subject|description):")
+
+
+def complaint_features(text: str) -> List[str]:
+    return ngrams(tokenize(FIELD_LABEL_RE.sub(" ", text)))
+
+
+class SimilarityIndex:
+    """Incremental top-k cosine search over stored complaints"""
+
+    def __init__(self, dim: int = SIMILARITY_DIM):
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._reset()
+        self.searches = 0
+        self.search_time = 0.0
+
+    def _reset(self):
+        self.matrix = np.zeros((64, self.dim), dtype=np.float32)
+        self.df = np.zeros(self.dim, dtype=np.int64)
+        self.alive = np.zeros(64, dtype=bool)
+        self.codes = np.zeros(64, dtype=np.int32)  # category code per row
+        self.category_codes: Dict[str, int] = {}
+        self.n = 0
+        self.rows: Dict[str, int] = {}  # ticket_id -> row
+        self.ticket_ids: List[str] = []
+        self.subjects: List[str] = []
+        self.categories: List[str] = []
+        self.solutions: List[str] = []
+        self.resolved: List[bool] = []
+        self.last_id = 0
+        self.synced_at: Optional[datetime] = None
+
+    @property
+    def size(self) -> int:
+        return int(self.alive[:self.n].sum())
+
+    # ---------- Writes ----------
+
+    def _grow(self):
+        capacity = len(self.matrix) * 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self.n] = self.matrix[:self.n]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.n] = self.alive[:self.n]
+        codes = np.zeros(capacity, dtype=np.int32)
+        codes[:self.n] = self.codes[:self.n]
+        self.matrix, self.alive, self.codes = matrix, alive, codes
+
+    def _drop(self, row: int):
+        if self.alive[row]:
+            self.df -= self.matrix[row] != 0
+            self.alive[row] = False
+
+    def add(self, ticket_id: str, subject: str, description: str, category: str,
+            solution: str = "", is_resolved: bool = False, complaint_id: int = None):
+        """Insert a complaint, or replace it if the ticket is already indexed"""
+        indices, values = hash_row(complaint_features(f"{subject or ''} {description or ''}"), self.dim)
+        with self._lock:
+            row = self.rows.get(ticket_id)
+            if row is None:
+                if self.n == len(self.matrix):
+                    self._grow()
+                row = self.n
+                self.n += 1
+                self.rows[ticket_id] = row
+                self.ticket_ids.append(ticket_id)
+                self.subjects.append("")
+                self.categories.append("")
+                self.solutions.append("")
+                self.resolved.append(False)
+            else:
+                self._drop(row)
+            self.matrix[row] = 0
+            self.matrix[row, indices] = values
+            self.df[indices] += 1
+            self.alive[row] = True
+            self.subjects[row] = (subject or "")[:120]
+            self.categories[row] = category or "Other"
+            self.codes[row] = self.category_codes.setdefault(self.categories[row], len(self.category_codes))
+            self.solutions[row] = solution or ""
+            self.resolved[row] = bool(is_resolved)
+            if complaint_id:
+                self.last_id = max(self.last_id, complaint_id)
+
+    def update_resolution(self, ticket_id: str, solution: str = None, is_resolved: bool = None):
+        """Reflect an admin solution / resolution change without re-vectorising"""
+        with self._lock:
+            row = self.rows.get(ticket_id)
+            if row is None:
+                return
+            if solution:
+                self.solutions[row] = solution
+            if is_resolved is not None:
+                self.resolved[row] = bool(is_resolved)
+
+    def remove(self, ticket_ids: Iterable[str]):
+        with self._lock:
+            for ticket_id in ticket_ids:
+                row = self.rows.pop(ticket_id, None)
+                if row is not None:
+                    self._drop(row)
+
+    # ---------- Search ----------
+
+    def search(self, text: str, category: str = None, k: int = SIMILARITY_TOP_K,
+               min_score: float = SIMILARITY_MIN_SCORE) -> List[Dict]:
+        """Top-k most similar indexed complaints, optionally within one category"""
+        started = time.perf_counter()
+        indices, values = hash_row(complaint_features(text), self.dim, normalize=False)
+        with self._lock:
+            n = self.n
+            matrix, alive, df, codes = self.matrix, self.alive[:n].copy(), self.df, self.codes[:n]
+            category_code = self.category_codes.get(category, -1)
+        if n == 0 or not len(indices):
+            return []
+
+        weights = values * (np.log((1 + alive.sum()) / (1 + df[indices])) + 1.0)
+        weights /= np.linalg.norm(weights)
+        scores = matrix[:n, indices] @ weights.astype(np.float32)
+
+        mask = alive
+        if category:
+            mask = mask & (codes == category_code)
+        scores = np.where(mask, scores, -1.0)
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        matches = [
+            {
+                "ticket_id": self.ticket_ids[row],
+                "subject": self.subjects[row],
+                "category": self.categories[row],
+                "solution": self.solutions[row],
+                "is_resolved": self.resolved[row],
+                "score": round(float(scores[row]), 3),
+            }
+            for row in top if scores[row] >= min_score
+        ]
+        self.searches += 1
+        self.search_time += time.perf_counter() - started
+        return matches
+
+    # ---------- Persistence ----------
+
+    def save(self, path: str = SIMILARITY_INDEX_PATH):
+        with self._lock:
+            n = self.n
+            arrays = dict(
+                matrix=self.matrix[:n], df=self.df, alive=self.alive[:n],
+                ticket_ids=np.asarray(self.ticket_ids, dtype=str),
+                subjects=np.asarray(self.subjects, dtype=str),
+                categories=np.asarray(self.categories, dtype=str),
+                solutions=np.asarray(self.solutions, dtype=str),
+                resolved=np.asarray(self.resolved, dtype=bool),
+                last_id=np.asarray(self.last_id),
+                synced_at=np.asarray(self.synced_at.isoformat() if self.synced_at else ""),
+            )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = SIMILARITY_INDEX_PATH) -> bool:
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as arrays:
+            if arrays["matrix"].shape[1] != self.dim:
+                print(f"⚠ Similarity index snapshot has dim {arrays['matrix'].shape[1]}, expected {self.dim}; rebuilding")
+                return False
+            with self._lock:
+                self._reset()
+                n = len(arrays["ticket_ids"])
+                self.matrix = np.zeros((max(64, n * 2), self.dim), dtype=np.float32)
+                self.matrix[:n] = arrays["matrix"]
+                self.alive = np.zeros(len(self.matrix), dtype=bool)
+                self.alive[:n] = arrays["alive"]
+                self.codes = np.zeros(len(self.matrix), dtype=np.int32)
+                self.df = arrays["df"].astype(np.int64)
+                self.n = n
+                self.ticket_ids = [str(t) for t in arrays["ticket_ids"]]
+                self.subjects = [str(s) for s in arrays["subjects"]]
+                self.categories = [str(c) for c in arrays["categories"]]
+                self.solutions = [str(s) for s in arrays["solutions"]]
+                self.resolved = [bool(r) for r in arrays["resolved"]]
+                for i, c in enumerate(self.categories):
+                    self.codes[i] = self.category_codes.setdefault(c, len(self.category_codes))
+                self.rows = {t: i for i, t in enumerate(self.ticket_ids) if self.alive[i]}
+                self.last_id = int(arrays["last_id"])
+                synced_at = str(arrays["synced_at"])
+                self.synced_at = datetime.fromisoformat(synced_at) if synced_at else None
+        return True
+
+    def sync(self, db) -> int:
+        """
+        Index complaints added or updated since the last sync (all of them on
+        first run). Only completed analyses are indexed.
+        """
+        from sqlalchemy import or_
+        from app.db.models import Complaint
+        from app.db.database import get_ist_time
+
+        started = get_ist_time()
+        query = db.query(Complaint).filter(Complaint.ticket_id.isnot(None))
+        if self.synced_at is not None:
+            query = query.filter(or_(Complaint.id > self.last_id, Complaint.updated_at >= self.synced_at))
+        count = 0
+        for complaint in query.yield_per(500):
+            if (complaint.analysis_status or "completed") != "completed":
+                continue
+            self.add(
+                complaint.ticket_id, complaint.subject, complaint.description or complaint.complaint_text,
+                complaint.category, complaint.solution, complaint.is_resolved, complaint.id,
+            )
+            count += 1
+        self.synced_at = started
+        return count
+
+    def get_stats(self):
+        avg = self.search_time / self.searches * 1000 if self.searches else 0.0
+        return {
+            "indexed_complaints": self.size,
+            "dim": self.dim,
+            "memory_mb": round(self.matrix.nbytes / 1e6, 2),
+            "searches": self.searches,
+            "avg_search_ms": f"{avg:.2f}",
+        }
+
+
+similarity_index = SimilarityIndex()
+
+
+def load_similarity_index(path: str = SIMILARITY_INDEX_PATH):
+    """Startup: restore the snapshot, catch up with the database, re-snapshot"""
+    from app.db.database import SessionLocal
+
+    started = time.perf_counter()
+    loaded = similarity_index.load(path)
+    db = SessionLocal()
+    try:
+        added = similarity_index.sync(db)
+    finally:
+        db.close()
+    similarity_index.save(path)
+    print(f"🔎 Similarity index ready: {similarity_index.size} complaints "
+          f"({'snapshot + ' if loaded else ''}{added} synced) in {time.perf_counter() - started:.2f}s")
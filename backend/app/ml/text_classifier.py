@@ -0,0 +1,228 @@
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.ml.features import N_FEATURES, hash_row, ngrams, tokenize, vectorize
+from app.ml.linear import SoftmaxRegression
+from app.ml.satisfaction_model import MODEL_DIR
+
+# ========================================
+# LOCAL CATEGORY / SENTIMENT CLASSIFIER
+# ========================================
+# Two softmax-regression heads over hashed unigrams and bigrams of the
+# complaint text, trained on COMPLAINT_EXAMPLES plus labelled rows from the
+# complaints table (see `python train_models.py classifier`). The agents
+# answer from it when the top class is at least LOCAL_CLASSIFIER_THRESHOLD
+# likely and escalate to Gemini otherwise.
+
+TEXT_MODEL_PATH = os.getenv("TEXT_MODEL_PATH", os.path.join(MODEL_DIR, "text_classifier.npz"))
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.7"))
+
+CATEGORY_CLASSES = ["Billing", "Technical", "Delivery", "Service", "Security", "Other"]
+SENTIMENT_CLASSES = ["Positive", "Neutral", "Negative", "Angry"]
+# Labels used in the training examples that the agents never return
+SENTIMENT_ALIASES = {"Frustrated": "Negative", "Concerned": "Negative"}
+HEADS = ("category", "sentiment")
+MIN_TRAINING_ROWS = 10
+
+
+def normalize_label(head: str, label: Optional[str]) -> Optional[str]:
+    """Training label on the agent's scale, or None if it is not one"""
+    if not label:
+        return None
+    label = label.strip()
+    if head == "sentiment":
+        label = SENTIMENT_ALIASES.get(label, label)
+        return label if label in SENTIMENT_CLASSES else None
+    return label if label in CATEGORY_CLASSES else None
+
+
+def text_features(text: str) -> List[str]:
+    return ngrams(tokenize(text))
+
+
+class TextClassifier:
+    """Category and sentiment heads sharing one feature hashing"""
+
+    def __init__(self, heads: Dict[str, SoftmaxRegression], report: Dict = None):
+        self.heads = heads
+        self.report = report or {}
+
+    def predict_proba(self, head: str, text: str) -> Dict[str, float]:
+        regression = self.heads[head]
+        indices, values = hash_row(text_features(text), regression.n_features)
+        return dict(zip(regression.classes, regression.predict_one(indices, values).tolist()))
+
+    def predict(self, head: str, text: str) -> Tuple[str, float]:
+        """(top label, its probability)"""
+        proba = self.predict_proba(head, text)
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+    def save(self, path: str = TEXT_MODEL_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        arrays = {
+            f"{head}_{name}": value
+            for head, regression in self.heads.items()
+            for name, value in regression.to_arrays().items()
+        }
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, report=np.asarray(repr(self.report)), **arrays)
+        os.replace(tmp_path, path)  # atomic swap for running readers
+
+    @classmethod
+    def load(cls, path: str = TEXT_MODEL_PATH) -> "TextClassifier":
+        with np.load(path) as arrays:
+            heads = {
+                head: SoftmaxRegression.from_arrays({
+                    name: arrays[f"{head}_{name}"] for name in ("classes", "weights", "bias", "l2")
+                })
+                for head in HEADS
+            }
+            report = str(arrays["report"])
+        return cls(heads, {"summary": report})
+
+
+def example_rows() -> List[Dict]:
+    """COMPLAINT_EXAMPLES from the training data as {text, category, sentiment} rows"""
+    from app.agents.training_data import COMPLAINT_EXAMPLES
+
+    return [
+        {"text": example["text"], "category": category, "sentiment": example.get("sentiment")}
+        for category, examples in COMPLAINT_EXAMPLES.items()
+        for example in examples
+    ]
+
+
+def _labelled(rows: List[Dict], head: str) -> List[Tuple[str, str]]:
+    pairs = []
+    for row in rows:
+        label = normalize_label(head, row.get(head))
+        if label and row.get("text"):
+            pairs.append((row["text"], label))
+    return pairs
+
+
+def _fit(pairs: List[Tuple[str, str]], classes: List[str], n_features: int) -> SoftmaxRegression:
+    X = vectorize((text_features(text) for text, _ in pairs), n_features)
+    return SoftmaxRegression(classes, n_features).fit(X, [label for _, label in pairs])
+
+
+def train_text_classifier(rows: List[Dict], holdout: float = 0.2, seed: int = 42,
+                          n_features: int = N_FEATURES,
+                          threshold: float = LOCAL_CLASSIFIER_THRESHOLD) -> Tuple[TextClassifier, Dict]:
+    """
+    Train both heads on rows with keys text, category and sentiment (the
+    historical complaints), always including the training-data examples.
+    A share of the historical rows is held out to report accuracy and how
+    many requests would be answered locally at `threshold`; the saved model
+    is then refit on everything.
+    """
+    rows = list(rows)
+    random.Random(seed).shuffle(rows)
+    n_test = int(len(rows) * holdout)
+    test, train = rows[:n_test], rows[n_test:]
+    examples = example_rows()
+
+    classes = {"category": CATEGORY_CLASSES, "sentiment": SENTIMENT_CLASSES}
+    report = {"historical_rows": len(rows), "example_rows": len(examples), "test_rows": n_test, "threshold": threshold}
+    heads = {}
+    for head in HEADS:
+        everything = _labelled(examples + rows, head)
+        if len(everything) < MIN_TRAINING_ROWS:
+            raise ValueError(f"Need at least {MIN_TRAINING_ROWS} rows labelled with {head}, found {len(everything)}")
+
+        held_out = _labelled(test, head)
+        if held_out:
+            model = _fit(_labelled(examples + train, head), classes[head], n_features)
+            X = vectorize((text_features(text) for text, _ in held_out), n_features)
+            proba = model.predict_proba(X)
+            predicted = proba.argmax(axis=1)
+            confident = proba.max(axis=1) >= threshold
+            correct = np.array([model.classes[i] == label for i, (_, label) in zip(predicted, held_out)])
+            report[head] = {
+                "train_rows": len(everything) - len(held_out),
+                "held_out_accuracy": round(float(correct.mean()), 4),
+                "local_rate": round(float(confident.mean()), 4),
+                "local_accuracy": round(float(correct[confident].mean()), 4) if confident.any() else None,
+            }
+        else:
+            report[head] = {"train_rows": len(everything), "held_out_accuracy": None}
+        heads[head] = _fit(everything, classes[head], n_features)
+
+    model = TextClassifier(heads, report)
+    sample = [row["text"] for row in (test or examples)][:200]
+    started = time.perf_counter()
+    for text in sample:
+        model.predict("category", text)
+    report["predict_latency_ms"] = round((time.perf_counter() - started) / len(sample) * 1000, 4) if sample else None
+    return model, report
+
+
+class ClassifierMetrics:
+    """How often each head answered locally vs escalated to the LLM"""
+
+    def __init__(self):
+        self.local = {head: 0 for head in HEADS}
+        self.escalated = {head: 0 for head in HEADS}
+
+    def record(self, head: str, escalated: bool):
+        counts = self.escalated if escalated else self.local
+        counts[head] = counts.get(head, 0) + 1
+
+    def get_stats(self):
+        model = get_text_classifier()
+        stats = {"model_loaded": model is not None, "threshold": LOCAL_CLASSIFIER_THRESHOLD}
+        for head in HEADS:
+            total = self.local[head] + self.escalated[head]
+            stats[head] = {
+                "local": self.local[head],
+                "escalated": self.escalated[head],
+                "escalation_rate": f"{self.escalated[head] / total * 100:.2f}%" if total else "0.00%",
+            }
+        return stats
+
+
+classifier_metrics = ClassifierMetrics()
+
+
+def classify_locally(head: str, text: str, threshold: float = LOCAL_CLASSIFIER_THRESHOLD) -> Optional[str]:
+    """
+    The local model's label when it is confident enough, else None (the
+    caller escalates to the LLM). Nothing is recorded when no model is loaded.
+    """
+    model = get_text_classifier()
+    if model is None:
+        return None
+    label, probability = model.predict(head, text)
+    confident = probability >= threshold
+    classifier_metrics.record(head, escalated=not confident)
+    return label if confident else None
+
+
+# ---------- Shared instance ----------
+
+_model: Optional[TextClassifier] = None
+_load_attempted = False
+
+
+def get_text_classifier() -> Optional[TextClassifier]:
+    """The loaded local classifier, or None when no trained snapshot exists"""
+    global _model, _load_attempted
+    if not _load_attempted:
+        _load_attempted = True
+        if os.path.exists(TEXT_MODEL_PATH):
+            try:
+                _model = TextClassifier.load(TEXT_MODEL_PATH)
+                print(f"🧠 Loaded text classifier from {TEXT_MODEL_PATH}")
+            except Exception as e:
+                print(f"⚠ Could not load text classifier: {e}")
+    return _model
+
+
+def set_text_classifier(model: Optional[TextClassifier]):
+    """Swap in a new model (reference assignment is atomic for readers)"""
+    global _model, _load_attempted
+    _model = model
+    _load_attempted = True
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 
 class ComplaintRequest(BaseModel):
@@ -28,6 +28,30 @@ class ComplaintResponse(BaseModel):
     steps: Optional[list] = []
 
 
+class ComplaintStatusResponse(BaseModel):
+    """Analysis progress for a complaint submitted in async mode"""
+    ticket_id: str
+    analysis_status: str = "completed"  # pending, processing, completed, failed
+    steps: list = []
+    result: Optional[ComplaintResponse] = None
+
+
+class BatchComplaintItem(BaseModel):
+    """Outcome for one complaint of a batch submission"""
+    index: int
+    ticket_id: Optional[str] = None
+    result: Optional[ComplaintResponse] = None
+    error: Optional[str] = None
+
+
+class BatchComplaintResponse(BaseModel):
+    """Response schema for bulk complaint submission"""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchComplaintItem] = []
+
+
 class ComplaintDB(BaseModel):
     """Database schema for storing complaint"""
     id: int
@@ -43,6 +67,7 @@ class ComplaintDB(BaseModel):
     action: Optional[str]
     similar_complaints: Optional[str]
     ai_analysis_steps: Optional[str]
+    analysis_status: Optional[str] = "completed"
     user_rating: Optional[int]
     user_feedback: Optional[str]
     created_at: datetime
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+from datetime import timedelta
+from sqlalchemy import update
+from app.agents.orchestrator import run_agent_pipeline
+from app.db.database import SessionLocal, get_ist_time, run_db
+from app.db.models import Complaint
+from app.services.complaint_service import (
+    analysis_text, analysis_values, complaint_request, index_complaint, send_confirmation
+)
+
+# ========================================
+# BACKGROUND ANALYSIS WORKERS
+# ========================================
+# Runs the agent pipeline for complaints submitted in async mode.
+# The complaints table is the queue: rows wait in `pending`, a worker claims
+# one by flipping it to `processing`, and finishes with `completed`/`failed`.
+# An in-memory queue wakes workers immediately; polling picks up rows left
+# by restarts or by other processes.
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_POLL_INTERVAL = float(os.getenv("ANALYSIS_POLL_INTERVAL", "5"))
+# `processing` rows untouched this long are assumed orphaned by a crash
+ANALYSIS_STALE_AFTER = int(os.getenv("ANALYSIS_STALE_AFTER", "600"))
+
+PENDING = "pending"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class AnalysisWorkerPool:
+    """In-process asyncio workers backed by the complaints table"""
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, poll_interval: float = ANALYSIS_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._queue: asyncio.Queue = None
+        self._queued = set()
+        self._tasks = []
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        """Start worker and poller tasks (call from the app lifespan)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._poll()))
+        print(f"⚙️ Started {self.workers} analysis workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, ticket_id: str):
+        """Wake a worker for a freshly stored pending complaint"""
+        if self._queue is not None and ticket_id not in self._queued:
+            self._queued.add(ticket_id)
+            self._queue.put_nowait(ticket_id)
+
+    def get_stats(self):
+        return {
+            "workers": len(self._tasks) - 1 if self._tasks else 0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    # ---------- Queue maintenance ----------
+
+    async def _poll(self):
+        while True:
+            try:
+                for ticket_id in await run_db(self._find_pending):
+                    self.enqueue(ticket_id)
+            except Exception as e:
+                print(f"⚠ Analysis poller error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def _find_pending(self, limit: int = 100) -> list:
+        db = SessionLocal()
+        try:
+            # Release rows orphaned by a crashed worker
+            stale = get_ist_time() - timedelta(seconds=ANALYSIS_STALE_AFTER)
+            db.execute(
+                update(Complaint)
+                .where(Complaint.analysis_status == PROCESSING, Complaint.updated_at < stale)
+                .values(analysis_status=PENDING)
+            )
+            db.commit()
+            rows = (
+                db.query(Complaint.ticket_id)
+                .filter(Complaint.analysis_status == PENDING)
+                .order_by(Complaint.id)
+                .limit(limit)
+                .all()
+            )
+            return [row.ticket_id for row in rows]
+        finally:
+            db.close()
+
+    # ---------- Processing ----------
+
+    async def _worker(self):
+        while True:
+            ticket_id = await self._queue.get()
+            self._queued.discard(ticket_id)
+            try:
+                await self._process(ticket_id)
+            except Exception as e:
+                print(f"❌ Analysis worker error for {ticket_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _claim(self, ticket_id: str):
+        """Atomically move a pending row to processing; returns the row or None"""
+        db = SessionLocal()
+        try:
+            claimed = db.execute(
+                update(Complaint)
+                .where(Complaint.ticket_id == ticket_id, Complaint.analysis_status == PENDING)
+                .values(analysis_status=PROCESSING, updated_at=get_ist_time())
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return None  # already taken by another worker or process
+            complaint = db.query(Complaint).filter(Complaint.ticket_id == ticket_id).first()
+            db.expunge(complaint)
+            return complaint
+        finally:
+            db.close()
+
+    def _update(self, ticket_id: str, **values):
+        db = SessionLocal()
+        try:
+            db.execute(update(Complaint).where(Complaint.ticket_id == ticket_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    async def _process(self, ticket_id: str):
+        complaint = await run_db(self._claim, ticket_id)
+        if complaint is None:
+            return
+
+        data = complaint_request(complaint)
+        steps = []
+
+        async def emit(event: str, payload: dict):
+            # Persist progress so GET /complaint/{ticket_id} can show it
+            if event == "step":
+                steps.append(payload)
+                await run_db(self._update, ticket_id, ai_analysis_steps=json.dumps(steps))
+
+        try:
+            result = await run_agent_pipeline(analysis_text(data), emit=emit, ticket_id=ticket_id)
+        except Exception as e:
+            self.failed += 1
+            steps.append({"step": "Analysis Failed", "error": str(e)})
+            await run_db(
+                self._update, ticket_id,
+                analysis_status=FAILED, ai_analysis_steps=json.dumps(steps), updated_at=get_ist_time()
+            )
+            return
+
+        await run_db(
+            self._update, ticket_id,
+            analysis_status=COMPLETED, updated_at=get_ist_time(), **analysis_values(result)
+        )
+        self.processed += 1
+        index_complaint(data, ticket_id, result)
+        send_confirmation(data, ticket_id, result)
+
+
+analysis_workers = AnalysisWorkerPool()
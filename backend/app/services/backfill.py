@@ -0,0 +1,341 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import or_, update
+from app.agents.batch_heuristics import score_texts
+from app.agents.cache_layer import CallOutcome, cache_bypass, current_outcome
+from app.agents.classifier import classify_complaint
+from app.agents.llm_limiter import llm_priority
+from app.agents.priority import detect_priority
+from app.agents.reevaluator import reevaluate
+from app.agents.sentiment_analyzer import analyze_sentiment
+from app.agents.solution_suggester import suggest_solution
+from app.db.database import SessionLocal, run_db
+from app.db.models import Complaint, LabeledExample
+from app.services.online_learner import ADMIN_CORRECTION, ADMIN_RESOLUTION
+
+# ========================================
+# BACKFILL / RE-ANALYSIS OF STORED COMPLAINTS
+# ========================================
+# After a prompt, model or keyword-list change, re-runs selected agents over
+# the complaints table and writes back the labels that changed.
+# Rows are read in keyset-paginated chunks (id > last id, never OFFSET), the
+# agents run with bounded concurrency at Low LLM priority so live traffic
+# goes first, and each chunk's changes are one batched UPDATE. The last id
+# of every committed chunk is saved to a checkpoint file, so an interrupted
+# run resumes where it stopped (a chunk may be redone, never skipped).
+# Results that fell back because the LLM failed are never written. The agent
+# cache is bypassed (answers cached before the change would come back), and
+# admin data is kept: labels an admin corrected or confirmed, and solutions
+# of resolved tickets or written by an admin. Solutions are only re-generated
+# when asked for explicitly.
+# The server's in-memory similarity / near-duplicate indexes pick up the new
+# labels on their next startup.
+
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "200"))
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "8"))
+BACKFILL_CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", "backfill_checkpoint.json")
+
+BACKFILL_FIELDS = ("category", "priority", "sentiment", "solution")
+# What a run re-analyses unless --fields says otherwise
+DEFAULT_BACKFILL_FIELDS = ("category", "priority", "sentiment")
+# LabeledExample sources that mean an admin set or confirmed the stored label
+ADMIN_LABEL_SOURCES = (ADMIN_CORRECTION, ADMIN_RESOLUTION)
+# Keyword rules only: the batch scorer, no LLM or local model calls
+HEURISTIC_FIELDS = ("category", "priority", "sentiment")
+
+
+def complaint_text(row) -> str:
+    """Same text the agents classified (see complaint_service.analysis_text)"""
+    return f"Subject: {row.subject}\nDescription: {row.description or row.complaint_text}"
+
+
+class BackfillCheckpoint:
+    """Progress saved after each committed chunk (atomic JSON file)"""
+
+    def __init__(self, path: str = BACKFILL_CHECKPOINT):
+        self.path = path
+
+    def load(self) -> Optional[Dict]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, state: Dict):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BackfillJob:
+    """Re-runs agents over stored complaints; see the module comment"""
+
+    def __init__(self, fields: Sequence[str] = DEFAULT_BACKFILL_FIELDS, batch_size: int = BACKFILL_BATCH_SIZE,
+                 concurrency: int = BACKFILL_CONCURRENCY, checkpoint: BackfillCheckpoint = None,
+                 heuristic: bool = False, dry_run: bool = False, limit: int = None):
+        unknown = set(fields) - set(HEURISTIC_FIELDS if heuristic else BACKFILL_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot backfill {', '.join(sorted(unknown))}"
+                             + (" with keyword heuristics" if heuristic else ""))
+        self.fields = [field for field in BACKFILL_FIELDS if field in fields]
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.checkpoint = checkpoint or BackfillCheckpoint()
+        self.heuristic = heuristic
+        self.dry_run = dry_run
+        self.limit = limit
+
+        self.last_id = 0
+        self.processed = 0
+        self.written = 0
+        self.failed = 0
+        self.degraded = 0
+        self.changed = Counter()  # field -> rows changed
+        self.kept = Counter()  # field -> rows left alone because an admin set the value
+        self.transitions = Counter()  # (field, old, new) -> rows
+        self.total = 0
+        self._started = None
+        self._resumed_from = 0
+        self.resumed_completed = False
+
+    # ---------- Checkpoint ----------
+
+    def _state(self, completed: bool = False) -> Dict:
+        return {
+            "completed": completed,
+            "fields": self.fields,
+            "heuristic": self.heuristic,
+            "last_id": self.last_id,
+            "processed": self.processed,
+            "written": self.written,
+            "failed": self.failed,
+            "degraded": self.degraded,
+            "changed": dict(self.changed),
+            "kept": dict(self.kept),
+            "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def resume(self) -> bool:
+        """Continue from the checkpoint of an earlier run with the same settings"""
+        state = self.checkpoint.load()
+        if not state:
+            return False
+        if state.get("fields") != self.fields or state.get("heuristic", False) != self.heuristic:
+            raise ValueError(f"Checkpoint {self.checkpoint.path} is for fields {state.get('fields')}"
+                             f"{' (heuristic)' if state.get('heuristic') else ''}; use --restart to discard it")
+        self.last_id = state["last_id"]
+        self.processed = state.get("processed", 0)
+        self.written = state.get("written", 0)
+        self.failed = state.get("failed", 0)
+        self.degraded = state.get("degraded", 0)
+        self.changed = Counter(state.get("changed", {}))
+        self.kept = Counter(state.get("kept", {}))
+        self.resumed_completed = state.get("completed", False)
+        return True
+
+    # ---------- Database (worker threads) ----------
+
+    def _base_query(self, db):
+        # Rows still waiting for (or in) their first analysis are left to the workers
+        return db.query(Complaint).filter(
+            or_(Complaint.analysis_status == "completed", Complaint.analysis_status.is_(None))
+        )
+
+    def _count_remaining(self) -> int:
+        db = SessionLocal()
+        try:
+            return self._base_query(db).filter(Complaint.id > self.last_id).count()
+        finally:
+            db.close()
+
+    def _fetch_chunk(self, after_id: int, size: int) -> List:
+        db = SessionLocal()
+        try:
+            return (
+                self._base_query(db)
+                .with_entities(Complaint.id, Complaint.ticket_id, Complaint.subject, Complaint.description,
+                               Complaint.complaint_text, Complaint.category, Complaint.priority, Complaint.sentiment,
+                               Complaint.solution, Complaint.response, Complaint.is_resolved,
+                               Complaint.solution_by_admin)
+                .filter(Complaint.id > after_id)
+                .order_by(Complaint.id)
+                .limit(size)
+                .all()
+            )
+        finally:
+            db.close()
+
+    def _admin_labels(self, ticket_ids: List[str]) -> set:
+        """(ticket_id, field) pairs whose stored label an admin corrected or confirmed"""
+        heads = [field for field in ("category", "sentiment") if field in self.fields]
+        if not heads or not ticket_ids:
+            return set()
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(LabeledExample.ticket_id, LabeledExample.head)
+                .filter(LabeledExample.ticket_id.in_(ticket_ids), LabeledExample.head.in_(heads),
+                        LabeledExample.source.in_(ADMIN_LABEL_SOURCES))
+                .distinct()
+                .all()
+            )
+            return {(row.ticket_id, row.head) for row in rows}
+        finally:
+            db.close()
+
+    def _write(self, changes: List[Dict]):
+        """One executemany UPDATE ... WHERE id = ? for the whole chunk"""
+        db = SessionLocal()
+        try:
+            db.execute(update(Complaint), changes)
+            db.commit()
+        finally:
+            db.close()
+
+    # ---------- Agents ----------
+
+    def _locked(self, row, admin_labels: set) -> set:
+        """Fields of this row that hold admin data and must not be rewritten"""
+        locked = {field for field in self.fields if (row.ticket_id, field) in admin_labels}
+        if "solution" in self.fields and (row.is_resolved or row.solution_by_admin):
+            locked.add("solution")
+        return locked
+
+    async def _analyse(self, row, locked: set, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        """New values for one row (locked fields are not analysed), or None when it failed or an agent fell back"""
+        fields = [field for field in self.fields if field not in locked]
+        if not fields:
+            return {}
+        text = complaint_text(row)
+        async with semaphore:
+            outcome = CallOutcome()
+            token = current_outcome.set(outcome)
+            try:
+                values = {}
+                if "category" in fields:
+                    values["category"] = await classify_complaint(text)
+                if "priority" in fields:
+                    # Stored responses promising an escalation keep the ticket High
+                    values["priority"] = reevaluate(await detect_priority(text), row.response or "")
+                if "sentiment" in fields:
+                    values["sentiment"] = await analyze_sentiment(text)
+                if "solution" in fields:
+                    values["solution"] = await suggest_solution(values.get("category", row.category), text)
+            except Exception as e:
+                print(f"⚠ Backfill failed for complaint {row.id}: {e}")
+                self.failed += 1
+                return None
+            finally:
+                current_outcome.reset(token)
+        if outcome.degraded:
+            self.degraded += 1
+            return None
+        return values
+
+    def _heuristic_values(self, rows: List) -> List[Dict]:
+        """
+        Keyword labels for the whole chunk in one vectorized pass. Priority is
+        rule-based anyway; category and sentiment are only replaced when a
+        keyword matched, so LLM answers for keyword-less rows are kept.
+        """
+        scores = score_texts([complaint_text(row) for row in rows])
+        values = []
+        for i, row in enumerate(rows):
+            row_values = {}
+            for field in self.fields:
+                if field == "priority":
+                    row_values[field] = reevaluate(str(scores[field]["labels"][i]), row.response or "")
+                elif scores[field]["scores"][i] > 0:
+                    row_values[field] = str(scores[field]["labels"][i])
+            values.append(row_values)
+        return values
+
+    def _changes(self, rows: List, results: List[Optional[Dict]], locked: List[set]) -> List[Dict]:
+        changes = []
+        for row, values, row_locked in zip(rows, results, locked):
+            self.kept.update(row_locked)
+            if values is None:
+                continue
+            changed = {
+                field: value for field, value in values.items()
+                if field not in row_locked and value and value != getattr(row, field)
+            }
+            for field, value in changed.items():
+                self.changed[field] += 1
+                if field != "solution":
+                    self.transitions[(field, getattr(row, field), value)] += 1
+            if changed:
+                changes.append({"id": row.id, **changed})
+        return changes
+
+    # ---------- Run ----------
+
+    def _report(self, final: bool = False):
+        elapsed = time.perf_counter() - self._started
+        done = self.processed - self._resumed_from
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - done, 0)
+        eta = f"{remaining / rate:.0f}s" if rate and not final else "-"
+        changed = ", ".join(f"{field} {self.changed[field]:,}" for field in self.fields) or "-"
+        print(f"{'✅' if final else '🔁'} {done:,}/{self.total:,} rows (last id {self.last_id}) | "
+              f"{rate:,.1f} rows/s | ETA {eta} | changed: {changed} | "
+              f"written {self.written:,}, kept {sum(self.kept.values()):,} admin values, "
+              f"skipped {self.degraded:,} fallbacks, {self.failed:,} errors")
+
+    async def run(self) -> Dict:
+        """Process every remaining row, checkpointing after each chunk"""
+        self._started = time.perf_counter()
+        self._resumed_from = self.processed
+        remaining = await run_db(self._count_remaining)
+        self.total = remaining if self.limit is None else min(remaining, self.limit)
+        # Backfill calls queue behind interactive traffic, and must not reuse
+        # answers cached before the change being backfilled
+        llm_priority.set("Low")
+        cache_bypass.set(True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        exhausted = False
+
+        while self.processed - self._resumed_from < self.total:
+            size = min(self.batch_size, self.total - (self.processed - self._resumed_from))
+            rows = await run_db(self._fetch_chunk, self.last_id, size)
+            if not rows:
+                exhausted = True  # rows deleted since the count
+                break
+            admin_labels = await run_db(self._admin_labels, [row.ticket_id for row in rows if row.ticket_id])
+            locked = [self._locked(row, admin_labels) for row in rows]
+            if self.heuristic:
+                results = await asyncio.to_thread(self._heuristic_values, rows)
+            else:
+                results = await asyncio.gather(*(
+                    self._analyse(row, row_locked, semaphore) for row, row_locked in zip(rows, locked)
+                ))
+            changes = self._changes(rows, results, locked)
+            if changes and not self.dry_run:
+                await run_db(self._write, changes)
+                self.written += len(changes)
+            self.last_id = rows[-1].id
+            self.processed += len(rows)
+            if not self.dry_run:
+                self.checkpoint.save(self._state())
+            self._report()
+
+        # Stopped by --limit: the next run carries on from here
+        state = self._state(completed=exhausted or self.processed - self._resumed_from >= remaining)
+        if not self.dry_run:
+            self.checkpoint.save(state)
+        self._report(final=True)
+        return state
+
+    def top_transitions(self, n: int = 10):
+        return self.transitions.most_common(n)
@@ -0,0 +1,106 @@
+import json
+import random
+import string
+from app.db.database import get_ist_time
+from app.db.models import Complaint
+from app.schemas.complaint import ComplaintRequest, ComplaintResponse
+from app.services.email_service import email_service
+from app.ml.similarity_index import similarity_index
+
+# ========================================
+# COMPLAINT RECORD HELPERS
+# ========================================
+# Shared by the HTTP routes and the background analysis workers
+
+
+def generate_ticket_id() -> str:
+    """Generate Professional Ticket ID (e.g. QX-20250101-AB12)"""
+    date_str = get_ist_time().strftime("%Y%m%d")
+    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
+    return f"QX-{date_str}-{random_str}"
+
+def analysis_text(data: ComplaintRequest) -> str:
+    """Combine subject and description for comprehensive AI analysis"""
+    return f"Subject: {data.subject}\nDescription: {data.description}"
+
+def analysis_values(result: dict) -> dict:
+    """Map a pipeline result onto the Complaint analysis columns"""
+    usage = result.get("usage", {})
+    return dict(
+        category=result.get("category", "Other"),
+        priority=result.get("priority", "Low"),
+        response=result.get("response", ""),
+        action=result.get("action", ""),
+        sentiment=result.get("sentiment", "Neutral"),
+        solution=result.get("solution", ""),
+        satisfaction_prediction=result.get("satisfaction", "Medium"),
+        similar_complaints=result.get("similar_issues", ""),
+        ai_analysis_steps=json.dumps(result.get("steps", [])), # Save orchestrated steps
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+        llm_calls=usage.get("llm_calls", 0),
+        near_dup_reusable=bool(result.get("near_dup_reusable")),
+    )
+
+def complaint_values(data: ComplaintRequest, ticket_id: str, result: dict) -> dict:
+    """Map a pipeline result onto Complaint column values"""
+    return dict(
+        ticket_id=ticket_id,
+        name=data.name,
+        email=data.email,
+        subject=data.subject,
+        description=data.description,
+        complaint_text=data.description, # Mirror to legacy field for DB compatibility
+        is_resolved=False,
+        **analysis_values(result)
+    )
+
+def build_complaint(data: ComplaintRequest, ticket_id: str, result: dict) -> Complaint:
+    """Map a pipeline result onto a Complaint row"""
+    return Complaint(**complaint_values(data, ticket_id, result))
+
+def index_complaint(data: ComplaintRequest, ticket_id: str, result: dict):
+    """Make an analysed complaint available to similar-complaint search"""
+    similarity_index.add(
+        ticket_id, data.subject, data.description,
+        result.get("category", "Other"), result.get("solution", ""),
+    )
+
+def send_confirmation(data: ComplaintRequest, ticket_id: str, result: dict):
+    """Send confirmation email for an analysed complaint"""
+    email_service.send_complaint_confirmation(data.name, data.email, {
+        "ticket_id": ticket_id,
+        "subject": data.subject,
+        "description": data.description,
+        "category": result.get("category", "Other"),
+        "priority": result.get("priority", "Low"),
+        "sentiment": result.get("sentiment", "Neutral"),
+        "response": result.get("response", ""),
+        "solution": result.get("solution", ""),
+        "action": result.get("action", ""),
+    })
+
+def build_complaint_response(data: ComplaintRequest, ticket_id: str, result: dict) -> ComplaintResponse:
+    return ComplaintResponse(
+        ticket_id=ticket_id,
+        subject=data.subject,
+        description=data.description,
+        category=result.get("category", "Other"),
+        priority=result.get("priority", "Low"),
+        response=result.get("response", ""),
+        action=result.get("action", ""),
+        sentiment=result.get("sentiment", "Neutral"),
+        solution=result.get("solution", ""),
+        satisfaction=result.get("satisfaction", "Medium"),
+        similar_issues=result.get("similar_issues", ""),
+        steps=result.get("steps", [])
+    )
+
+def complaint_request(complaint: Complaint) -> ComplaintRequest:
+    """Rebuild the original submission from a stored row"""
+    return ComplaintRequest(
+        name=complaint.name,
+        email=complaint.email,
+        subject=complaint.subject or "",
+        description=complaint.description or complaint.complaint_text or "",
+    )
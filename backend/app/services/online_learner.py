@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional
+from app.db.database import SessionLocal
+from app.db.models import Complaint, LabeledExample
+from app.ml.features import vectorize
+from app.ml.satisfaction_model import (
+    SATISFACTION_MODEL_PATH, SatisfactionModel, get_satisfaction_model, rating_to_label,
+    satisfaction_features, set_satisfaction_model,
+)
+from app.ml.text_classifier import (
+    TEXT_MODEL_PATH, TextClassifier, get_text_classifier, normalize_label, set_text_classifier, text_features,
+)
+
+# ========================================
+# ONLINE LEARNING FROM FEEDBACK
+# ========================================
+# Admin corrections and resolutions (PATCH /complaint/{id}/status) and user
+# reviews (POST /complaint/{id}/review) are stored as LabeledExample rows.
+# A background task picks them up in batches, runs a few partial_fit steps
+# on a copy of the live model, saves the snapshot and swaps the copy in, so
+# readers never see a half-updated model and no restart is needed.
+# Models are only updated once trained (see train_models.py); until then the
+# examples are consumed and the full retrain reads the corrected complaints.
+
+ONLINE_LEARNING = os.getenv("ONLINE_LEARNING", "true").lower() == "true"
+ONLINE_LEARNING_INTERVAL = float(os.getenv("ONLINE_LEARNING_INTERVAL", "30"))
+ONLINE_LEARNING_BATCH = int(os.getenv("ONLINE_LEARNING_BATCH", "256"))
+ONLINE_LEARNING_STEPS = int(os.getenv("ONLINE_LEARNING_STEPS", "5"))
+ONLINE_LEARNING_RATE = float(os.getenv("ONLINE_LEARNING_RATE", "0.5"))
+
+ADMIN_CORRECTION = "admin_correction"
+ADMIN_RESOLUTION = "admin_resolution"
+USER_REVIEW = "user_review"
+
+
+def complaint_text(complaint: Complaint) -> str:
+    """Same text the agents classified (see complaint_service.analysis_text)"""
+    return f"Subject: {complaint.subject}\nDescription: {complaint.description or complaint.complaint_text}"
+
+
+def record_corrections(db, complaint: Complaint, category: str = None, sentiment: str = None,
+                       resolved: bool = False) -> Dict[str, str]:
+    """
+    Queue labels from an admin status update (in the caller's transaction).
+    Changed category/sentiment values are corrections and are written to the
+    complaint; resolving a ticket without changes confirms its labels.
+    Returns the corrected fields.
+    """
+    corrected = {}
+    for head, value in (("category", category), ("sentiment", sentiment)):
+        label = normalize_label(head, value)
+        if value and label is None:
+            raise ValueError(f"Unknown {head}: {value}")
+        current = getattr(complaint, head)
+        if label and label != current:
+            setattr(complaint, head, label)
+            corrected[head] = label
+            source = ADMIN_CORRECTION
+        elif resolved and normalize_label(head, current):
+            label, source = normalize_label(head, current), ADMIN_RESOLUTION
+        else:
+            continue
+        db.add(LabeledExample(ticket_id=complaint.ticket_id, head=head, label=label,
+                              text=complaint_text(complaint), source=source))
+    return corrected
+
+
+def record_review(db, complaint: Complaint, rating: int):
+    """Queue a satisfaction label from a user review (in the caller's transaction)"""
+    label = rating_to_label(rating)
+    if label is None or not complaint.response:
+        return
+    db.add(LabeledExample(
+        ticket_id=complaint.ticket_id, head="satisfaction", label=label, text=complaint.response,
+        context=json.dumps({"priority": complaint.priority, "category": complaint.category}),
+        source=USER_REVIEW,
+    ))
+
+
+class OnlineLearner:
+    """Background task applying queued LabeledExample rows to the local models"""
+
+    def __init__(self, interval: float = ONLINE_LEARNING_INTERVAL):
+        self.interval = interval
+        self._wake: asyncio.Event = None
+        self._task: Optional[asyncio.Task] = None
+        self.applied = {"category": 0, "sentiment": 0, "satisfaction": 0}
+        self.skipped_no_model = 0
+        self.updates = 0
+        self.last_update: Optional[float] = None
+        self.last_update_ms = 0.0
+
+    def start(self):
+        """Start the learner (call from the app lifespan)"""
+        if self._task is not None or not ONLINE_LEARNING:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self):
+        """New examples were committed: apply them without waiting for the next poll"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                while await asyncio.to_thread(self.apply_pending):
+                    pass  # keep going while full batches come back
+            except Exception as e:
+                print(f"⚠ Online learning error: {e}")
+
+    # ---------- Applying examples (runs in a worker thread) ----------
+
+    def apply_pending(self, limit: int = ONLINE_LEARNING_BATCH) -> bool:
+        """Apply one batch of unapplied examples; True if the batch was full"""
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(LabeledExample)
+                .filter(LabeledExample.applied.is_(False))
+                .order_by(LabeledExample.id)
+                .limit(limit)
+                .all()
+            )
+            if not rows:
+                return False
+            started = time.perf_counter()
+            by_head: Dict[str, List[LabeledExample]] = {}
+            for row in rows:
+                by_head.setdefault(row.head, []).append(row)
+            updated = self._update_classifier(by_head) | self._update_satisfaction(by_head.get("satisfaction", []))
+            for row in rows:
+                row.applied = True
+            db.commit()
+            if updated:
+                self.updates += 1
+                self.last_update = time.time()
+                self.last_update_ms = (time.perf_counter() - started) * 1000
+                print(f"🎓 Online update from {len(rows)} examples ({', '.join(sorted(updated))})")
+            return len(rows) == limit
+        finally:
+            db.close()
+
+    def _update_classifier(self, by_head: Dict[str, List[LabeledExample]]) -> set:
+        heads = [head for head in ("category", "sentiment") if by_head.get(head)]
+        if not heads:
+            return set()
+        current = get_text_classifier()
+        if current is None:
+            self.skipped_no_model += sum(len(by_head[head]) for head in heads)
+            return set()
+        regressions = dict(current.heads)
+        for head in heads:
+            examples = [(row.text, normalize_label(head, row.label)) for row in by_head[head]]
+            examples = [(text, label) for text, label in examples if label]
+            if not examples:
+                continue
+            regression = regressions[head].copy()
+            X = vectorize((text_features(text) for text, _ in examples), regression.n_features)
+            regression.partial_fit(X, [label for _, label in examples], lr=ONLINE_LEARNING_RATE, steps=ONLINE_LEARNING_STEPS)
+            regressions[head] = regression
+            self.applied[head] += len(examples)
+        model = TextClassifier(regressions, {**current.report, "online_updates": self.updates + 1})
+        model.save(TEXT_MODEL_PATH)
+        set_text_classifier(model)
+        return set(heads)
+
+    def _update_satisfaction(self, rows: List[LabeledExample]) -> set:
+        if not rows:
+            return set()
+        current = get_satisfaction_model()
+        if current is None:
+            self.skipped_no_model += len(rows)
+            return set()
+        regression = current.regression.copy()
+        features, labels = [], []
+        for row in rows:
+            context = json.loads(row.context or "{}")
+            features.append(satisfaction_features(row.text, context.get("priority"), context.get("category")))
+            labels.append(row.label)
+        X = vectorize(features, regression.n_features)
+        regression.partial_fit(X, labels, lr=ONLINE_LEARNING_RATE, steps=ONLINE_LEARNING_STEPS)
+        model = SatisfactionModel(regression, {**current.report, "online_updates": self.updates + 1})
+        model.save(SATISFACTION_MODEL_PATH)
+        set_satisfaction_model(model)
+        self.applied["satisfaction"] += len(rows)
+        return {"satisfaction"}
+
+    def get_stats(self):
+        db = SessionLocal()
+        try:
+            pending = db.query(LabeledExample).filter(LabeledExample.applied.is_(False)).count()
+        finally:
+            db.close()
+        return {
+            "enabled": ONLINE_LEARNING,
+            "pending_examples": pending,
+            "applied_examples": dict(self.applied),
+            "skipped_no_model": self.skipped_no_model,
+            "updates": self.updates,
+            "last_update": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.last_update)) if self.last_update else None,
+            "last_update_ms": round(self.last_update_ms, 1),
+        }
+
+
+online_learner = OnlineLearner()
@@ -0,0 +1,79 @@
+"""
+Re-run agents over stored complaints and write back the labels that changed.
+
+Usage:
+    python backfill.py                                   # category, priority, sentiment
+    python backfill.py --fields category sentiment --concurrency 16
+    python backfill.py --fields solution                 # AI-written solutions of open tickets only
+    python backfill.py --heuristic --batch-size 20000    # keyword rules only, no LLM calls
+    python backfill.py --dry-run --limit 1000            # report what would change
+
+Progress is checkpointed after every chunk; running the same command again
+resumes from there (after a finished run: only complaints added since).
+Use --restart to start over. Values an admin set (corrected or confirmed
+labels, admin and resolved-ticket solutions) are never overwritten.
+"""
+import argparse
+import asyncio
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.backfill import (
+    BACKFILL_BATCH_SIZE, BACKFILL_CHECKPOINT, BACKFILL_CONCURRENCY, BACKFILL_FIELDS, DEFAULT_BACKFILL_FIELDS,
+    BackfillCheckpoint, BackfillJob,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-analyse stored complaints")
+    parser.add_argument("--fields", nargs="+", choices=BACKFILL_FIELDS, default=list(DEFAULT_BACKFILL_FIELDS))
+    parser.add_argument("--heuristic", action="store_true",
+                        help="Keyword rules only (category, priority, sentiment), vectorized per chunk")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Rows per chunk / UPDATE")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY, help="Rows analysed at once")
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore (and replace) an existing checkpoint")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many rows")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    args = parser.parse_args()
+
+    if args.heuristic and "solution" in args.fields:
+        parser.error("--heuristic cannot backfill solution")
+
+    checkpoint = BackfillCheckpoint(args.checkpoint)
+    if args.restart and not args.dry_run:
+        checkpoint.clear()
+    job = BackfillJob(args.fields, batch_size=args.batch_size, concurrency=args.concurrency, checkpoint=checkpoint,
+                      heuristic=args.heuristic, dry_run=args.dry_run, limit=args.limit)
+    try:
+        # A dry run starts from the beginning and leaves the checkpoint alone
+        if not args.restart and not args.dry_run and job.resume():
+            if job.resumed_completed:
+                print(f"⏩ Previous run finished at complaint {job.last_id}; only newer rows are processed")
+            else:
+                print(f"⏩ Resuming after complaint {job.last_id} ({job.processed:,} rows done)")
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"🚀 Backfilling {', '.join(job.fields)}"
+          f"{' (keyword heuristics)' if args.heuristic else ''}{' [dry run]' if args.dry_run else ''}")
+    try:
+        asyncio.run(job.run())
+    except KeyboardInterrupt:
+        print(f"\n⏸ Interrupted after complaint {job.last_id}; run again to resume")
+        return 130
+
+    if job.transitions:
+        print("\nMost common changes:")
+        for (field, old, new), count in job.top_transitions():
+            print(f"  {field:<10}{old or '-'} → {new}: {count:,}")
+    if job.kept:
+        print(f"\nKept admin values: {', '.join(f'{field} {count:,}' for field, count in job.kept.items())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
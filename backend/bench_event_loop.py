@@ -0,0 +1,168 @@
+"""
+Event-loop responsiveness under mixed DB + LLM load.
+
+Runs the app in-process (fake LLM backend, throwaway SQLite database) and
+keeps --clients concurrent users going through submit -> review -> status
+update -> delete, while a probe task measures how late the event loop wakes
+it up. Every run is done with DB calls inline on the loop (DB_OFFLOAD=false,
+the old behaviour) and through the DB threadpool, for comparison.
+
+    python bench_event_loop.py                           # 20 clients, 15s per mode
+    python bench_event_loop.py --clients 50 --db-latency-ms 5 --llm-latency fixed:0.5
+    python bench_event_loop.py --mode offload --duration 60
+
+--db-latency-ms adds a sleep to every SQL statement, standing in for the
+network round trip to a real database server.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+PAYLOAD = {
+    "name": "Bench User",
+    "email": "bench@example.com",
+    "subject": "Charged twice",
+    "description": "I was charged twice for my monthly subscription and need a refund.",
+}
+FLOWS = ("complaint", "review", "status", "delete")
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))] if ordered else 0.0
+
+
+def configure(args):
+    """Environment for an isolated in-process app (before app modules are imported)"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_loop_"), "bench.db")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": args.llm_latency,
+        # Lift the provider quotas so the LLM leg is pure latency, not queueing
+        "LLM_RPM": "100000",
+        "LLM_MAX_CONCURRENCY": str(max(args.clients * 4, 8)),
+        "CACHE_REDIS": "false",
+        "LLM_WARMUP": "false",
+        "NEAR_DUP_ENABLED": "false",  # every complaint runs its agents
+        "ONLINE_LEARNING": "false",
+        "ANALYSIS_WORKERS": "0",
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "bench",
+        "BREVO_API_KEY": "",
+    })
+    return db_path
+
+
+def add_db_latency(latency_ms: float):
+    from sqlalchemy import event
+    from app.db.database import engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow_statement(*_):
+        time.sleep(latency_ms / 1000)
+
+
+async def probe_lag(stop: asyncio.Event, interval: float, lags: list):
+    """How much later than asked the loop resumes a sleeping task"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def client_loop(client, stop: asyncio.Event, n: int, latencies: dict, errors: list):
+    i = 0
+    while not stop.is_set():
+        i += 1
+        payload = {**PAYLOAD, "description": f"{PAYLOAD['description']} (client {n}, #{i}, {random.random()})"}
+        started = time.perf_counter()
+        r = await client.post("/complaint", json=payload)
+        latencies["complaint"].append(time.perf_counter() - started)
+        if r.status_code != 200:
+            errors.append(f"complaint {r.status_code}")
+            continue
+        ticket_id = r.json()["ticket_id"]
+        for flow, request in (
+            ("review", lambda: client.post(f"/complaint/{ticket_id}/review", json={"rating": 4})),
+            ("status", lambda: client.patch(f"/complaint/{ticket_id}/status", json={"is_resolved": True})),
+            ("delete", lambda: client.delete(f"/complaint/{ticket_id}")),
+        ):
+            started = time.perf_counter()
+            r = await request()
+            latencies[flow].append(time.perf_counter() - started)
+            if r.status_code != 200:
+                errors.append(f"{flow} {r.status_code}")
+
+
+async def run_mode(offload: bool, args) -> dict:
+    import httpx
+    from app.db import database
+    from app.main import app
+
+    database.DB_OFFLOAD = offload
+    stop = asyncio.Event()
+    lags, errors = [], []
+    latencies = {flow: [] for flow in FLOWS}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            probe = asyncio.create_task(probe_lag(stop, args.probe_interval / 1000, lags))
+            clients = [asyncio.create_task(client_loop(client, stop, n, latencies, errors)) for n in range(args.clients)]
+            await asyncio.sleep(args.duration)
+            stop.set()
+            await asyncio.gather(probe, *clients)
+    return {"lags": sorted(lags), "latencies": latencies, "errors": errors}
+
+
+def report(name: str, result: dict, duration: float):
+    lags = [lag * 1000 for lag in result["lags"]]
+    requests = sum(len(v) for v in result["latencies"].values())
+    print(f"\n=== {name} ===")
+    print(f"⏱  loop lag: p50 {percentile(lags, 50):.2f}ms  p99 {percentile(lags, 99):.2f}ms  "
+          f"max {max(lags, default=0):.2f}ms  mean {statistics.fmean(lags) if lags else 0:.2f}ms  ({len(lags)} probes)")
+    print(f"📨 {requests} requests, {requests / duration:.1f} req/s, {len(result['errors'])} errors")
+    for flow in FLOWS:
+        ordered = sorted(result["latencies"][flow])
+        if ordered:
+            print(f"   {flow:<10}{len(ordered):>6}  p50 {percentile(ordered, 50) * 1000:8.1f}ms  "
+                  f"p99 {percentile(ordered, 99) * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-loop lag under mixed DB + LLM load")
+    parser.add_argument("--mode", choices=("both", "inline", "offload"), default="both")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per mode")
+    parser.add_argument("--llm-latency", default="fixed:0.3", help="FAKE_LLM_LATENCY for the fake backend")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="Added to every SQL statement")
+    parser.add_argument("--probe-interval", type=float, default=5.0, help="Probe sleep in ms")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's own log output")
+    args = parser.parse_args()
+
+    configure(args)
+    if args.db_latency_ms > 0:
+        add_db_latency(args.db_latency_ms)
+
+    modes = {"inline": [False], "offload": [True], "both": [False, True]}[args.mode]
+    results = {}
+    for offload in modes:
+        name = "DB threadpool (DB_OFFLOAD=true)" if offload else "DB on the event loop (DB_OFFLOAD=false)"
+        print(f"🚀 {name}: {args.clients} clients for {args.duration:.0f}s")
+        # The app logs every complaint and email; keep the report readable
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else open(os.devnull, "w")):
+            results[offload] = asyncio.run(run_mode(offload, args))
+        report(name, results[offload], args.duration)
+
+    if len(results) == 2:
+        inline, offload = (percentile(results[mode]["lags"], 99) * 1000 for mode in (False, True))
+        print(f"\n📉 p99 loop lag {inline:.1f}ms -> {offload:.1f}ms with the DB threadpool")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
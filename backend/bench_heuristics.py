@@ -0,0 +1,106 @@
+"""
+Batch heuristic scoring benchmark: re-scores stored (or synthetic) complaints
+with app.agents.batch_heuristics and checks the labels against the per-text
+keyword agents on a sample.
+
+    python bench_heuristics.py                      # 1M synthetic texts
+    python bench_heuristics.py --rows 200000 --check 5000
+    python bench_heuristics.py --from-db            # every complaint in DATABASE_URL
+
+Exits with status 1 when the sampled labels disagree beyond --max-mismatch.
+"""
+import argparse
+import random
+import sys
+import time
+
+
+def synthetic_texts(n: int, seed: int = 42) -> list:
+    """Complaint-like texts built from the training examples plus filler words"""
+    from app.ml.text_classifier import example_rows
+
+    rng = random.Random(seed)
+    examples = [row["text"] for row in example_rows()] or ["My order has not arrived yet"]
+    filler = "please order account yesterday still the my and service app again week team".split()
+    texts = []
+    for i in range(n):
+        words = rng.choice(examples).split() + rng.choices(filler, k=rng.randint(5, 25))
+        rng.shuffle(words)
+        texts.append(f"Subject: Ticket {i}\nDescription: {' '.join(words)}")
+    return texts
+
+
+def stored_texts() -> list:
+    from app.db.database import SessionLocal
+    from app.db.models import Complaint
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Complaint.subject, Complaint.description, Complaint.complaint_text).yield_per(10_000)
+        return [f"Subject: {s}\nDescription: {d or t}" for s, d, t in rows]
+    finally:
+        db.close()
+
+
+def per_text_labels(text: str) -> dict:
+    from app.agents.keyword_engine import keyword_engine
+
+    hits = keyword_engine.scan(text)
+    return {
+        "category": hits.top("category") or "Other",
+        "priority": hits.first("priority", ["High", "Medium"]) or "Low",
+        "sentiment": hits.first("sentiment") or "Neutral",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized keyword scoring")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--from-db", action="store_true", help="Score the stored complaints instead")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--check", type=int, default=2000, help="Texts compared with the per-text agents")
+    parser.add_argument("--max-mismatch", type=float, default=0.001)
+    args = parser.parse_args()
+
+    from app.agents.batch_heuristics import BATCH_CHUNK_SIZE, score_texts
+
+    texts = stored_texts() if args.from_db else synthetic_texts(args.rows)
+    print(f"📦 {len(texts):,} texts, {sum(map(len, texts)) / 1e6:.1f}M characters")
+
+    started = time.perf_counter()
+    result = score_texts(texts, args.chunk_size or BATCH_CHUNK_SIZE)
+    elapsed = time.perf_counter() - started
+    print(f"⏱  batch: {elapsed:.2f}s ({len(texts) / max(elapsed, 1e-9):,.0f} texts/s)")
+
+    sample = random.Random(0).sample(range(len(texts)), min(args.check, len(texts)))
+    started = time.perf_counter()
+    expected = [per_text_labels(texts[i]) for i in sample]
+    per_text = (time.perf_counter() - started) / max(len(sample), 1)
+    print(f"⏱  per-text scan: {per_text * 1e6:.0f}µs/text, ~{per_text * len(texts):.1f}s for all")
+
+    worst = 0.0
+    for group in ("category", "priority", "sentiment"):
+        labels = result[group]["labels"]
+        mismatches = sum(labels[i] != want[group] for i, want in zip(sample, expected))
+        rate = mismatches / max(len(sample), 1)
+        worst = max(worst, rate)
+        values, counts = [list(x) for x in zip(*sorted(_distribution(labels).items()))] or ([], [])
+        spread = ", ".join(f"{v} {c:,}" for v, c in zip(values, counts))
+        print(f"  {group:<10} mismatches {mismatches}/{len(sample)}  |  {spread}")
+
+    if worst > args.max_mismatch:
+        print(f"\n❌ Labels differ from the per-text agents ({worst:.2%} > {args.max_mismatch:.2%})")
+        return 1
+    print("\n✅ Batch labels match the per-text agents")
+    return 0
+
+
+def _distribution(labels) -> dict:
+    import numpy as np
+
+    values, counts = np.unique(labels.astype(str), return_counts=True)
+    return dict(zip(values.tolist(), counts.tolist()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
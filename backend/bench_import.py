@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark: how long `import app.main` takes in a fresh interpreter.
+
+    python bench_import.py                  # 5 runs, budget from IMPORT_BUDGET_MS
+    python bench_import.py --runs 10 --budget-ms 800 --top 15
+    python bench_import.py --no-key         # also checks import works without GEMINI_API_KEY
+
+Exits with status 1 when the median exceeds the budget, so it can gate CI.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def import_once(module: str, env: dict) -> tuple:
+    """Wall time (ms) of one cold import, plus the -X importtime report"""
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"❌ import {module} failed:\n{proc.stderr[-2000:]}")
+    elapsed = float(proc.stdout.strip().splitlines()[-1])
+    return elapsed, proc.stderr
+
+
+def slowest_imports(report: str, top: int):
+    """Top-level packages by cumulative import time (microseconds)"""
+    totals = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        package = name.strip().split(".")[0]
+        totals[package] = max(totals.get(package, 0), int(cumulative))
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the backend")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--no-key", action="store_true", help="Run without GEMINI_API_KEY set")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.no_key:
+        env["GEMINI_API_KEY"] = ""  # empty, so a value in .env is not picked up either
+
+    import_once(args.module, env)  # warm the filesystem / bytecode caches
+    timings, report = [], ""
+    for _ in range(args.runs):
+        elapsed, report = import_once(args.module, env)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"⏱  import {args.module}: median {median:.0f}ms, min {min(timings):.0f}ms, max {max(timings):.0f}ms ({args.runs} runs)")
+    print("\nSlowest packages (cumulative):")
+    for package, micros in slowest_imports(report, args.top):
+        print(f"  {package:<28}{micros / 1000:>8.1f}ms")
+
+    if median > args.budget_ms:
+        print(f"\n❌ Over budget: {median:.0f}ms > {args.budget_ms:.0f}ms")
+        return 1
+    print(f"\n✅ Within budget ({args.budget_ms:.0f}ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Open-loop load driver for the complaint pipeline.
+
+Replays complaint payloads at a target rate and reports p50/p95/p99 latency,
+throughput and error rate per endpoint, plus per-agent latency and fallbacks.
+
+In-process (no server, no Gemini; uses the fake LLM backend):
+    python load_test.py --rps 20 --duration 30 --fake
+    python load_test.py --endpoint pipeline --endpoint pipeline_stream --rps 10
+
+Against a running server (needs `pip install httpx`):
+    python load_test.py --url http://localhost:8000 --endpoint complaint --endpoint batch --rps 5
+
+Payloads come from --payloads (JSONL with name/email/subject/description) or
+a built-in sample set. Each request gets a unique suffix unless
+--allow-duplicates is set, so caches, single-flight and near-duplicate
+reuse don't hide the load (in-process runs also disable the near-duplicate
+index).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import sys
+import time
+from collections import Counter
+
+SAMPLE_COMPLAINTS = [
+    ("Charged twice", "I was charged twice for my monthly subscription and need a refund."),
+    ("App keeps crashing", "The mobile app crashes every time I try to log in since the last update."),
+    ("Package not delivered", "My order was marked delivered but the package never arrived at my door."),
+    ("Rude support agent", "The support agent on the phone was rude and hung up on me."),
+    ("Unauthorized login", "Someone logged into my account from another country, I think I was hacked."),
+    ("Wrong invoice amount", "My invoice shows a higher price than what was advertised on the website."),
+    ("Password reset broken", "The password reset email never arrives, I cannot access my account."),
+    ("Late delivery", "Delivery was promised in 2 days but it has been over a week with no update."),
+]
+
+# Enough fresh shingles to push a copy past the near-duplicate distance
+UNIQUE_SUFFIX_WORDS = 16
+
+PIPELINE_ENDPOINTS = ("pipeline", "pipeline_stream")
+HTTP_ENDPOINTS = ("complaint", "stream", "batch", "async")
+
+
+def load_payloads(path: str = None):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return [
+        {"name": "Load Test", "email": "loadtest@example.com", "subject": subject, "description": description}
+        for subject, description in SAMPLE_COMPLAINTS
+    ]
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))] if ordered else 0.0
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}  # endpoint -> [seconds]
+        self.outcomes = {}  # endpoint -> Counter
+
+    def record(self, endpoint: str, latency: float, outcome: str):
+        self.latencies.setdefault(endpoint, []).append(latency)
+        self.outcomes.setdefault(endpoint, Counter())[outcome] += 1
+
+    def report(self, elapsed: float):
+        print(f"\n{'endpoint':<16}{'requests':>9}{'errors':>8}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for endpoint, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            outcomes = self.outcomes[endpoint]
+            errors = sum(count for outcome, count in outcomes.items() if outcome != "ok")
+            print(f"{endpoint:<16}{len(ordered):>9}{errors:>8}{errors / len(ordered) * 100:>6.1f}%"
+                  f"{len(ordered) / elapsed:>8.2f}"
+                  + "".join(f"{percentile(ordered, q):>8.3f}s" for q in (50, 95, 99)))
+            failures = {k: v for k, v in outcomes.items() if k != "ok"}
+            if failures:
+                print(f"{'':<16}errors: {dict(failures)}")
+
+
+def random_word(length: int = 6) -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+
+def unique_payload(payload: dict, n: int, allow_duplicates: bool) -> dict:
+    if allow_duplicates:
+        return payload
+    # Words, not numbers: digits shingle alike, so a numeric suffix would
+    # still be a near-duplicate and take the reuse path
+    suffix = " ".join(random_word() for _ in range(UNIQUE_SUFFIX_WORDS))
+    return {**payload, "description": f"{payload['description']} (ref {suffix})"}
+
+
+# ---------- In-process targets ----------
+
+def pipeline_target():
+    from app.agents.orchestrator import run_agent_pipeline, stream_agent_pipeline
+    from app.services.complaint_service import analysis_text
+    from app.schemas.complaint import ComplaintRequest
+
+    async def call(endpoint: str, payload: dict) -> str:
+        text = analysis_text(ComplaintRequest(**payload))
+        if endpoint == "pipeline":
+            await run_agent_pipeline(text)
+        else:
+            async for event, _ in stream_agent_pipeline(text):
+                pass
+        return "ok"
+
+    return call, None
+
+
+def print_agent_report(stats: dict):
+    latency = stats.get("agent_latency", {})
+    fallbacks = stats.get("agent_fallbacks", {})
+    if not latency:
+        return
+    print(f"\n{'agent':<16}{'p50':>10}{'p95':>10}{'p99':>10}  fallbacks")
+    for agent, q in latency.items():
+        print(f"{agent:<16}{q.get('p50', '-'):>10}{q.get('p95', '-'):>10}{q.get('p99', '-'):>10}  {fallbacks.get(agent, {})}")
+
+
+# ---------- HTTP targets ----------
+
+def http_target(base_url: str, batch_size: int):
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("❌ HTTP mode needs httpx: pip install httpx")
+
+    client = httpx.AsyncClient(base_url=base_url, timeout=120)
+
+    async def call(endpoint: str, payload: dict) -> str:
+        if endpoint == "complaint":
+            r = await client.post("/complaint", json=payload)
+        elif endpoint == "async":
+            r = await client.post("/complaint", params={"async_mode": "true"}, json=payload)
+        elif endpoint == "batch":
+            r = await client.post("/complaints/batch", json=[payload] * batch_size)
+        else:
+            async with client.stream("POST", "/complaint/stream", json=payload) as r:
+                body = "".join([chunk async for chunk in r.aiter_text()])
+            if r.status_code < 400 and "event: error" in body:
+                return "stream_error"
+        return "ok" if r.status_code < 400 else f"http_{r.status_code}"
+
+    async def remote_stats():
+        try:
+            stats = (await client.get("/metrics/pipeline")).json()
+        finally:
+            await client.aclose()
+        return stats
+
+    return call, remote_stats
+
+
+async def drive(call, endpoints, payloads, rps: float, duration: float, allow_duplicates: bool, max_outstanding: int):
+    recorder = Recorder()
+    total = int(rps * duration)
+    outstanding = set()
+    dropped = 0
+
+    async def one(n: int, endpoint: str, payload: dict, scheduled: float):
+        try:
+            outcome = await call(endpoint, payload)
+        except Exception as e:
+            outcome = type(e).__name__
+        # Latency from the scheduled start, so queueing in the driver is not hidden
+        recorder.record(endpoint, time.perf_counter() - scheduled, outcome)
+
+    start = time.perf_counter()
+    for n in range(total):
+        scheduled = start + n / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(outstanding) >= max_outstanding:
+            dropped += 1
+            continue
+        endpoint = endpoints[n % len(endpoints)]
+        payload = unique_payload(random.choice(payloads), n, allow_duplicates)
+        task = asyncio.create_task(one(n, endpoint, payload, scheduled))
+        outstanding.add(task)
+        task.add_done_callback(outstanding.discard)
+        if n and n % max(1, int(rps * 5)) == 0:
+            print(f"⏱  {n}/{total} sent, {len(outstanding)} in flight")
+
+    if outstanding:
+        await asyncio.wait(outstanding)
+    elapsed = time.perf_counter() - start
+    recorder.report(elapsed)
+    if dropped:
+        print(f"\n⚠ {dropped} requests not sent: {max_outstanding} already in flight (service saturated)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quickfix pipeline load test")
+    parser.add_argument("--url", help="Base URL of a running server; omit to drive the pipeline in-process")
+    parser.add_argument("--endpoint", action="append",
+                        help=f"In-process: {', '.join(PIPELINE_ENDPOINTS)}; HTTP: {', '.join(HTTP_ENDPOINTS)}")
+    parser.add_argument("--rps", type=float, default=5.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    parser.add_argument("--payloads", help="JSONL file of complaint payloads")
+    parser.add_argument("--batch-size", type=int, default=10, help="Items per /complaints/batch request")
+    parser.add_argument("--max-outstanding", type=int, default=1000, help="Stop sending while this many are in flight")
+    parser.add_argument("--allow-duplicates", action="store_true", help="Send payloads verbatim (lets caches hit)")
+    parser.add_argument("--fake", action="store_true", help="In-process only: use the fake LLM backend (LLM_BACKEND=fake)")
+    args = parser.parse_args()
+
+    if args.fake:
+        os.environ["LLM_BACKEND"] = "fake"
+    if not args.allow_duplicates:
+        # A rare SimHash collision would still skip the agents (in-process only;
+        # start a server with NEAR_DUP_ENABLED=false for the same effect)
+        os.environ.setdefault("NEAR_DUP_ENABLED", "false")
+
+    endpoints = args.endpoint or (["complaint"] if args.url else ["pipeline"])
+    allowed = HTTP_ENDPOINTS if args.url else PIPELINE_ENDPOINTS
+    unknown = [e for e in endpoints if e not in allowed]
+    if unknown:
+        parser.error(f"unknown endpoint(s) {unknown}; choose from {allowed}")
+
+    payloads = load_payloads(args.payloads)
+    print(f"🚀 {args.rps} rps for {args.duration}s against {args.url or 'in-process pipeline'} ({', '.join(endpoints)})")
+
+    async def run():
+        if args.url:
+            call, remote_stats = http_target(args.url, args.batch_size)
+        else:
+            call, remote_stats = pipeline_target()
+        await drive(call, endpoints, payloads, args.rps, args.duration, args.allow_duplicates, args.max_outstanding)
+
+        if remote_stats is not None:
+            print_agent_report(await remote_stats())
+        else:
+            from app.agents.pipeline_metrics import pipeline_metrics
+            from app.agents.llm_limiter import llm_limiter
+            print_agent_report(pipeline_metrics.get_stats())
+            limiter = llm_limiter.get_stats()
+            print(f"\n🧮 LLM calls by agent: {limiter['calls_by_agent']}, queue wait p95 {limiter['queue_wait_p95']}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("CACHE_REDIS", "false")
+
+import pytest
+
+from app.agents import gemini_client
+from app.agents.llm_limiter import LLMLimiter
+from app.agents.model_health import HALF_OPEN, OPEN, ModelRouter
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """A router whose only model is open with its cooldown over (next pick is the probe)"""
+    router = ModelRouter(["probe-model"])
+    health = router.health("probe-model")
+    health.state = OPEN
+    health.opened_at = time.monotonic() - health.cooldown - 1
+    monkeypatch.setattr(gemini_client, "model_router", router)
+    return router
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = LLMLimiter(max_concurrency=1, rpm=0, tpm=0)
+    monkeypatch.setattr(gemini_client, "llm_limiter", limiter)
+    return limiter
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_cancelled_queued_probe_is_released(router, limiter):
+    async def scenario():
+        await limiter.acquire()  # saturate: the probe has to queue
+        call = asyncio.ensure_future(gemini_client.generate_content("hello"))
+        await _settle()
+        assert limiter.queued == 1
+        assert router.health("probe-model").state == HALF_OPEN
+
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        limiter.release()
+
+    asyncio.run(scenario())
+    assert router.health("probe-model").state == OPEN
+    assert router.ranked() == ["probe-model"]
+
+
+def test_probe_released_when_setup_fails(router, limiter, monkeypatch):
+    def broken(model_name=None):
+        raise RuntimeError("GEMINI_API_KEY not set")
+
+    monkeypatch.setattr(gemini_client.gemini_clients, "get", broken)
+    with pytest.raises(RuntimeError):
+        asyncio.run(gemini_client.generate_content("hello"))
+    assert router.ranked() == ["probe-model"]
+
+
+def test_hedge_cancelled_before_its_leg_starts(router, limiter):
+    async def scenario():
+        call = asyncio.ensure_future(gemini_client.hedged_generate_content("hello"))
+        await asyncio.sleep(0)  # chooses the probe and schedules the primary leg
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        await _settle()
+
+    asyncio.run(scenario())
+    assert router.ranked() == ["probe-model"]
+
+
+def test_completed_probe_closes_circuit(router, limiter, monkeypatch):
+    monkeypatch.setattr(gemini_client, "record_usage", lambda agent, response: None)
+    asyncio.run(gemini_client.generate_content("hello"))
+    assert router.health("probe-model").state == "closed"
+
+
+def test_refused_hedge_leaves_backup_untouched(router, limiter, monkeypatch):
+    backup = router.health("backup-model")
+    backup.state = OPEN
+    backup.opened_at = time.monotonic() - backup.cooldown - 1
+    router.health("probe-model").state = "closed"
+    monkeypatch.setattr(gemini_client, "record_usage", lambda agent, response: None)
+    monkeypatch.setattr(gemini_client.request_hedger, "delay_for", lambda health: 0.0)
+    monkeypatch.setattr(gemini_client.request_hedger, "try_spend", lambda saturated=False: False)
+
+    asyncio.run(gemini_client.hedged_generate_content("hello", model_name="probe-model"))
+    assert backup.state == OPEN
+    assert "backup-model" in router.ranked()
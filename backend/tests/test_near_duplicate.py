@@ -0,0 +1,122 @@
+import random
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.db.models import Complaint
+from app.ml import near_duplicate
+from app.ml.near_duplicate import NearDuplicateIndex
+
+FIELDS = {"category": "Billing", "priority": "Medium", "sentiment": "Negative",
+          "solution": "Refund the duplicate charge within 5 business days."}
+TEXT = "Subject: Charged twice\nDescription: I was charged twice for order #{} and I need a refund for the second payment."
+
+
+def fingerprinted(index: NearDuplicateIndex, fingerprints: dict) -> NearDuplicateIndex:
+    """Use fixed fingerprints per text, to test banding without hunting for SimHash collisions"""
+    index._fingerprint = lambda text: (fingerprints[text], 20)
+    return index
+
+
+def flip(fingerprint: int, bits) -> int:
+    for bit in bits:
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def test_numbers_do_not_break_a_match():
+    index = NearDuplicateIndex()
+    index.add("T1", TEXT.format(123), FIELDS)
+    match = index.lookup(TEXT.format(456))
+    assert match is not None
+    assert match["ticket_id"] == "T1"
+    assert match["fields"] == FIELDS
+
+
+def test_any_pair_within_max_distance_shares_a_band():
+    rng = random.Random(7)
+    for _ in range(200):
+        index = NearDuplicateIndex(max_distance=6)
+        stored = rng.getrandbits(64)
+        query = flip(stored, rng.sample(range(64), 6))
+        fingerprinted(index, {"stored": stored, "query": query})
+        index.add("T1", "stored", FIELDS)
+        assert index.lookup("query")["ticket_id"] == "T1"
+
+
+def test_beyond_max_distance_does_not_match():
+    index = NearDuplicateIndex(max_distance=6)
+    stored = 0
+    # One flipped bit in every band: shares no band and is max_distance + 1 bits away
+    bits = [band * index.band_bits for band in range(index.bands)]
+    query = flip(stored, bits)
+    assert bin(stored ^ query).count("1") == index.max_distance + 1
+    fingerprinted(index, {"stored": stored, "query": query})
+    index.add("T1", "stored", FIELDS)
+    assert index.lookup("query") is None
+
+
+def test_oldest_entries_are_evicted():
+    index = NearDuplicateIndex(max_entries=3)
+    fingerprints = {f"text {i}": random.Random(i).getrandbits(64) for i in range(5)}
+    fingerprinted(index, fingerprints)
+    for i in range(5):
+        index.add(f"T{i}", f"text {i}", FIELDS)
+    assert list(index.entries) == ["T2", "T3", "T4"]
+    assert index.evictions == 2
+    assert all(bucket <= {"T2", "T3", "T4"} for bucket in index.buckets.values())
+    assert index.lookup("text 0") is None
+
+
+def test_entries_expire_after_max_age(monkeypatch):
+    monkeypatch.setattr(near_duplicate, "NEAR_DUP_MAX_AGE", 60)
+    index = NearDuplicateIndex()
+    index.add("T1", TEXT.format(1), FIELDS, created=time.time() - 120)
+    assert index.lookup(TEXT.format(2)) is None
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def complaint(ticket_id: str, order: int, **values) -> Complaint:
+    return Complaint(ticket_id=ticket_id, name="n", email="e@example.com", subject="Charged twice",
+                     description=TEXT.format(order).split("Description: ")[1], analysis_status="completed",
+                     **{**FIELDS, **values})
+
+
+def test_sync_loads_only_what_add_would_accept(db):
+    db.add_all([
+        complaint("CLEAN", 1, near_dup_reusable=True),
+        complaint("FELL_BACK", 2, near_dup_reusable=False, category="Other",
+                  solution="Our team will investigate and follow up within 24 hours."),
+        complaint("ADMIN", 3, near_dup_reusable=True, solution_by_admin=True, solution="Admin wrote: refund issued"),
+        complaint("LEGACY", 4, near_dup_reusable=None),
+    ])
+    db.commit()
+
+    index = NearDuplicateIndex()
+    index.sync(db)
+    assert list(index.entries) == ["CLEAN"]
+    assert index.lookup(TEXT.format(9))["fields"]["solution"] == FIELDS["solution"]
+
+
+def test_degraded_and_admin_rows_are_not_reused_after_sync(db):
+    db.add_all([
+        complaint("FELL_BACK", 2, near_dup_reusable=False,
+                  solution="Our team will investigate and follow up within 24 hours."),
+        complaint("ADMIN", 3, near_dup_reusable=True, solution_by_admin=True, solution="Admin wrote: refund issued"),
+    ])
+    db.commit()
+
+    index = NearDuplicateIndex()
+    index.sync(db)
+    assert index.lookup(TEXT.format(9)) is None
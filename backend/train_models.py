@@ -0,0 +1,125 @@
+"""
+Train the local models used in place of LLM calls.
+
+Usage:
+    python train_models.py satisfaction [--holdout 0.2] [--output models/satisfaction.npz]
+    python train_models.py classifier [--holdout 0.2] [--threshold 0.7] [--output models/text_classifier.npz]
+"""
+import argparse
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import or_
+
+load_dotenv()
+
+from app.db.database import SessionLocal
+from app.db.models import Complaint
+from app.ml.satisfaction_model import SATISFACTION_MODEL_PATH, train_satisfaction_model
+from app.ml.text_classifier import LOCAL_CLASSIFIER_THRESHOLD, TEXT_MODEL_PATH, train_text_classifier
+
+
+def load_rated_complaints():
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Complaint.response, Complaint.priority, Complaint.category,
+                     Complaint.user_rating, Complaint.satisfaction_prediction)
+            .filter(Complaint.user_rating.isnot(None))
+            .all()
+        )
+        return [row._asdict() for row in rows]
+    finally:
+        db.close()
+
+
+def train_satisfaction(args):
+    rows = load_rated_complaints()
+    print(f"📊 Found {len(rows)} rated complaints")
+    try:
+        model, report = train_satisfaction_model(rows, holdout=args.holdout, seed=args.seed)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ Held-out accuracy: {report['held_out_accuracy']:.1%} "
+          f"({report['test_rows']} of {report['rows']} rows held out)")
+    if report["llm_accuracy"] is not None:
+        print(f"🤖 LLM accuracy on the same rows: {report['llm_accuracy']:.1%} "
+              f"({report['llm_compared_rows']} with a stored prediction)")
+    print(f"⚡ Prediction latency: {report['predict_latency_ms'] * 1000:.1f} µs")
+
+    model.save(args.output)
+    print(f"💾 Saved model to {args.output}")
+    return 0
+
+
+def load_labelled_complaints():
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Complaint.subject, Complaint.description, Complaint.complaint_text,
+                     Complaint.category, Complaint.sentiment)
+            .filter(Complaint.category.isnot(None))
+            .filter(or_(Complaint.analysis_status == "completed", Complaint.analysis_status.is_(None)))
+            .all()
+        )
+        # Same text the agents see (see complaint_service.analysis_text)
+        return [
+            {"text": f"Subject: {r.subject}\nDescription: {r.description or r.complaint_text}",
+             "category": r.category, "sentiment": r.sentiment}
+            for r in rows
+        ]
+    finally:
+        db.close()
+
+
+def train_classifier(args):
+    rows = load_labelled_complaints()
+    print(f"📊 Found {len(rows)} labelled complaints (plus the training-data examples)")
+    try:
+        model, report = train_text_classifier(rows, holdout=args.holdout, seed=args.seed, threshold=args.threshold)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    for head in ("category", "sentiment"):
+        head_report = report[head]
+        if head_report["held_out_accuracy"] is None:
+            print(f"✅ {head}: trained on {head_report['train_rows']} rows (no historical rows to evaluate on)")
+            continue
+        local_accuracy = head_report["local_accuracy"]
+        print(f"✅ {head}: held-out accuracy {head_report['held_out_accuracy']:.1%}; "
+              f"{head_report['local_rate']:.1%} answered locally at p >= {args.threshold}"
+              + (f" with {local_accuracy:.1%} accuracy" if local_accuracy is not None else ""))
+    if report["predict_latency_ms"] is not None:
+        print(f"⚡ Prediction latency: {report['predict_latency_ms'] * 1000:.1f} µs")
+
+    model.save(args.output)
+    print(f"💾 Saved model to {args.output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train Quickfix local models")
+    sub = parser.add_subparsers(dest="model", required=True)
+
+    satisfaction = sub.add_parser("satisfaction", help="Satisfaction predictor from user ratings")
+    satisfaction.add_argument("--holdout", type=float, default=0.2, help="Fraction of rows held out for evaluation")
+    satisfaction.add_argument("--seed", type=int, default=42)
+    satisfaction.add_argument("--output", default=SATISFACTION_MODEL_PATH)
+    satisfaction.set_defaults(func=train_satisfaction)
+
+    classifier = sub.add_parser("classifier", help="Category and sentiment classifier from labelled complaints")
+    classifier.add_argument("--holdout", type=float, default=0.2, help="Fraction of historical rows held out for evaluation")
+    classifier.add_argument("--threshold", type=float, default=LOCAL_CLASSIFIER_THRESHOLD,
+                            help="Top-class probability needed to answer without the LLM (for the report)")
+    classifier.add_argument("--seed", type=int, default=42)
+    classifier.add_argument("--output", default=TEXT_MODEL_PATH)
+    classifier.set_defaults(func=train_classifier)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())